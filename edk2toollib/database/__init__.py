@@ -14,7 +14,7 @@
 from sqlalchemy import Column, ForeignKey, Integer, String, Table, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, Session, mapped_column, relationship  # noqa: F401
 
-from .edk2_db import Edk2DB  # noqa: F401
+from .edk2_db import Edk2DB, GeneratorMetrics  # noqa: F401
 
 # Association tables. Should not be used directly. Only for relationships
 _source_association = Table(
@@ -174,3 +174,36 @@ class Fv(Edk2DB.Base):
     name: Mapped[str]
     fdf: Mapped[str]
     infs: Mapped[List["InstancedInf"]] = relationship(secondary=_fv_association)
+
+
+class GeneratorMetric(Edk2DB.Base):
+    """A class to represent the performance metrics of a single table generator run in the database."""
+
+    __tablename__ = "generator_metric"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    env: Mapped[str] = mapped_column(ForeignKey("environment.id"), index=True)
+    generator: Mapped[str]
+    wall_time: Mapped[float]
+    discovery_time: Mapped[float]
+    parse_time: Mapped[float]
+    db_write_time: Mapped[float]
+    files_scanned: Mapped[int]
+    rows_inserted: Mapped[int]
+    cache_hits: Mapped[int]
+    process_peak_rss: Mapped[Optional[int]]
+
+    def to_dict(self) -> dict:
+        """Returns the row as a dictionary."""
+        return {
+            "env": self.env,
+            "generator": self.generator,
+            "wall_time": self.wall_time,
+            "discovery_time": self.discovery_time,
+            "parse_time": self.parse_time,
+            "db_write_time": self.db_write_time,
+            "files_scanned": self.files_scanned,
+            "rows_inserted": self.rows_inserted,
+            "cache_hits": self.cache_hits,
+            "process_peak_rss": self.process_peak_rss,
+        }
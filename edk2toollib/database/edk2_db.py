@@ -8,12 +8,13 @@
 """A class for interacting with a database implemented using json."""
 
 import logging
+import sys
 import time
 import uuid
 from contextlib import contextmanager
-from typing import Any
+from typing import Any, Iterator, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import DeclarativeBase, Session
 
 from edk2toollib.uefi.edk2.path_utilities import Edk2Path
@@ -26,6 +27,150 @@ class Base(DeclarativeBase):
     """
 
 
+def _process_peak_rss() -> Optional[int]:
+    """Returns the peak resident set size of the current process in bytes, if it can be determined.
+
+    This is the high-water mark since the process started, not including child processes.
+    """
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in kilobytes on linux, but in bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    return None
+
+
+class GeneratorMetrics:
+    """Performance metrics collected for a single run of a table generator.
+
+    Edk2DB creates a new instance for every table generator run and tracks the wall time, the time spent writing to
+    the database, the number of rows inserted, and the peak RSS of the process so far automatically. Table generators are
+    responsible for recording the discovery and parse phases (via `phase()`), the number of files scanned, and any
+    cache hits.
+
+    Attributes:
+        wall_time (float): Total time, in seconds, spent running the generator
+        discovery_time (float): Time, in seconds, spent finding the files to parse
+        parse_time (float): Time, in seconds, spent parsing files
+        db_write_time (float): Time, in seconds, spent flushing and committing rows to the database
+        files_scanned (int): Number of files parsed by the generator
+        rows_inserted (int): Number of ORM objects inserted into the database
+        cache_hits (int): Number of times the generator re-used previously parsed data
+        process_peak_rss (int): Peak resident set size of the calling process since it started, in bytes, or None if
+            unavailable. It is measured once the generator finishes, so it is a process-wide high-water mark rather
+            than the memory used by this generator, and it does not include worker processes.
+
+    Example:
+        ```python
+        def parse(self, session, pathobj, id, env):
+            with self.metrics.phase("discovery"):
+                files = list(Path(pathobj.WorkspacePath).rglob("*.inf"))
+            self.metrics.files_scanned += len(files)
+            with self.metrics.phase("parse"):
+                rows = [self._parse_file(file) for file in files]
+            session.add_all(rows)
+        ```
+    """
+
+    PHASES = ("discovery", "parse", "db_write")
+
+    def __init__(self) -> "GeneratorMetrics":
+        """Initializes an empty set of metrics."""
+        self.wall_time = 0.0
+        self.discovery_time = 0.0
+        self.parse_time = 0.0
+        self.db_write_time = 0.0
+        self.files_scanned = 0
+        self.rows_inserted = 0
+        self.cache_hits = 0
+        self.process_peak_rss = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Context manager that adds the time spent inside of it to the specified phase.
+
+        Args:
+            name (str): One of "discovery", "parse", or "db_write"
+        """
+        if name not in GeneratorMetrics.PHASES:
+            raise ValueError(f"Unknown phase [{name}]. Expected one of {GeneratorMetrics.PHASES}.")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            attr = f"{name}_time"
+            setattr(self, attr, getattr(self, attr) + time.perf_counter() - start)
+
+    def track(self, session: Session) -> None:
+        """Records rows inserted and time spent flushing / committing for the provided session."""
+        state = {"start": None, "in_commit": False}
+
+        def _start_commit(session: Session) -> None:
+            state["in_commit"] = True
+            state["start"] = time.perf_counter()
+
+        def _end_commit(session: Session) -> None:
+            state["in_commit"] = False
+            self.db_write_time += time.perf_counter() - state["start"]
+
+        def _start_flush(session: Session, flush_context: Any, instances: Any) -> None:
+            if not state["in_commit"]:
+                state["start"] = time.perf_counter()
+
+        def _count_rows(session: Session, flush_context: Any) -> None:
+            self.rows_inserted += len(session.new)
+
+        def _end_flush(session: Session, flush_context: Any) -> None:
+            if not state["in_commit"]:
+                self.db_write_time += time.perf_counter() - state["start"]
+
+        event.listen(session, "before_commit", _start_commit)
+        event.listen(session, "after_commit", _end_commit)
+        event.listen(session, "before_flush", _start_flush)
+        event.listen(session, "after_flush", _count_rows)
+        event.listen(session, "after_flush_postexec", _end_flush)
+
+    def to_dict(self) -> dict:
+        """Returns the metrics as a dictionary."""
+        return {
+            "wall_time": self.wall_time,
+            "discovery_time": self.discovery_time,
+            "parse_time": self.parse_time,
+            "db_write_time": self.db_write_time,
+            "files_scanned": self.files_scanned,
+            "rows_inserted": self.rows_inserted,
+            "cache_hits": self.cache_hits,
+            "process_peak_rss": self.process_peak_rss,
+        }
+
+
 class Edk2DB:
     """A SQLite3 database manager for a EDKII workspace.
 
@@ -100,22 +245,65 @@ def clear_parsers(self) -> None:
         """Empties the list of registered table generators."""
         self._parsers = []
 
-    def parse(self, env: dict) -> None:
+    def parse(self, env: dict) -> str:
         """Runs all registered table parsers against the database.
 
+        Performance metrics for each table generator are recorded in the `generator_metric` table, associated with the
+        returned environment id. Use `get_metrics()` to retrieve them.
+
         !!! note
             To enable queries to differentiate between two parses, an environment table is always created if it does
             not exist, and a row is added for each call of this command.
+
+        Returns:
+            (str): The unique id associated with this parse.
         """
+        from edk2toollib.database import GeneratorMetric
+
         id = str(uuid.uuid4().hex)
 
         # Fill all tables
         for table in self._parsers:
-            logging.debug(f"[{table.__class__.__name__}] starting...")
-            t = time.time()
+            name = table.__class__.__name__
+            logging.debug(f"[{name}] starting...")
+            metrics = GeneratorMetrics()
+            table._metrics = metrics
+            t = time.perf_counter()
             with self.session() as session:
+                metrics.track(session)
                 table.parse(session, self.pathobj, id, env)
-            logging.debug(f"Finished in {round(time.time() - t, 2)}")
+            metrics.wall_time = time.perf_counter() - t
+            metrics.process_peak_rss = _process_peak_rss()
+
+            with self.session() as session:
+                session.add(GeneratorMetric(env=id, generator=name, **metrics.to_dict()))
+            logging.debug(
+                f"[{name}] Finished in {round(metrics.wall_time, 2)}s "
+                f"(discovery: {round(metrics.discovery_time, 2)}s, parse: {round(metrics.parse_time, 2)}s, "
+                f"db write: {round(metrics.db_write_time, 2)}s, files: {metrics.files_scanned}, "
+                f"rows: {metrics.rows_inserted}, cache hits: {metrics.cache_hits})"
+            )
+        return id
+
+    def get_metrics(self, env_id: Optional[str] = None, generator: Optional[str] = None) -> list[dict]:
+        """Returns the recorded table generator performance metrics.
+
+        Args:
+            env_id (str): Only return metrics for the specified environment id. Returns all metrics if None.
+            generator (str): Only return metrics for the specified table generator class name.
+
+        Returns:
+            (list[dict]): A dictionary per generator run, ordered by insertion.
+        """
+        from edk2toollib.database import GeneratorMetric
+
+        with self.session() as session:
+            query = session.query(GeneratorMetric)
+            if env_id is not None:
+                query = query.filter_by(env=env_id)
+            if generator is not None:
+                query = query.filter_by(generator=generator)
+            return [row.to_dict() for row in query.order_by(GeneratorMetric.id).all()]
 
 
 class TableGenerator:
@@ -131,6 +319,13 @@ class TableGenerator:
     def __init__(self, *args: Any, **kwargs: Any) -> "TableGenerator":
         """Initialize the query with the specific settings."""
 
+    @property
+    def metrics(self) -> GeneratorMetrics:
+        """The performance metrics for the current (or most recent) run of the generator."""
+        if "_metrics" not in self.__dict__:
+            self._metrics = GeneratorMetrics()
+        return self._metrics
+
     def parse(self, session: Session, pathobj: Edk2Path, id: str, env: dict) -> None:
         """Execute the parser and update the database."""
         raise NotImplementedError
@@ -8,17 +8,16 @@
 ##
 """A module to run generate a table containing information about each INF in the workspace."""
 
-import logging
-import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 from joblib import Parallel, delayed
 
 from edk2toollib.database import Inf, Library, Session, Source
 from edk2toollib.database.tables import TableGenerator
+from edk2toollib.uefi.edk2.parsers import parse_cache
 from edk2toollib.uefi.edk2.parsers.inf_parser import InfParser as InfP
-from edk2toollib.uefi.edk2.path_utilities import Edk2Path
+from edk2toollib.uefi.edk2.path_utilities import Edk2Path, Edk2PathSnapshot
 
 
 class InfTable(TableGenerator):
@@ -42,10 +41,20 @@ def parse(self, session: Session, pathobj: Edk2Path, env_id: str, env: dict) ->
         ws = Path(pathobj.WorkspacePath)
         inf_entries = []
 
-        start = time.time()
-        files = list(ws.glob("**/*.inf"))
-        files = [file for file in files if not file.is_relative_to(ws / "Build")]
-        inf_entries = Parallel(n_jobs=self.n_jobs)(delayed(self._parse_file)(fname, pathobj) for fname in files)
+        with self.metrics.phase("discovery"):
+            files = list(ws.glob("**/*.inf"))
+            files = [file for file in files if not file.is_relative_to(ws / "Build")]
+        self.metrics.files_scanned += len(files)
+
+        # Workers only need path conversions, so send them a lightweight snapshot rather than the full Edk2Path
+        snapshot = pathobj.Snapshot()
+        # Worker processes do not share this process's parse cache, so pass on its settings to enable the same one
+        cache = parse_cache.get_parse_cache()
+        cache_config = cache.config() if cache is not None else None
+        with self.metrics.phase("parse"):
+            inf_entries = Parallel(n_jobs=self.n_jobs)(
+                delayed(self._parse_file)(fname, snapshot, cache_config) for fname in files
+            )
 
         all_inf = {inf.path: inf for inf in session.query(Inf).all()}
         all_source = {source.path: source for source in session.query(Source).all()}
@@ -72,12 +81,9 @@ def parse(self, session: Session, pathobj: Edk2Path, env_id: str, env: dict) ->
 
         session.add_all(to_add)
 
-        logging.debug(
-            f"{self.__class__.__name__}: Parsed {len(inf_entries)} .inf files took; "
-            f"{round(time.time() - start, 2)} seconds."
-        )
-
-    def _parse_file(self, filename: str, pathobj: Edk2Path) -> dict:
+    def _parse_file(self, filename: str, pathobj: Edk2PathSnapshot, cache_config: Optional[dict] = None) -> dict:
+        if cache_config is not None:
+            parse_cache.enable_parse_cache(**cache_config)
         inf_parser = InfP().SetEdk2Path(pathobj)
         inf_parser.ParseFile(filename)
 
@@ -47,9 +47,11 @@ def parse(self, session: Session, pathobj: Edk2Path, env_id: str, env: dict) ->
             return
 
         # Our DscParser subclass can now parse components, their scope, and their overrides
-        fdfp = FdfP().SetEdk2Path(self.pathobj)
-        fdfp.SetInputVars(self.env)
-        fdfp.ParseFile(self.fdf)
+        with self.metrics.phase("parse"):
+            fdfp = FdfP().SetEdk2Path(self.pathobj)
+            fdfp.SetInputVars(self.env)
+            fdfp.ParseFile(self.fdf)
+        self.metrics.files_scanned += 1
 
         all_components = {inf.path: inf for inf in session.query(InstancedInf).filter_by(env=env_id, cls=None).all()}
         for fv in fdfp.FVs:
@@ -39,10 +39,12 @@ def inf(self, inf: str) -> InfP:
         """
         if inf in self._parsed_infs:
             infp = self._parsed_infs[inf]
+            self.metrics.cache_hits += 1
         else:
             infp = InfP().SetEdk2Path(self.pathobj)
             infp.ParseFile(inf)
             self._parsed_infs[inf] = infp
+            self.metrics.files_scanned += 1
         return infp
 
     def parse(self, session: Session, pathobj: Edk2Path, env_id: str, env: dict) -> None:
@@ -54,9 +56,11 @@ def parse(self, session: Session, pathobj: Edk2Path, env_id: str, env: dict) ->
         self.arch = self.env["TARGET_ARCH"].split(" ")
         self.target = self.env["TARGET"]
 
-        dscp = DscP().SetEdk2Path(self.pathobj)
-        dscp.SetInputVars(self.env)
-        dscp.ParseFile(self.dsc)
+        with self.metrics.phase("parse"):
+            dscp = DscP().SetEdk2Path(self.pathobj)
+            dscp.SetInputVars(self.env)
+            dscp.ParseFile(self.dsc)
+        self.metrics.files_scanned += len(dscp.GetAllDscPaths())
 
         # General Debugging
         logging.debug(f"All DSCs included in {self.dsc}:")
@@ -69,7 +73,8 @@ def parse(self, session: Session, pathobj: Edk2Path, env_id: str, env: dict) ->
         logging.debug("End of DSC")
 
         # Parse and insert
-        inf_entries = self._build_inf_table(dscp)
+        with self.metrics.phase("parse"):
+            inf_entries = self._build_inf_table(dscp)
         return self._insert_db_rows(session, env_id, inf_entries)
 
     def _insert_db_rows(self, session: Session, env_id: str, inf_entries: list) -> int:
@@ -173,8 +178,7 @@ def _build_inf_table(self, dscp: DscP) -> list:
             inf = self.pathobj.GetEdk2RelativePathFromAbsolutePath(inf)
 
             logging.debug(f"Parsing Component: [{arch}][{inf}]")
-            infp = InfP().SetEdk2Path(self.pathobj)
-            infp.ParseFile(inf)
+            infp = self.inf(inf)
 
             # Libraries marked as a component only have source compiled and do not link against other libraries
             if "LIBRARY_CLASS" in infp.Dict:
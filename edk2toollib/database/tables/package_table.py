@@ -50,8 +50,12 @@ def parse(self, session: Session, pathobj: Edk2Path, id: str, env: dict) -> None
         all_packages = {(pkg.name, pkg.path): pkg for pkg in session.query(Package).all()}
         all_repos = {(repo.name, repo.path): repo for repo in session.query(Repository).all()}
 
+        with self.metrics.phase("discovery"):
+            files = list(Path(pathobj.WorkspacePath).rglob(DEC_EXTENSION))
+        self.metrics.files_scanned += len(files)
+
         packages_to_add = []
-        for file in Path(pathobj.WorkspacePath).rglob(DEC_EXTENSION):
+        for file in files:
             pkg_name = file.parent.name
             containing_repo = PackageTable.get_repo_name(repo)
             repo_path = None
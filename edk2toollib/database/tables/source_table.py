@@ -7,9 +7,7 @@
 ##
 """A module to Parse all Source files and add them to the database."""
 
-import logging
 import re
-import time
 from pathlib import Path
 from typing import Any
 
@@ -47,12 +45,15 @@ def parse(self, session: Session, pathobj: Edk2Path, id: str, env: dict) -> None
         ws = Path(pathobj.WorkspacePath)
         self.pathobj = pathobj
 
-        start = time.time()
-        files = []
-        for src in self.source_extensions:
-            files.extend(list(ws.rglob(src)))
-        files = [file for file in files if file.is_file() and not file.is_relative_to(ws / "Build")]
-        src_entries = Parallel(n_jobs=self.n_jobs)(delayed(self._parse_file)(filename) for filename in files)
+        with self.metrics.phase("discovery"):
+            files = []
+            for src in self.source_extensions:
+                files.extend(list(ws.rglob(src)))
+            files = [file for file in files if file.is_file() and not file.is_relative_to(ws / "Build")]
+        self.metrics.files_scanned += len(files)
+
+        with self.metrics.phase("parse"):
+            src_entries = Parallel(n_jobs=self.n_jobs)(delayed(self._parse_file)(filename) for filename in files)
 
         existing_source = {source.path: source for source in session.query(Source).all()}
         to_add = []
@@ -69,10 +70,6 @@ def parse(self, session: Session, pathobj: Edk2Path, id: str, env: dict) -> None
         session.add_all(to_add)
         session.commit()
 
-        logging.debug(
-            f"{self.__class__.__name__}: Parsed {len(src_entries)} files; took {round(time.time() - start, 2)} seconds."
-        )
-
     def _parse_file(self, filename: Path) -> dict:
         """Parse a C file and return the results."""
         license = ""
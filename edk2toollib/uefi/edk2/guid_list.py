@@ -13,6 +13,7 @@
 from typing import IO
 
 from edk2toollib.gitignore_parser import parse_gitignore_lines
+from edk2toollib.uefi.edk2.parsers.batch_parse import parse_many
 from edk2toollib.uefi.edk2.parsers.dec_parser import DecParser
 from edk2toollib.uefi.edk2.parsers.inf_parser import InfParser
 
@@ -47,17 +48,18 @@ class GuidList:
     """Static class for returning Guids."""
 
     @staticmethod
-    def guidlist_from_filesystem(folder: str, ignore_lines: list = list()) -> list:
+    def guidlist_from_filesystem(folder: str, ignore_lines: list = list(), n_jobs: int = 1) -> list:
         """Create a list of GuidListEntry from files found in the file system.
 
         Args:
             folder (str): path string to root folder to walk
             ignore_lines (list): list of gitignore syntax to ignore files and folders
+            n_jobs (int): number of processes parsing the DEC and INF files, as for joblib
 
         Returns:
             (list[GuidListEntry]): guids
         """
-        guids = []
+        edk2_files = []
         ignore = parse_gitignore_lines(ignore_lines, os.path.join(folder, "nofile.txt"), folder)
         for root, dirs, files in os.walk(folder):
             for d in dirs[:]:
@@ -72,8 +74,23 @@ def guidlist_from_filesystem(folder: str, ignore_lines: list = list()) -> list:
                     logging.debug(f"Ignore file: {fullpath}")
                     continue
 
-                new_guids = GuidList.parse_guids_from_edk2_file(fullpath)
-                guids.extend(new_guids)
+                if fullpath.lower().endswith((".dec", ".inf")):
+                    edk2_files.append(fullpath)
+
+        decs = [path for path in edk2_files if path.lower().endswith(".dec")]
+        infs = [path for path in edk2_files if path.lower().endswith(".inf")]
+        results = parse_many(decs, "dec", n_jobs=n_jobs) + parse_many(infs, "inf", n_jobs=n_jobs, defines_only=True)
+        parsed = {result.path: result for result in results}
+
+        guids = []
+        for fullpath in edk2_files:
+            result = parsed[fullpath]
+            if result.error is not None:
+                raise result.error
+            if isinstance(result.parser, DecParser):
+                guids.extend(GuidList._guids_from_dec_parser(result.parser, fullpath))
+            else:
+                guids.extend(GuidList._guids_from_inf_parser(result.parser, fullpath))
         return guids
 
     @staticmethod
@@ -105,9 +122,14 @@ def parse_guids_from_dec(stream: IO, filename: str) -> list:
         Returns:
             (list[GuidListEntry]): Guids
         """
-        results = []
         dec = DecParser()
         dec.ParseStream(stream)
+        return GuidList._guids_from_dec_parser(dec, filename)
+
+    @staticmethod
+    def _guids_from_dec_parser(dec: DecParser, filename: str) -> list:
+        """Returns the guids declared by a parsed dec file."""
+        results = []
         for p in dec.Protocols:
             results.append(GuidListEntry(p.name, str(p.guid).upper(), filename))
         for p in dec.PPIs:
@@ -132,7 +154,12 @@ def parse_guids_from_inf(filename: str) -> list:
             (list[GuidListEntry]): Guids
         """
         inf = InfParser()
-        inf.ParseFile(filename)
+        inf.ParseFile(filename, defines_only=True)
+        return GuidList._guids_from_inf_parser(inf, filename)
+
+    @staticmethod
+    def _guids_from_inf_parser(inf: InfParser, filename: str) -> list:
+        """Returns the module guid of a parsed inf file."""
         try:
             return [GuidListEntry(inf.Dict["BASE_NAME"], inf.Dict["FILE_GUID"].upper(), filename)]
         except Exception:
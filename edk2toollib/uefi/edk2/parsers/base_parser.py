@@ -7,12 +7,119 @@
 ##
 """Code to support parsing EDK2 files."""
 
+import functools
 import logging
 import os
-from typing import Optional, Union
+import pickle
+import re
+from typing import Hashable, Iterable, Iterator, Optional, Union
 from warnings import warn
 
 from edk2toollib.uefi.edk2 import path_utilities
+from edk2toollib.uefi.edk2.parsers import parse_cache
+
+_MACRO_REFERENCE = re.compile(r"\$\(([^)]*)\)")
+
+
+class _MacroDict(dict):
+    """A dict that counts its mutations so derived views know when to rebuild.
+
+    Assigning a key the value it already holds does not count as a change, which keeps repeated define
+    resolution passes from invalidating the macro view on every line. Single-key changes are also kept
+    in a short journal so a view can be patched instead of rebuilt.
+    """
+
+    JOURNAL_LIMIT = 256
+
+    def __init__(self, *args: object, **kwargs: object) -> "_MacroDict":
+        """Inits the dict and its change counter."""
+        super().__init__(*args, **kwargs)
+        self.version = 0
+        self._journal_start = 0
+        self._journal = []  # key changed by each version after _journal_start
+
+    def __reduce__(self) -> tuple:
+        """Pickles and copies the counters with the items.
+
+        The default for dict subclasses restores the items before the counters exist, so the class is called instead.
+        """
+        return type(self), (), self.__dict__.copy(), None, iter(self.items())
+
+    def _KeyChanged(self, key: str) -> None:
+        self.version += 1
+        self._journal.append(key)
+        if len(self._journal) > self.JOURNAL_LIMIT:
+            drop = len(self._journal) // 2
+            del self._journal[:drop]
+            self._journal_start += drop
+
+    def _AllChanged(self) -> None:
+        self.version += 1
+        self._journal_start = self.version
+        self._journal = []
+
+    def changes_since(self, version: int) -> Optional[list]:
+        """Returns the keys changed since the given version, or None if they are no longer known."""
+        if version < self._journal_start or version > self.version:
+            return None
+        return self._journal[version - self._journal_start :]
+
+    def __setitem__(self, key: str, value: object) -> None:
+        """Sets a value, counting the change only if the value differs."""
+        if key not in self or dict.__getitem__(self, key) != value:
+            self._KeyChanged(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        """Deletes a value."""
+        super().__delitem__(key)
+        self._KeyChanged(key)
+
+    def __ior__(self, other: dict) -> "_MacroDict":
+        """Merges another mapping in place."""
+        self.update(other)
+        return self
+
+    def update(self, *args: object, **kwargs: object) -> None:
+        """Updates the dict from a mapping or iterable of pairs."""
+        super().update(*args, **kwargs)
+        self._AllChanged()
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """Returns the value of key, inserting default if it is not present."""
+        if key not in self:
+            self._KeyChanged(key)
+        return super().setdefault(key, default)
+
+    def pop(self, *args: object) -> object:
+        """Removes a key and returns its value."""
+        self._AllChanged()
+        return super().pop(*args)
+
+    def popitem(self) -> tuple:
+        """Removes and returns the last inserted pair."""
+        self._AllChanged()
+        return super().popitem()
+
+    def clear(self) -> None:
+        """Removes every key."""
+        super().clear()
+        self._AllChanged()
+
+
+def _MacroExpansion(token: str, value: object) -> Optional[str]:
+    """Returns the string a macro expands to, or None if the value does not define the macro."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        value = "TRUE" if value else "FALSE"
+    elif isinstance(value, str) and value.upper() in ("TRUE", "FALSE"):
+        value = value.upper()
+    value = str(value)
+    # prevent circular variable replacement
+    if f"$({token})" in value:
+        value = ""
+    return value
 
 
 class BaseParser(object):
@@ -35,8 +142,12 @@ def __init__(self, log: str = "BaseParser") -> "BaseParser":
         """Inits an empty Parser."""
         self.Logger = logging.getLogger(log)
         self.Lines = []
-        self.LocalVars = {}
-        self.InputVars = {}
+        self._macro_view = None
+        self._macro_expanders = None
+        self._macro_view_key = None
+        self._macro_view_sources = None
+        self.LocalVars = _MacroDict()
+        self.InputVars = _MacroDict()
         self.CurrentSection = ""
         self.CurrentFullSection = ""
         self.Parsed = False
@@ -49,6 +160,35 @@ def __init__(self, log: str = "BaseParser") -> "BaseParser":
         self._MacroNotDefinedValue = "0"  # value to used for undefined macro
         self._MacroDefinedValue = "1"  # value used for a defined macro
 
+    def __getstate__(self) -> dict:
+        """Returns the state to pickle, excluding the macro view, which is rebuilt when next needed."""
+        state = self.__dict__.copy()
+        state["_macro_view"] = None
+        state["_macro_expanders"] = None
+        state["_macro_view_key"] = None
+        state["_macro_view_sources"] = None
+        return state
+
+    @property
+    def LocalVars(self) -> dict:
+        """Dict of local variables (DEFINEs found while parsing)."""
+        return self._local_vars
+
+    @LocalVars.setter
+    def LocalVars(self, value: dict) -> None:
+        self._local_vars = value
+        self._macro_view_key = None
+
+    @property
+    def InputVars(self) -> dict:
+        """Dict of input variables, which take priority over local variables."""
+        return self._input_vars
+
+    @InputVars.setter
+    def InputVars(self, value: dict) -> None:
+        self._input_vars = value
+        self._macro_view_key = None
+
     #
     # For include files set the base root path
     #
@@ -152,6 +292,20 @@ def FindPath(self, *p: str) -> str:
         if p is None or (len(p) == 1 and p[0] is None):
             return None
 
+        target_dir = os.path.dirname(self.TargetFilePath) if self.TargetFilePath is not None else None
+        return self._FindPathFrom(target_dir, *p)
+
+    def _FindPathFrom(self, target_dir: Optional[str], *p: str) -> Optional[str]:
+        """Finds a path like `FindPath`, but relative to the given directory rather than the target file's.
+
+        Args:
+          target_dir (str): directory of the file that referenced the path, or None to skip that lookup
+          *p (obj): any number of strings or path like objects
+
+        Returns:
+            (str): a full absolute path if the file exists
+            (None): None on failure
+        """
         Path = os.path.join(*p)
         # check if it it is absolute
         if os.path.isabs(Path) and os.path.exists(Path):
@@ -163,8 +317,8 @@ def FindPath(self, *p: str) -> str:
             return os.path.abspath(Path)
 
         # If that fails, check a path relative to the target file.
-        if self.TargetFilePath is not None:
-            Path = os.path.abspath(os.path.join(os.path.dirname(self.TargetFilePath), *p))
+        if target_dir is not None:
+            Path = os.path.abspath(os.path.join(target_dir, *p))
             if os.path.exists(Path):
                 return os.path.abspath(Path)
 
@@ -347,6 +501,66 @@ def _FindReplacementForToken(self, token: str, replace_if_not_found: bool = Fals
 
         return str(v)
 
+    def _GetMacroView(self) -> dict:
+        """Returns the merged, normalized view of InputVars and LocalVars used for macro expansion.
+
+        The view maps each defined macro to the exact string it expands to, so lookups during expansion are a
+        single dict access. It is only updated when either dict has changed since it was last built, and only
+        the changed macros are recomputed when the dicts still know which keys those were.
+
+        The parser's own dicts count their changes. A plain dict assigned by the caller is kept as is, so it is
+        compared with a copy taken when the view was built instead.
+        """
+        local_vars, input_vars = self._local_vars, self._input_vars
+        key = (getattr(local_vars, "version", None), getattr(input_vars, "version", None))
+        sources = self._macro_view_sources
+        if key == self._macro_view_key and (sources is None or sources == (local_vars, input_vars)):
+            return self._macro_view
+
+        if self._macro_view_key is not None and sources is None and None not in key:
+            local_changes = local_vars.changes_since(self._macro_view_key[0])
+            input_changes = input_vars.changes_since(self._macro_view_key[1])
+            if local_changes is not None and input_changes is not None:
+                view = self._macro_view
+                for token in set(local_changes).union(input_changes):
+                    value = _MacroExpansion(token, self._input_vars.get(token))
+                    if value is None:
+                        value = _MacroExpansion(token, self._local_vars.get(token))
+                    if value is None:
+                        view.pop(token, None)
+                    else:
+                        view[token] = value
+                self._macro_view_key = key
+                return view
+
+        view = {}
+        for variables in (self._local_vars, self._input_vars):
+            for token, value in variables.items():
+                value = _MacroExpansion(token, value)
+                if value is not None:
+                    view[token] = value
+
+        lookup = view.get
+
+        def expand(match: re.Match) -> str:
+            value = lookup(match.group(1))
+            return match.group(0) if value is None else value
+
+        def expand_or_not_defined(match: re.Match) -> str:
+            return lookup(match.group(1), self._MacroNotDefinedValue)
+
+        self._macro_view = view
+        self._macro_expanders = (expand, expand_or_not_defined)
+        self._macro_view_key = key
+        if None in key:
+            self._macro_view_sources = tuple(
+                variables if isinstance(variables, _MacroDict) else dict(variables)
+                for variables in (local_vars, input_vars)
+            )
+        else:
+            self._macro_view_sources = None
+        return view
+
     def ReplaceVariables(self, line: str) -> str:
         """Replaces a variable in a string.
 
@@ -359,49 +573,35 @@ def ReplaceVariables(self, line: str) -> str:
         # first tokenize and look for tokens require special macro
         # handling without $.  This must be done first otherwise
         # both syntax options can not be supported.
-        result = line
-        tokens = result.split()
-
-        # Special handling for !ifdef and !ifndef. We don't want to truly replace the value, we just want
-        # to know if it is defined or not. If we replace the value, that replacement could be an empty
-        # string, which leaves the line as `!ifdef` or `!ifndef`, causing an exception to be raised.
-        if len(tokens) > 1 and tokens[0].lower() in ["!ifdef", "!ifndef"]:
-            # Per EDK2 parser specification, the macro name should not be wrapped in $(), however also
-            # per EDK2 parser specification, this is handled for backwards compatibility.
-            # We could change our minds and raise an exception instead of handling this
-            if tokens[1].startswith("$("):
-                start = line.find("$(")
-                end = line.find(")", start)
-                tokens[1] = line[start + 2 : end]
-
-            if self._FindReplacementForToken(tokens[1], False) is None:
-                tokens[1] = self._MacroNotDefinedValue
-            else:
-                tokens[1] = self._MacroDefinedValue
-            return " ".join(tokens)
-
-        replace = len(tokens) > 1 and tokens[0].lower() in ["!if", "!elseif"]
-        # use line to avoid change by handling above
-        rep = line.count("$")
-        index = 0
-        while rep > 0:
-            start = line.find("$(", index)
-            end = line.find(")", start)
-
-            token = line[start + 2 : end]
-            replacement_token = line[start : end + 1]
-            self.Logger.debug("Token is %s" % token)
-            v = self._FindReplacementForToken(token, replace)
-            if v is not None:
-                # prevent circular variable replacement
-                if f"$({token})" in v:
-                    v = ""
-                result = result.replace(replacement_token, v, 1)
-
-            index = end + 1
-            rep = rep - 1
-
-        return result
+        replace = False
+        if line.lstrip().startswith("!"):
+            tokens = line.split()
+
+            # Special handling for !ifdef and !ifndef. We don't want to truly replace the value, we just want
+            # to know if it is defined or not. If we replace the value, that replacement could be an empty
+            # string, which leaves the line as `!ifdef` or `!ifndef`, causing an exception to be raised.
+            if len(tokens) > 1 and tokens[0].lower() in ["!ifdef", "!ifndef"]:
+                # Per EDK2 parser specification, the macro name should not be wrapped in $(), however also
+                # per EDK2 parser specification, this is handled for backwards compatibility.
+                # We could change our minds and raise an exception instead of handling this
+                if tokens[1].startswith("$("):
+                    start = line.find("$(")
+                    end = line.find(")", start)
+                    tokens[1] = line[start + 2 : end]
+
+                if self._FindReplacementForToken(tokens[1], False) is None:
+                    tokens[1] = self._MacroNotDefinedValue
+                else:
+                    tokens[1] = self._MacroDefinedValue
+                return " ".join(tokens)
+
+            replace = len(tokens) > 1 and tokens[0].lower() in ["!if", "!elseif"]
+
+        if "$(" not in line:
+            return line
+
+        self._GetMacroView()
+        return _MACRO_REFERENCE.sub(self._macro_expanders[replace], line)
 
     def ProcessConditional(self, text: str) -> bool:
         """Processes a conditional.
@@ -488,67 +688,30 @@ def EvaluateConditional(self, text: str) -> bool:
         self.Logger.debug(f"STAGE 1: {text}")
         text = self.ReplaceVariables(text)
         self.Logger.debug(f"STAGE 2: {text}")
-        tokens = self._TokenizeConditional(text)
-        self.Logger.debug(f"STAGE 3: {tokens}")
-        expression = self._ConvertTokensToPostFix(tokens)
-        self.Logger.debug(f"STAGE 4: {expression}")
-
-        # Now we evaluate the post fix expression
-        if len(expression) == 0:
-            raise RuntimeError(f"Malformed !if conditional expression {text} {expression}")
-        while len(expression) != 1:
-            first_operand_index = -1
-            # find the first operator
-            for index, item in enumerate(expression):
-                if self._IsOperator(item):
-                    first_operand_index = index
-                    break
-            if first_operand_index == -1:
-                raise RuntimeError(f"We didn't find an operator to execute in {expression}: {text}")
-            operand = expression[first_operand_index]
-
-            if operand == "NOT":
-                # Special logic for handling the not
-                if first_operand_index < 1:
-                    raise RuntimeError(f"We have a stray operand {operand}")
-                # grab the operand right before the NOT and invert it
-                operator1_raw = expression[first_operand_index - 1]
-                operator1 = self.ConvertToInt(operator1_raw)
-                result = not operator1
-                # grab what was before the operator and the operand, then squish it all together
-                new_expression = expression[: first_operand_index - 1] if first_operand_index > 1 else []
-                new_expression += [
-                    result,
-                ] + expression[first_operand_index + 1 :]
-                expression = new_expression
-            else:
-                if first_operand_index < 2:
-                    raise RuntimeError(f"We have a stray operand {operand}")
-                operator1 = expression[first_operand_index - 2]
-                operator2 = expression[first_operand_index - 1]
-
-                do_invert = False
-                # check if we have a special operator that has a combined not on it
-                if str(operand).startswith("!+"):
-                    operand = operand[2:]
-                    do_invert = True
-                # compute the result now that we have the three things we need
-                result = self.ComputeResult(operator1, operand, operator2)
-
-                if do_invert:
-                    result = not result
-                # grab what was before the operator and the operand, then smoosh it all together
-                new_expression = expression[: first_operand_index - 2] if first_operand_index > 2 else []
-                new_expression += [
-                    result,
-                ] + expression[first_operand_index + 1 :]
-                expression = new_expression
-
-        final = self.ConvertToInt(expression[0])
-        self.Logger.debug(f" FINAL {expression} {final}")
+        final = self.CompileConditional(text).Evaluate(self)
+        self.Logger.debug(f" FINAL {final}")
 
         return bool(final)
 
+    @classmethod
+    def CompileConditional(cls: "BaseParser", text: str) -> "CompiledConditional":
+        """Compiles a conditional expression, with macros already replaced, into a reusable evaluator.
+
+        Compiled expressions are cached by their text, so identical conditionals (such as those repeated across DSC
+        and FDF includes) are only tokenized and converted to postfix once. A conditional whose macros are replaced
+        with different values has different text, and is compiled separately.
+
+        Args:
+            text (str): The conditional expression, without the leading !if / !elseif
+
+        Returns:
+            (CompiledConditional): The compiled expression
+
+        Raises:
+            (RuntimeError): If the expression is empty
+        """
+        return _compile_conditional(cls, text)
+
     @classmethod
     def _TokenizeConditional(cls: "BaseParser", text: str) -> str:
         """Takes in a string that has macros replaced."""
@@ -839,12 +1002,394 @@ def ResetParserState(self) -> None:
         self.Parsed = False
 
 
+class CompiledConditional(object):
+    """A conditional expression compiled to postfix, that can be evaluated any number of times.
+
+    Use `BaseParser.CompileConditional` to create (and cache) a compiled conditional.
+    """
+
+    __slots__ = ("text", "expression", "_ops")
+
+    # Kinds of items in the compiled expression
+    _OPERAND = 0
+    _NOT = 1
+    _OPERATOR = 2
+
+    def __init__(self, text: str, expression: list) -> "CompiledConditional":
+        """Inits the compiled conditional from a postfix expression.
+
+        Args:
+            text (str): The original expression text, used in error messages
+            expression (list): The postfix expression from `BaseParser._ConvertTokensToPostFix`
+        """
+        if len(expression) == 0:
+            raise RuntimeError(f"Malformed !if conditional expression {text} {expression}")
+        self.text = text
+        self.expression = tuple(expression)
+
+        # Classify each item once, so evaluation is a single pass with no string checks.
+        ops = []
+        for item in expression:
+            if not BaseParser._IsOperator(item):
+                ops.append((CompiledConditional._OPERAND, item, False))
+            elif item == "NOT":
+                ops.append((CompiledConditional._NOT, item, False))
+            elif item.startswith("!+"):
+                # a special operator that has a combined not on it
+                ops.append((CompiledConditional._OPERATOR, item[2:], True))
+            else:
+                ops.append((CompiledConditional._OPERATOR, item, False))
+        self._ops = tuple(ops)
+
+    def Evaluate(self, parser: "BaseParser") -> int:
+        """Evaluates the expression using a stack.
+
+        Args:
+            parser (BaseParser): The parser whose ComputeResult and ConvertToInt are used to evaluate each operation
+
+        Returns:
+            (int): The result of the expression
+        """
+        stack = []
+        for kind, value, do_invert in self._ops:
+            if kind == CompiledConditional._OPERAND:
+                stack.append(value)
+            elif kind == CompiledConditional._NOT:
+                # grab the operand right before the NOT and invert it
+                if len(stack) < 1:
+                    raise RuntimeError(f"We have a stray operand {value}")
+                stack.append(not parser.ConvertToInt(stack.pop()))
+            else:
+                if len(stack) < 2:
+                    raise RuntimeError(f"We have a stray operand {'!+' if do_invert else ''}{value}")
+                operator2 = stack.pop()
+                operator1 = stack.pop()
+                result = parser.ComputeResult(operator1, value, operator2)
+                stack.append(not result if do_invert else result)
+
+        if len(stack) != 1:
+            raise RuntimeError(f"We didn't find an operator to execute in {list(self.expression)}: {self.text}")
+        return parser.ConvertToInt(stack[0])
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_conditional(cls: type, text: str) -> CompiledConditional:
+    """Tokenizes and compiles a conditional expression. Cached per parser class and expression text."""
+    tokens = cls._TokenizeConditional(text)
+    return CompiledConditional(text, cls._ConvertTokensToPostFix(tokens))
+
+
+# Everything after the opening '[' of a section header, up to its closing ']'
+_SECTION_HEADER_REGEX = re.compile(r"\s*\[?([^\]]*)")
+
+
+@functools.lru_cache(maxsize=1024)
+def _split_section_header(line: str) -> tuple[tuple[str, str], ...]:
+    """Splits a section header into its (type, scope) items. Cached per header text."""
+    items = []
+    for item in _SECTION_HEADER_REGEX.match(line).group(1).split(","):
+        name, _, scope = item.partition(".")
+        items.append((name.strip(), scope.strip()))
+    return tuple(items)
+
+
+@functools.lru_cache(maxsize=1024)
+def _lex_section_header(line: str) -> tuple[str, tuple[str, ...]]:
+    """Returns the lower case type and the lower case scopes of a section header. Cached per header text."""
+    items = _split_section_header(line)
+    return items[0][0].lower(), tuple(scope.lower() or "common" for _, scope in items)
+
+
 class HashFileParser(BaseParser):
-    """Base class for Edk2 build files that use # for comments."""
+    """Base class for Edk2 build files that use # for comments.
+
+    Subclasses that implement `_Parse` (parse `self.Lines`) can support a defines-only parse: only the lines up to
+    the end of the `[Defines]` section are read, and every attribute listed in `_DEFERRED_ATTRIBUTES` is left unset
+    until first accessed, at which point the rest of the file is parsed.
+    """
+
+    # Attributes only filled by a full parse, mapped to a factory for their empty value.
+    _DEFERRED_ATTRIBUTES = {}
+    # Whether parsing expands macros, making InputVars and LocalVars part of the parse cache key.
+    _CACHE_USES_VARIABLES = True
+    # Whether `Lines` holds the file as it was read, so a parse result can be sent without it and read again.
+    _LINES_FROM_FILE = False
+    # Attributes that are inputs to, or helpers of, a parse rather than part of its result.
+    _UNCACHED_ATTRIBUTES = frozenset(
+        {
+            "Logger",
+            "RootPath",
+            "PPs",
+            "_Edk2PathUtil",
+            "_input_vars",
+            "_local_vars",
+            "_macro_view",
+            "_macro_expanders",
+            "_macro_view_key",
+            "_deferred_path",
+            "_lines_path",
+            "_source_stack",
+            "_source_lines",
+        }
+    )
 
     def __init__(self, log: str) -> "HashFileParser":
         """Inits an empty Parser for files that use # for comments.."""
         BaseParser.__init__(self, log)
+        self._deferred_path = None
+        self._lines_path = None
+        self._source_stack = []
+
+    def __getattr__(self, name: str) -> object:
+        """Completes a defines-only parse, or reads `Lines` again, when an attribute left unset is first accessed."""
+        if name in self._DEFERRED_ATTRIBUTES and self.__dict__.get("_deferred_path") is not None:
+            self._CompleteParse()
+            return getattr(self, name)
+        if name == "Lines" and self.__dict__.get("_lines_path") is not None:
+            self._ReadLines()
+            return self.Lines
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def _ParseCacheKey(self, filepath: str, *options: Hashable) -> Optional[tuple]:
+        """Returns the process-wide parse cache key for parsing filepath, or None if the cache is not enabled.
+
+        Must be called before parsing, as the key includes the variables the parse starts from.
+
+        Args:
+          filepath (str): absolute path to the file being parsed
+          *options (Hashable): parse options that change the result
+        """
+        if parse_cache.get_parse_cache() is None:
+            return None
+        fingerprint = (self.RootPath, tuple(self.PPs))
+        if self._CACHE_USES_VARIABLES:
+            for variables in (self.InputVars, self.LocalVars):
+                fingerprint += (tuple(sorted((str(name), repr(value)) for name, value in variables.items())),)
+        return parse_cache.make_key(type(self), os.path.abspath(filepath), fingerprint, options)
+
+    def _ParseState(self, with_lines: bool = True) -> dict:
+        """Returns the result of a parse as a dict of attributes, without the parser's inputs and helpers.
+
+        Args:
+          with_lines (bool): include `Lines`. If False, and `_LINES_FROM_FILE` is set, `Lines` is left out, to be
+            read again by `_DeferLines` after the state is loaded.
+        """
+        state = {name: value for name, value in vars(self).items() if name not in self._UNCACHED_ATTRIBUTES}
+        state["LocalVars"] = _MacroDict(self.LocalVars)
+        if not with_lines and self._LINES_FROM_FILE:
+            state.pop("Lines", None)
+        return state
+
+    def _LoadParseState(self, state: dict) -> None:
+        """Loads a parse result returned by `_ParseState` into this parser."""
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def _RestoreCachedParse(self, key: Optional[tuple]) -> bool:
+        """Loads a cached parse result into this parser.
+
+        Args:
+          key (tuple): key from `_ParseCacheKey`
+
+        Returns:
+            (bool): True if a current result was found and loaded
+        """
+        cache = parse_cache.get_parse_cache()
+        if key is None or cache is None:
+            return False
+        state = cache.load(key)
+        if state is None:
+            return False
+        self.Logger.debug("Using cached parse of file: %s", key[2])
+        self._LoadParseState(state)
+        return True
+
+    def _StoreCachedParse(self, key: Optional[tuple], dependencies: Iterable[str] = ()) -> None:
+        """Stores this parser's result in the parse cache.
+
+        Args:
+          key (tuple): key from `_ParseCacheKey`, computed before parsing
+          dependencies (Iterable[str]): absolute paths of any other files read while parsing
+        """
+        cache = parse_cache.get_parse_cache()
+        if key is None or cache is None:
+            return
+        signatures = [parse_cache.file_signature(path) for path in dependencies]
+        if None in signatures:
+            return
+        try:
+            result = parse_cache.ParseResult.from_state(self._ParseState(), signatures)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            self.Logger.debug("Not caching parse of file %s: %s", key[2], e)
+            return
+        cache.put(key, result)
+
+    def _ParseResolvedPath(self, filepath: str, defines_only: bool = False) -> None:
+        """Reads and parses a file with `_Parse`, going through the parse cache.
+
+        Args:
+          filepath (str): absolute path to the file
+          defines_only (bool): only parse the `[Defines]` section, deferring the rest (see `_DeferFullParse`)
+        """
+        key = self._ParseCacheKey(filepath, defines_only)
+        if self._RestoreCachedParse(key):
+            if defines_only:
+                self._DeferFullParse(filepath)
+            return
+
+        if defines_only:
+            self.Lines = self._ReadDefinesSection(filepath)
+        else:
+            with open(filepath, "r") as f:
+                self.Lines = f.readlines()
+        self._Parse()
+        self._StoreCachedParse(key)
+        if defines_only:
+            self._DeferFullParse(filepath)
+
+    def _ReadDefinesSection(self, filepath: str) -> list[str]:
+        """Reads the lines of a file up to, but not including, the section header following `[Defines]`.
+
+        Args:
+          filepath (str): absolute path to the file
+
+        Returns:
+            (list[str]): the lines read
+        """
+        lines = []
+        in_defines = False
+        with open(filepath, "r") as f:
+            for line in f:
+                sline = line.lstrip()
+                if sline.startswith("["):
+                    if in_defines:
+                        break
+                    in_defines = sline.lower().startswith("[defines")
+                lines.append(line)
+        return lines
+
+    def _DeferFullParse(self, filepath: str) -> None:
+        """Unsets the attributes a defines-only parse skipped, so that accessing one parses the whole file.
+
+        Args:
+          filepath (str): absolute path to the file to parse on demand
+        """
+        self._deferred_path = filepath
+        for name in self._DEFERRED_ATTRIBUTES:
+            self.__dict__.pop(name, None)
+
+    def _CompleteParse(self) -> None:
+        """Parses the whole file after a defines-only parse.
+
+        Values already found in the `[Defines]` section are parsed again and overwritten with the same values.
+        """
+        filepath = self._deferred_path
+        self._deferred_path = None
+        for name, factory in self._DEFERRED_ATTRIBUTES.items():
+            setattr(self, name, factory())
+        self.Logger.debug("Completing defines-only parse of file: %s", filepath)
+        self._lines_path = None
+        with open(filepath, "r") as f:
+            self.Lines = f.readlines()
+        self._Parse()
+
+    def _DeferLines(self, filepath: str) -> None:
+        """Unsets `Lines`, so that accessing it reads the file again.
+
+        For a parse state loaded without its lines, see `_ParseState`.
+
+        Args:
+          filepath (str): absolute path to the file the lines were read from
+        """
+        self._lines_path = filepath
+        self.__dict__.pop("Lines", None)
+
+    def _ReadLines(self) -> None:
+        """Reads `Lines` again from the file given to `_DeferLines`."""
+        filepath = self._lines_path
+        self._lines_path = None
+        with open(filepath, "r") as f:
+            self.Lines = f.readlines()
+
+    def _SourceLines(self, path: Optional[str], lines: list[str]) -> Iterator[tuple[Optional[str], int, str]]:
+        """Yields each line of a file, and of the files it includes, without recursing per include level.
+
+        Lines pushed with `_PushSourceLines` while iterating are yielded next, before the rest of the file that
+        included them, so a consumer expands an `!include` by pushing its lines when it reaches it.
+
+        Args:
+          path (str): path of the file the lines came from
+          lines (list[str]): the raw lines of the file
+
+        Yields:
+            (tuple): the path of the file, the 1-based line number in that file, and the raw line
+        """
+        stack = self._source_stack = [[path, lines, 0]]
+        while stack:
+            frame = stack[-1]
+            path, lines, index = frame
+            if index >= len(lines):
+                stack.pop()
+                continue
+            frame[2] = index + 1
+            yield path, index + 1, lines[index]
+
+    def _PushSourceLines(self, path: Optional[str], lines: list[str]) -> None:
+        """Queues the lines of an included file to be yielded next by the active `_SourceLines` iterator.
+
+        Args:
+          path (str): path of the included file
+          lines (list[str]): the raw lines of the included file
+        """
+        if lines:
+            self._source_stack.append([path, lines, 0])
+
+    @staticmethod
+    def SplitSectionHeader(line: str) -> tuple[tuple[str, str], ...]:
+        """Splits a section header into the type and scope of each of its comma separated items.
+
+        `[LibraryClasses.X64, LibraryClasses.IA32.PEIM]` splits into
+        `(("LibraryClasses", "X64"), ("LibraryClasses", "IA32.PEIM"))`. The scope of an item without one is `""`.
+
+        Args:
+          line (str): the section header line
+        """
+        return _split_section_header(line)
+
+    def _LexSections(
+        self, lines: Iterable[str], expand_macros: bool = False
+    ) -> Iterator[tuple[str, tuple[str, ...], str, int]]:
+        """Yields the content lines of a file, each with the section it belongs to, in a single pass.
+
+        Comments and surrounding whitespace are removed and empty lines skipped. Section header lines are consumed
+        rather than yielded. Lines are lexed lazily, so a `DEFINE` the consumer records applies to the lines after it.
+        Headers are cached, so all the sections opened by the same header text share one `scopes` tuple.
+
+        Args:
+          lines (Iterable[str]): the raw lines of the file
+          expand_macros (bool): replace the macros in each line before yielding it
+
+        Yields:
+            (tuple): the lower case type of the current section (`""` before the first header), the lower case scope
+                of each item of its header (`"common"` if unscoped, i.e. `("x64", "ia32.peim")`), the stripped line,
+                and its 1-based line number
+        """
+        section, scopes = "", ()
+        strip_comment = self.StripComment
+        replace_variables = self.ReplaceVariables
+        for lineno, line in enumerate(lines, 1):
+            sline = strip_comment(line)
+            if not sline:
+                continue
+            if expand_macros and ("$(" in sline or "!" in sline):
+                sline = replace_variables(sline)
+            sline = sline.strip()
+            if not sline:
+                continue
+            if sline[0] == "[":
+                section, scopes = _lex_section_header(sline)
+                continue
+            yield section, scopes, sline, lineno
 
     def StripComment(self, line: str) -> str:
         """Removes a comment from a line.
@@ -855,6 +1400,11 @@ def StripComment(self, line: str) -> str:
         if "#" not in line:
             return line.strip()
 
+        # Without a quote before the first '#', that '#' cannot be inside a string and starts the comment.
+        code, _, _ = line.partition("#")
+        if '"' not in code and "'" not in code:
+            return code.rstrip()
+
         result = []
         inside_quotes = False
         quote_char = None
@@ -886,7 +1436,7 @@ def ParseNewSection(self, line: str) -> tuple[bool, str]:
           line (str): line representing a new section.
         """
         if line.count("[") == 1 and line.count("]") == 1:  # new section
-            section = line.strip().lstrip("[").split(".")[0].split(",")[0].rstrip("]").strip()
-            self.CurrentFullSection = line.strip().lstrip("[").split(",")[0].rstrip("]").strip()
+            section, scope = _split_section_header(line)[0]
+            self.CurrentFullSection = f"{section}.{scope}" if scope else section
             return (True, section)
         return (False, "")
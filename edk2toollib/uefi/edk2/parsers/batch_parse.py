@@ -0,0 +1,227 @@
+# @file batch_parse.py
+# Parses many EDK2 metadata files at once, optionally across a pool of worker processes.
+#
+# Copyright (c) Microsoft Corporation
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+##
+"""Parses many EDK2 metadata files at once, optionally across a pool of worker processes.
+
+Files are handed to the workers in chunks, so the cost of sending the path converter and the parse cache settings to
+a worker, and of sending the results back, is paid once per chunk rather than once per file. Each worker returns only
+the pickled parse results, which are loaded into a fresh parser in the calling process. The raw lines of INF, DEC and
+FDF files are not sent back: they are read again the first time a parser's `Lines` is accessed.
+
+Example:
+    ```python
+    from edk2toollib.uefi.edk2.parsers.batch_parse import parse_many
+
+    for result in parse_many(inf_paths, "inf", n_jobs=-1, edk2path=edk2path):
+        if result.error is not None:
+            logging.warning("Failed to parse %s: %s", result.path, result.error)
+        else:
+            print(result.parser.Dict["BASE_NAME"])
+    ```
+"""
+
+import math
+import os
+import pickle
+from typing import Optional, Union
+
+from joblib import Parallel, delayed, effective_n_jobs
+
+from edk2toollib.uefi.edk2.parsers import parse_cache
+from edk2toollib.uefi.edk2.parsers.base_parser import HashFileParser
+from edk2toollib.uefi.edk2.parsers.dec_parser import DecParser
+from edk2toollib.uefi.edk2.parsers.dsc_parser import DscParser
+from edk2toollib.uefi.edk2.parsers.fdf_parser import FdfParser
+from edk2toollib.uefi.edk2.parsers.inf_parser import InfParser
+from edk2toollib.uefi.edk2.path_utilities import Edk2Path, Edk2PathSnapshot
+
+# File kind (lower case extension) to the parser type for it
+PARSERS = {
+    "dec": DecParser,
+    "dsc": DscParser,
+    "fdf": FdfParser,
+    "inf": InfParser,
+}
+
+# Chunks handed to each worker process. More chunks balance uneven files better, fewer chunks amortize more IPC.
+CHUNKS_PER_JOB = 4
+
+
+class ParsedFile(object):
+    """The result of parsing one of the files given to `parse_many`.
+
+    Attributes:
+        path (str): the path of the file, as given to `parse_many`
+        parser (HashFileParser): the parser holding the parse result, or None if parsing failed
+        error (Exception): the exception raised while parsing the file, or None if parsing succeeded
+    """
+
+    __slots__ = ("path", "parser", "error")
+
+    def __init__(
+        self, path: str, parser: Optional[HashFileParser] = None, error: Optional[Exception] = None
+    ) -> "ParsedFile":
+        """Inits the result of parsing a file."""
+        self.path = path
+        self.parser = parser
+        self.error = error
+
+    def __repr__(self) -> str:
+        """String representation of the result."""
+        outcome = f"error={self.error!r}" if self.error is not None else f"parser={type(self.parser).__name__}"
+        return f"ParsedFile(path={self.path!r}, {outcome})"
+
+
+def parse_many(
+    paths: list[str],
+    kind: Optional[str] = None,
+    n_jobs: int = -1,
+    edk2path: Optional[Union[Edk2Path, Edk2PathSnapshot]] = None,
+    input_vars: Optional[dict] = None,
+    defines_only: bool = False,
+    chunksize: Optional[int] = None,
+) -> list[ParsedFile]:
+    """Parses many INF, DEC, DSC or FDF files.
+
+    A file that fails to parse does not stop the others from being parsed: its error is recorded in its result.
+
+    Args:
+        paths (list[str]): paths of the files to parse, absolute or relative to the workspace or a package path
+        kind (str): the kind of all the files (`inf`, `dec`, `dsc` or `fdf`), or None to go by each file's extension
+        n_jobs (int): number of worker processes, as for joblib; 1 parses every file in this process
+        edk2path (Edk2Path | Edk2PathSnapshot): path converter given to each parser. Required for DSC and FDF files
+            and for relative paths. Workers are sent a snapshot of it.
+        input_vars (dict): input variables given to each parser
+        defines_only (bool): only parse the `[Defines]` section of INF and DEC files. The rest of a file is parsed,
+            in this process, the first time one of its other parsed attributes is accessed.
+        chunksize (int): number of files handed to a worker at once. Defaults to spreading the files over
+            `CHUNKS_PER_JOB` chunks per worker.
+
+    Returns:
+        (list[ParsedFile]): the result for each file, in the order of `paths`
+
+    Raises:
+        (ValueError): if `kind` is not a supported kind of file
+    """
+    if kind is not None and kind.lower() not in PARSERS:
+        raise ValueError(f"Unsupported kind of file: {kind}. Expected one of {', '.join(PARSERS)}.")
+    paths = list(paths)
+    kind = kind.lower() if kind is not None else None
+
+    jobs = effective_n_jobs(n_jobs)
+    if jobs == 1 or len(paths) < 2:
+        return [_parse_file(path, kind, edk2path, input_vars, defines_only) for path in paths]
+
+    if chunksize is None:
+        chunksize = math.ceil(len(paths) / (jobs * CHUNKS_PER_JOB))
+    chunksize = max(1, chunksize)
+    chunks = [paths[i : i + chunksize] for i in range(0, len(paths), chunksize)]
+
+    snapshot = edk2path.Snapshot() if isinstance(edk2path, Edk2Path) else edk2path
+    # Worker processes do not share this process's parse cache, so pass on its settings to enable the same one
+    cache = parse_cache.get_parse_cache()
+    cache_config = cache.config() if cache is not None else None
+    chunk_results = Parallel(n_jobs=n_jobs)(
+        delayed(_parse_chunk)(chunk, kind, snapshot, input_vars, defines_only, cache_config) for chunk in chunks
+    )
+
+    results = []
+    for chunk, chunk_result in zip(chunks, chunk_results):
+        for path, (state, error) in zip(chunk, chunk_result):
+            if error is not None:
+                results.append(ParsedFile(path, error=error))
+                continue
+            parser = _new_parser(_parser_type(path, kind), edk2path, input_vars)
+            parser._LoadParseState(pickle.loads(state))
+            if parser._LINES_FROM_FILE:
+                parser._DeferLines(parser.Path)
+            if defines_only and parser._DEFERRED_ATTRIBUTES:
+                parser._DeferFullParse(parser.Path)
+            results.append(ParsedFile(path, parser))
+    return results
+
+
+def _parser_type(path: str, kind: Optional[str]) -> type:
+    """Returns the parser type for a file."""
+    if kind is None:
+        kind = os.path.splitext(path)[1].lstrip(".").lower()
+        if kind not in PARSERS:
+            raise ValueError(f"Unsupported kind of file: {path}")
+    return PARSERS[kind]
+
+
+def _new_parser(
+    parser_type: type, edk2path: Optional[Union[Edk2Path, Edk2PathSnapshot]], input_vars: Optional[dict]
+) -> HashFileParser:
+    """Returns an empty parser, configured with the path converter and input variables."""
+    parser = parser_type()
+    if edk2path is not None:
+        parser.SetEdk2Path(edk2path)
+    if input_vars:
+        parser.SetInputVars(dict(input_vars))
+    return parser
+
+
+def _parse_file(
+    path: str,
+    kind: Optional[str],
+    edk2path: Optional[Union[Edk2Path, Edk2PathSnapshot]],
+    input_vars: Optional[dict],
+    defines_only: bool,
+) -> ParsedFile:
+    """Parses a single file, recording any error raised rather than raising it.
+
+    The path is resolved first, so a file that cannot be found is recorded as a `FileNotFoundError` for every kind of
+    parser, rather than as whatever error the parser raises when given no path.
+    """
+    try:
+        parser = _new_parser(_parser_type(path, kind), edk2path, input_vars)
+        resolved = parser.FindPath(path)
+        if resolved is None:
+            raise FileNotFoundError(path)
+        if defines_only and parser._DEFERRED_ATTRIBUTES:
+            parser.ParseFile(resolved, defines_only=True)
+        else:
+            parser.ParseFile(resolved)
+    except Exception as e:
+        return ParsedFile(path, error=e)
+    return ParsedFile(path, parser)
+
+
+def _parse_chunk(
+    paths: list[str],
+    kind: Optional[str],
+    edk2path: Optional[Edk2PathSnapshot],
+    input_vars: Optional[dict],
+    defines_only: bool,
+    cache_config: Optional[dict],
+) -> list[tuple[Optional[bytes], Optional[Exception]]]:
+    """Parses a chunk of files in a worker process, returning the pickled parse state (without lines) or error of each.
+
+    Each state is pickled here, so a file whose state cannot be sent back to the calling process gets an error
+    rather than failing the whole chunk.
+    """
+    if cache_config is not None:
+        parse_cache.enable_parse_cache(**cache_config)
+    results = []
+    for path in paths:
+        result = _parse_file(path, kind, edk2path, input_vars, defines_only)
+        if result.error is None:
+            try:
+                results.append((pickle.dumps(result.parser._ParseState(with_lines=False)), None))
+                continue
+            except Exception as e:
+                result.error = RuntimeError(f"Unable to send back the parse result: {type(e).__name__}: {e}")
+
+        error = result.error
+        try:
+            pickle.loads(pickle.dumps(error))
+        except Exception:
+            # An error that cannot be sent back to the calling process must not fail the whole chunk
+            error = RuntimeError(f"{type(error).__name__}: {error}")
+        results.append((None, error))
+    return results
@@ -7,13 +7,20 @@
 ##
 """Code to help parse an Edk2 Build Report."""
 
+import io
 import logging
+import math
 import os
 from enum import Enum
-from typing import Optional
+from typing import Callable, Iterator, Optional, Union
+
+from joblib import Parallel, delayed, effective_n_jobs
 
 import edk2toollib.uefi.edk2.path_utilities as pu
 
+# Chunks of module regions handed to each worker process by BuildReport.BasicParse
+CHUNKS_PER_JOB = 4
+
 
 class ModuleSummary(object):
     """Object to represent a module within the Build Report.
@@ -29,10 +36,23 @@ class ModuleSummary(object):
         WorkspacePath (str): workspace root
         PackagePathList (list): list of package paths
         FvName (str): Name of Fv
+        pathConverter (Edk2Path | Edk2PathSnapshot): path utilities for library instances with absolute paths
     """
 
-    def __init__(self, content: str, ws: str, packagepatahlist: list, pathconverter: pu.Edk2Path) -> "ModuleSummary":
-        """Inits an empty Module Summary Object."""
+    def __init__(
+        self,
+        content: str,
+        ws: str,
+        packagepatahlist: list,
+        pathconverter: Optional[
+            Union[pu.Edk2Path, pu.Edk2PathSnapshot, Callable[[], Union[pu.Edk2Path, pu.Edk2PathSnapshot]]]
+        ],
+    ) -> "ModuleSummary":
+        """Inits an empty Module Summary Object.
+
+        `pathconverter` may also be a callable returning the path utilities, which is only called if they are needed,
+        or None to leave library instance paths as they are listed in the report.
+        """
         self._RawContent = content
         self.Guid = ""
         self.Name = ""
@@ -47,6 +67,25 @@ def __init__(self, content: str, ws: str, packagepatahlist: list, pathconverter:
         self.FvName = None
         self.pathConverter = pathconverter
 
+    @property
+    def pathConverter(self) -> Union[pu.Edk2Path, pu.Edk2PathSnapshot]:
+        """Path utilities for library instances with absolute paths, fetched the first time they are needed."""
+        if callable(self._pathConverter):
+            self._pathConverter = self._pathConverter()
+        return self._pathConverter
+
+    @pathConverter.setter
+    def pathConverter(
+        self,
+        value: Optional[Union[pu.Edk2Path, pu.Edk2PathSnapshot, Callable[[], Union[pu.Edk2Path, pu.Edk2PathSnapshot]]]],
+    ) -> None:
+        self._pathConverter = value
+
+    def _RelativeLibraryPath(self, lib_instance: str) -> str:
+        """Converts a library instance path to an edk2 path, leaving it as is if it cannot be converted."""
+        RelativePath = self.pathConverter.GetEdk2RelativePathFromAbsolutePath(lib_instance)
+        return lib_instance if RelativePath is None else RelativePath
+
     def Parse(self) -> None:
         """Parses the Module summary object."""
         inPcdSection = False
@@ -124,11 +163,9 @@ def Parse(self) -> None:
                             self.NullLibraryCount += 1
 
                         # Take absolute path and convert to EDK build path
-                        RelativePath = self.pathConverter.GetEdk2RelativePathFromAbsolutePath(lib_instance)
-                        if RelativePath is not None:
-                            self.Libraries[lib_class] = RelativePath
-                        else:
-                            self.Libraries[lib_class] = lib_instance
+                        if self._pathConverter is not None:
+                            lib_instance = self._RelativeLibraryPath(lib_instance)
+                        self.Libraries[lib_class] = lib_instance
                         i += 1
                         continue
 
@@ -209,7 +246,8 @@ class BuildReport(object):
         Workspace (str): Workspace root
         PackagesPathList (list): List of package paths
         ProtectedWords (dict): Dict of protected words
-        PathConverter (Edk2Path): path utilities
+        PathConverter (Edk2Path | Edk2PathSnapshot): path utilities, built from the workspace and package paths the
+            first time they are needed unless one is given
     """
 
     class RegionTypes(Enum):
@@ -220,15 +258,36 @@ class RegionTypes(Enum):
         MODULE = "MODULE"
         UNKNOWN = "UNKNOWN"
 
-    def __init__(self, filepath: str, ws: str, packagepathcsv: str, protectedWordsDict: dict) -> "RegionTypes":
-        """Inits an empty BuildReport object."""
+    # Lines marking the start and the end of each region of the report
+    REGION_START = ">" + "=" * 118 + "<"
+    REGION_END = "<" + "=" * 118 + ">"
+    # Approximate number of characters read from the report at a time
+    READ_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        filepath: str,
+        ws: str,
+        packagepathcsv: str,
+        protectedWordsDict: dict,
+        pathobj: Optional[Union[pu.Edk2Path, pu.Edk2PathSnapshot]] = None,
+    ) -> "RegionTypes":
+        """Inits an empty BuildReport object.
+
+        Args:
+            filepath (str): path to the build report
+            ws (str): workspace root
+            packagepathcsv (str): comma separated package paths
+            protectedWordsDict (dict): words to replace in the report, and what to replace them with
+            pathobj (Edk2Path | Edk2PathSnapshot): path converter for the workspace and package paths, to share one
+                that was already built. If not given, one is built the first time it is needed.
+        """
         self.PlatformName = ""
         self.DscPath = ""
         self.FdfPath = ""
         self.BuildOutputDir = ""
         self.ReportFile = filepath
         self.Modules = {}  # fill this in with objects of ModuleSummary type
-        self._ReportContents = ""
         self._Regions = []  # fill this in with tuple (type, start, end)
         self.Workspace = ws  # needs to contain the trailing slash
         self.PackagePathList = []
@@ -237,54 +296,79 @@ def __init__(self, filepath: str, ws: str, packagepathcsv: str, protectedWordsDi
             if len(a) > 0:
                 self.PackagePathList.append(a)
         self.ProtectedWords = protectedWordsDict
-        self.PathConverter = pu.Edk2Path(self.Workspace, self.PackagePathList)
+        self.PathConverter = pathobj
+        self._ComponentIndex = None  # lower case, edk2 relative InfPath to (key in Modules, ModuleSummary)
+
+    @property
+    def PathConverter(self) -> Union[pu.Edk2Path, pu.Edk2PathSnapshot]:
+        """The path converter for the workspace and package paths.
+
+        Building one walks every package path, so it is only built the first time it is needed.
+        """
+        return self._GetPathConverter()
+
+    @PathConverter.setter
+    def PathConverter(self, value: Optional[Union[pu.Edk2Path, pu.Edk2PathSnapshot]]) -> None:
+        self._PathConverter = value
+
+    def _GetPathConverter(self) -> Union[pu.Edk2Path, pu.Edk2PathSnapshot]:
+        """Returns the path converter, building it if needed.
+
+        Modules are handed this bound method rather than a local function so that they, and the report, can still be
+        pickled before their path converter is needed.
+        """
+        if self._PathConverter is None:
+            self._PathConverter = pu.Edk2Path(self.Workspace, self.PackagePathList)
+        return self._PathConverter
 
     #
     # do region level parsing
     # to get the layout, lists, and dictionaries setup.
     #
-    def BasicParse(self) -> None:
+    def BasicParse(self, n_jobs: int = 1) -> None:
         """Performs region level parsing.
 
-        Gets the layout, lists, and dictionaries setup.
+        Gets the layout, lists, and dictionaries setup. The report is read once, a line at a time, and each module
+        region is parsed as soon as its end is read, so only the region being read (and the FD regions, which are
+        parsed last) is held in memory.
+
+        With `n_jobs` other than 1, the module regions are parsed in worker processes instead. Each worker is handed
+        the byte offsets of its regions and reads them from the report itself. Worker processes take a moment to
+        start, so this only pays off for large reports.
+
+        Args:
+            n_jobs (int): number of processes to parse module regions in, as for `joblib.Parallel`
         """
         if not os.path.isfile(self.ReportFile):
             raise Exception("Report File path invalid!")
 
-        # read report
-        f = open(self.ReportFile, "r")
-        self._ReportContents = [x.strip() for x in f.readlines()]
-        f.close()
-        #
-        # replace protected words
-        #
-        for k, v in self.ProtectedWords.items():
-            self._ReportContents = [x.replace(k, v) for x in self._ReportContents]
-
         logging.debug("Report File is: %s" % self.ReportFile)
-        logging.debug("Input report had %d lines of content" % len(self._ReportContents))
 
-        #
-        # parse thru and find the regions and basic info at top
-        # this is a little hacky in that internal operations could
-        # fail but it doesn't seem critical
-        #
-        linenum = self._GetNextRegionStart(0)
-        while linenum is not None:
-            start = linenum
-            end = self._GetEndOfRegion(start)
-            type = self._GetRegionType(start)
-            self._Regions.append((type, start, end))
-            linenum = self._GetNextRegionStart(linenum)
-            logging.debug("Found a region of type: %s start: %d end: %d" % (type, start, end))
+        parallel = effective_n_jobs(n_jobs) > 1
+        header = []
+        fd_regions = []
+        module_spans = []
+        for type, start, end, lines, span in self._ReadRegions(header, offsets=parallel):
+            logging.debug("Found a region of type: %s start: %d end: %s" % (type, start, end))
+            if type == BuildReport.RegionTypes.MODULE:
+                if parallel:
+                    module_spans.append(span)
+                    continue
+                mod = ModuleSummary(lines, self.Workspace, self.PackagePathList, self._GetPathConverter)
+                mod.Parse()
+                mod._RawContent = []
+                self.Modules[mod.Guid] = mod
+            # if FD region parse out all INFs in the all of the flash, once all modules are parsed
+            elif type == BuildReport.RegionTypes.FD:
+                fd_regions.append(lines)
+        if module_spans:
+            self._ParseModuleRegions(module_spans, n_jobs)
+        self._ComponentIndex = None
 
         #
-        # Parse the basic header of the report.
-        # we do it after parsing region because we
-        # can limit scope to 0 - first start
+        # Parse the basic header of the report, everything before the first region
         #
-        for n in range(self._Regions[0][1]):  # loop thru from 0 to start of first region
-            line = self._ReportContents[n].strip()
+        for line in header:
             line_partitioned = line.partition(":")
             if line_partitioned[2] == "":
                 continue
@@ -299,26 +383,109 @@ def BasicParse(self) -> None:
             elif key == "output path":
                 self.BuildOutputDir = value
 
-        #
-        # now for each module summary
-        # parse it
-        for r in self._Regions:
-            if r[0] == BuildReport.RegionTypes.MODULE:
-                mod = ModuleSummary(
-                    self._ReportContents[r[1] : r[2]], self.Workspace, self.PackagePathList, self.PathConverter
-                )
-                mod.Parse()
-                self.Modules[mod.Guid] = mod
-
         # now that all modules are parsed lets parse the FD region so we can get the FV name for each module
-        for r in self._Regions:
-            # if FD region parse out all INFs in the all of the flash
-            if r[0] == BuildReport.RegionTypes.FD:
-                self._ParseFdRegionForModules(self._ReportContents[r[1] : r[2]])
+        for lines in fd_regions:
+            self._ParseFdRegionForModules(lines)
+
+    def _ReadRegions(
+        self, header: list[str], offsets: bool = False
+    ) -> Iterator[tuple["BuildReport.RegionTypes", int, Optional[int], list, Optional[tuple]]]:
+        """Reads the report once, yielding each region as soon as its end is read.
+
+        The report is read a block of lines at a time, and each line is stripped and has its protected words replaced
+        as it is read.
+
+        Args:
+            header (list[str]): receives the lines before the first region
+            offsets (bool): also work out where each region's lines are in the report file
+
+        Yields:
+            (tuple): the region type, the line number of its first line, the line number of its last line (None if the
+                report ends before the region does), its lines, and the encoding of the report and the byte offsets of
+                the start and the end of its lines (None unless `offsets` is set)
+        """
+        buffer = []  # the lines since the start of the first region whose end is not read yet
+        open_regions = []  # (start, index in buffer, byte offset) of each region whose end is not read yet
+        linenum = -1
+        offset = line_offset = prev_offset = 0  # byte offsets after, and of the start of, the current and prior line
+        self._Regions = []
+
+        # Lines are split as in the default newline mode, but keep their line endings so their sizes can be counted
+        with open(self.ReportFile, "r", newline="") as f:
+            encoding = f.encoding
+            while True:
+                block = f.readlines(self.READ_SIZE)
+                if not block:
+                    break
+                sizes = [len(line.encode(encoding)) for line in block] if offsets else None
+                block = _replace_protected_words([line.strip() for line in block], self.ProtectedWords)
+
+                for i, line in enumerate(block):
+                    linenum += 1
+                    if offsets:
+                        prev_offset, line_offset = line_offset, offset
+                        offset += sizes[i]
+                    if not open_regions:
+                        if line == self.REGION_START:
+                            open_regions.append((linenum + 1, 0, offset))
+                        elif not self._Regions:
+                            header.append(line)
+                        continue
+
+                    if line == self.REGION_END:
+                        # The last line of a region is the one before the line before its end marker
+                        for start, index, start_offset in open_regions:
+                            span = (encoding, start_offset, prev_offset) if offsets else None
+                            yield self._EndRegion(start, linenum - 1, buffer[index:-1], span)
+                        buffer = []
+                        open_regions = []
+                        continue
+
+                    buffer.append(line)
+                    if line == self.REGION_START:
+                        open_regions.append((linenum + 1, len(buffer), offset))
+
+        for start, index, start_offset in open_regions:
+            yield self._EndRegion(start, None, buffer[index:], (encoding, start_offset, offset) if offsets else None)
+        logging.debug("Input report had %d lines of content" % (linenum + 1))
+
+    def _EndRegion(
+        self, start: int, end: Optional[int], lines: list[str], span: Optional[tuple]
+    ) -> tuple["BuildReport.RegionTypes", int, Optional[int], list, Optional[tuple]]:
+        """Records a region whose end was read, returning it."""
+        type = self._GetRegionType(lines[0] if lines else "")
+        self._Regions.append((type, start, end))
+        return type, start, end, lines, span
+
+    def _ParseModuleRegions(self, spans: list[tuple], n_jobs: int) -> None:
+        """Parses module regions in worker processes, adding the modules in the order of their regions.
+
+        The workers leave library instance paths as they are listed in the report. They are converted here, so the
+        path converter is only built if a module has libraries.
+        """
+        chunksize = max(1, math.ceil(len(spans) / (effective_n_jobs(n_jobs) * CHUNKS_PER_JOB)))
+        chunks = [spans[i : i + chunksize] for i in range(0, len(spans), chunksize)]
+        chunk_states = Parallel(n_jobs=n_jobs)(
+            delayed(_parse_module_regions)(self.ReportFile, chunk, self.Workspace, self.ProtectedWords)
+            for chunk in chunks
+        )
+        for states in chunk_states:
+            for state in states:
+                mod = ModuleSummary([], self.Workspace, self.PackagePathList, self._GetPathConverter)
+                mod.__dict__.update(state)
+                for lib_class, lib_instance in mod.Libraries.items():
+                    mod.Libraries[lib_class] = mod._RelativeLibraryPath(lib_instance)
+                self.Modules[mod.Guid] = mod
 
     def FindComponentByInfPath(self, InfPath: str) -> Optional["ModuleSummary"]:
         """Attempts to find the Component the Inf is apart of.
 
+        Lookups go through an index of the modules by InfPath. It is built by the first lookup after `BasicParse`,
+        and can be rebuilt at any time with `IndexComponents`. A module found in the index is only returned if it is
+        still in `Modules` under the same key with the same InfPath. Otherwise, or if the InfPath is not in the index,
+        `Modules` is searched directly and the index is updated with the result, so adding, replacing or changing
+        modules never gives a stale result.
+
         Args:
             InfPath: Inf Path
 
@@ -326,16 +493,47 @@ def FindComponentByInfPath(self, InfPath: str) -> Optional["ModuleSummary"]:
             (ModuleSummary): Module if found
             (None): If not found
         """
-        for k, v in self.Modules.items():
-            if os.path.isabs(v.InfPath):
-                v.InfPath = self.PathConverter.GetEdk2RelativePathFromAbsolutePath(v.InfPath)
-            if v.InfPath.lower() == InfPath.lower():
-                logging.debug("Found Module by InfPath: %s" % InfPath)
-                return v
+        if self._ComponentIndex is None:
+            self.IndexComponents()
+
+        path = InfPath.lower()
+        entry = self._ComponentIndex.get(path)
+        if entry is not None and self.Modules.get(entry[0]) is entry[1] and entry[1].InfPath.lower() == path:
+            v = entry[1]
+        else:
+            v = self._SearchComponents(path)
+        if v is not None:
+            logging.debug("Found Module by InfPath: %s" % InfPath)
+            return v
 
         logging.error("Failed to find Module by InfPath %s" % InfPath)
         return None
 
+    def IndexComponents(self) -> None:
+        """Rebuilds the index of the modules by InfPath used by `FindComponentByInfPath`.
+
+        Absolute InfPaths are converted to edk2 relative ones. If several modules have the same InfPath, the first
+        one in `Modules` is indexed.
+        """
+        self._ComponentIndex = {}
+        for k, v in self.Modules.items():
+            self._ComponentIndex.setdefault(self._RelativeInfPath(v).lower(), (k, v))
+
+    def _SearchComponents(self, path: str) -> Optional["ModuleSummary"]:
+        """Searches `Modules` for the first module with a lower case InfPath, updating its entry in the index."""
+        for k, v in self.Modules.items():
+            if self._RelativeInfPath(v).lower() == path:
+                self._ComponentIndex[path] = (k, v)
+                return v
+        self._ComponentIndex.pop(path, None)
+        return None
+
+    def _RelativeInfPath(self, module: "ModuleSummary") -> str:
+        """Converts the InfPath of a module to an edk2 relative path if it is absolute, returning it."""
+        if os.path.isabs(module.InfPath):
+            module.InfPath = self.PathConverter.GetEdk2RelativePathFromAbsolutePath(module.InfPath) or module.InfPath
+        return module.InfPath
+
     def _ParseFdRegionForModules(self, rawcontents: str) -> None:
         FvName = None
         index = 0
@@ -374,41 +572,7 @@ def _ParseFdRegionForModules(self, rawcontents: str) -> None:
 
         return
 
-    #
-    # Get the start of region
-    #
-    def _GetNextRegionStart(self, number: int) -> Optional[int]:
-        lineNumber = number
-        while lineNumber < len(self._ReportContents):
-            if (
-                self._ReportContents[lineNumber]
-                == ">======================================================================================================================<"
-            ):  # noqa: E501
-                return lineNumber + 1
-            lineNumber += 1
-        logging.debug("Failed to find a Start Next Region after lineNumber: %d" % number)
-        # didn't find new region
-        return None
-
-    #
-    # Get the end of region
-    #
-    def _GetEndOfRegion(self, number: int) -> Optional[int]:
-        lineNumber = number
-        while lineNumber < len(self._ReportContents):
-            if (
-                self._ReportContents[lineNumber]
-                == "<======================================================================================================================>"
-            ):  # noqa: E501
-                return lineNumber - 1
-            lineNumber += 1
-
-        logging.debug("Failed to find a End Region after lineNumber: %d" % number)
-        # didn't find new region
-        return None
-
-    def _GetRegionType(self, lineNumber: int) -> "BuildReport.RegionTypes":
-        line = self._ReportContents[lineNumber].strip()
+    def _GetRegionType(self, line: str) -> "BuildReport.RegionTypes":
         if line == "Firmware Device (FD)":
             return BuildReport.RegionTypes.FD
         elif line == "Platform Configuration Database Report":
@@ -417,3 +581,41 @@ def _GetRegionType(self, lineNumber: int) -> "BuildReport.RegionTypes":
             return BuildReport.RegionTypes.MODULE
         else:
             return BuildReport.RegionTypes.UNKNOWN
+
+
+def _replace_protected_words(lines: list[str], words: dict) -> list[str]:
+    """Replaces the protected words in a block of lines, in the order they are listed, as if line by line.
+
+    Each word is replaced in all the lines with a single str.replace over the joined block, rather than in each line
+    separately.
+    """
+    if not words:
+        return lines
+    if any("\n" in k or "\n" in v for k, v in words.items()):
+        # Words spanning lines, or replacements adding some, must not change how the block splits into lines
+        for k, v in words.items():
+            lines = [x.replace(k, v) for x in lines]
+        return lines
+
+    text = original = "\n".join(lines)
+    for k, v in words.items():
+        text = text.replace(k, v)
+    return lines if text is original else text.split("\n")
+
+
+def _parse_module_regions(report_file: str, spans: list[tuple], ws: str, protected_words: dict) -> list[dict]:
+    """Parses module regions of a report in a worker process, returning the parsed attributes of each module."""
+    states = []
+    with open(report_file, "rb") as f:
+        for encoding, start, end in spans:
+            f.seek(start)
+            text = io.TextIOWrapper(io.BytesIO(f.read(max(0, end - start))), encoding=encoding, newline="")
+            lines = _replace_protected_words([line.strip() for line in text.readlines()], protected_words)
+
+            mod = ModuleSummary(lines, ws, [], None)
+            mod.Parse()
+            state = vars(mod).copy()
+            for key in ("_RawContent", "WorkspacePath", "PackagePathList", "_pathConverter"):
+                del state[key]
+            states.append(state)
+    return states
@@ -173,6 +173,30 @@ class DecParser(HashFileParser):
         Path (str): path to the DEC file
     """
 
+    _DEFERRED_ATTRIBUTES = {
+        "Lines": list,
+        "LibraryClasses": list,
+        "PPIs": list,
+        "Protocols": list,
+        "Guids": list,
+        "Pcds": list,
+        "IncludePaths": list,
+    }
+
+    _CACHE_USES_VARIABLES = False
+    _LINES_FROM_FILE = True
+    # Section type prefix (lower case) to the entry type and attribute collecting the section's entries. The
+    # entries of the sections mapped to None are parsed by `_Parse` itself.
+    SECTION_ENTRIES = {
+        "defines": None,
+        "libraryclasses": (LibraryClassDeclarationEntry, "LibraryClasses"),
+        "protocols": (ProtocolDeclarationEntry, "Protocols"),
+        "guids": (GuidDeclarationEntry, "Guids"),
+        "ppis": (PpiDeclarationEntry, "PPIs"),
+        "pcd": None,
+        "includes": None,
+    }
+
     def __init__(self) -> "DecParser":
         """Init an empty Dec Parser."""
         HashFileParser.__init__(self, "DecParser")
@@ -190,106 +214,36 @@ def __init__(self) -> "DecParser":
 
     def _Parse(self) -> None:
         """Parses the EDK2 DEC file."""
-        InDefinesSection = False
-        InLibraryClassSection = False
-        InProtocolsSection = False
-        InGuidsSection = False
-        InPPISection = False
-        InPcdSection = False
         InStructuredPcdDeclaration = False
-        InIncludesSection = False
-
-        for line in self.Lines:
-            sline = self.StripComment(line)
-
-            if sline is None or len(sline) < 1:
-                continue
-
-            if InDefinesSection:
-                if sline.strip()[0] == "[":
-                    InDefinesSection = False
-                else:
-                    if sline.count("=") == 1:
-                        tokens = sline.split("=", 1)
-                        self.Dict[tokens[0].strip()] = tokens[1].strip()
-                        if self.PackageName is None and tokens[0].strip() == "PACKAGE_NAME":
-                            self.PackageName = self.Dict["PACKAGE_NAME"]
-                        continue
-
-            elif InLibraryClassSection:
-                if sline.strip()[0] == "[":
-                    InLibraryClassSection = False
-                else:
-                    t = LibraryClassDeclarationEntry(self.PackageName, sline)
-                    self.LibraryClasses.append(t)
-                    continue
-
-            elif InProtocolsSection:
-                if sline.strip()[0] == "[":
-                    InProtocolsSection = False
-                else:
-                    t = ProtocolDeclarationEntry(self.PackageName, sline)
-                    self.Protocols.append(t)
-                    continue
-
-            elif InGuidsSection:
-                if sline.strip()[0] == "[":
-                    InGuidsSection = False
-                else:
-                    t = GuidDeclarationEntry(self.PackageName, sline)
-                    self.Guids.append(t)
-                    continue
-
-            elif InPcdSection:
-                if sline.strip()[0] == "[":
-                    InPcdSection = False
-                elif sline.strip()[0] == "}":
+        current = None
+        kind = None  # the SECTION_ENTRIES prefix of the current section
+
+        for section, _, sline, _ in self._LexSections(self.Lines):
+            if section != current:
+                current = section
+                kind = next((prefix for prefix in self.SECTION_ENTRIES if section.startswith(prefix)), None)
+
+            if kind == "defines":
+                if sline.count("=") == 1:
+                    tokens = sline.split("=", 1)
+                    self.Dict[tokens[0].strip()] = tokens[1].strip()
+                    if self.PackageName is None and tokens[0].strip() == "PACKAGE_NAME":
+                        self.PackageName = self.Dict["PACKAGE_NAME"]
+
+            elif kind == "pcd":
+                if sline[0] == "}":
                     InStructuredPcdDeclaration = False
-                else:
-                    if InStructuredPcdDeclaration:
-                        continue
-                    t = PcdDeclarationEntry(self.PackageName, sline)
-                    self.Pcds.append(t)
-                    if sline.rstrip()[-1] == "{":
+                elif not InStructuredPcdDeclaration:
+                    self.Pcds.append(PcdDeclarationEntry(self.PackageName, sline))
+                    if sline[-1] == "{":
                         InStructuredPcdDeclaration = True
-                    continue
-
-            elif InIncludesSection:
-                if sline.strip()[0] == "[":
-                    InIncludesSection = False
-                else:
-                    self.IncludePaths.append(sline.strip())
-                    continue
-
-            elif InPPISection:
-                if sline.strip()[0] == "[":
-                    InPPISection = False
-                else:
-                    t = PpiDeclarationEntry(self.PackageName, sline)
-                    self.PPIs.append(t)
-                    continue
-
-            # check for different sections
-            if sline.strip().lower().startswith("[defines"):
-                InDefinesSection = True
-
-            elif sline.strip().lower().startswith("[libraryclasses"):
-                InLibraryClassSection = True
 
-            elif sline.strip().lower().startswith("[protocols"):
-                InProtocolsSection = True
+            elif kind == "includes":
+                self.IncludePaths.append(sline)
 
-            elif sline.strip().lower().startswith("[guids"):
-                InGuidsSection = True
-
-            elif sline.strip().lower().startswith("[ppis"):
-                InPPISection = True
-
-            elif sline.strip().lower().startswith("[pcd"):
-                InPcdSection = True
-
-            elif sline.strip().lower().startswith("[includes"):
-                InIncludesSection = True
+            elif kind is not None:
+                entry_type, attribute = self.SECTION_ENTRIES[kind]
+                getattr(self, attribute).append(entry_type(self.PackageName, sline))
 
         self.Parsed = True
 
@@ -303,12 +257,14 @@ def ParseStream(self, stream: IO) -> None:
         self.Lines = stream.readlines()
         self._Parse()
 
-    def ParseFile(self, filepath: str) -> None:
+    def ParseFile(self, filepath: str, defines_only: bool = False) -> None:
         """Parse the supplied file.
 
         Args:
           filepath (str): path to dec file to parse.  Can be either an absolute path or
             relative to your CWD
+          defines_only (bool): Only parse the `[Defines]` section (Dict, PackageName). The rest of the file is
+            parsed the first time any other parsed attribute, such as Guids, is accessed.
         """
         self.Logger.debug("Parsing file: %s" % filepath)
         if not os.path.isabs(filepath):
@@ -317,7 +273,4 @@ def ParseFile(self, filepath: str) -> None:
             fp = filepath
         self.Path = fp
 
-        f = open(fp, "r")
-        self.Lines = f.readlines()
-        f.close()
-        self._Parse()
+        self._ParseResolvedPath(fp, defines_only)
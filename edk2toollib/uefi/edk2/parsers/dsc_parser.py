@@ -7,12 +7,25 @@
 ##
 """Code to help parse DSC files."""
 
+import heapq
 import logging
+import math
 import os
 import re
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
-from edk2toollib.uefi.edk2.parsers.base_parser import HashFileParser
+from joblib import Parallel, delayed, effective_n_jobs
+
+from edk2toollib.uefi.edk2.parsers.base_parser import _MACRO_REFERENCE, HashFileParser, _MacroDict
+from edk2toollib.uefi.edk2.path_utilities import Edk2Path, Edk2PathSnapshot
+
+# Kinds of lexed DSC lines, see DscParser._LexLines
+_LINE_TEXT = 0  # content that cannot change the conditional state, the section or the includes
+_LINE_SECTION = 1  # section header without macros
+_LINE_CONDITIONAL = 2  # !if, !ifdef, !ifndef, !elseif, !else or !endif
+_LINE_OTHER = 3  # any other line, resolved and processed in full
+_CONDITIONAL_OPENERS = ("!if", "!ifdef", "!ifndef")
+_CONDITIONAL_DIRECTIVES = _CONDITIONAL_OPENERS + ("!elseif", "!else", "!endif")
 
 
 class DscParser(HashFileParser):
@@ -41,6 +54,15 @@ class DscParser(HashFileParser):
     SECTION_COMPONENT = "components"
     SECTION_REGEX = re.compile(r"\[(.*)\]")
     OVERRIDE_REGEX = re.compile(r"\<(.*)\>")
+    PCD_TOKEN_REGEX = re.compile(r"[\w\.]+")
+    # Per-parse lookup tables; they only speed up a parse and are not part of its result.
+    _UNCACHED_ATTRIBUTES = HashFileParser._UNCACHED_ATTRIBUTES | {
+        "_include_lines",
+        "_found_paths",
+        "_define_order",
+        "_define_dependents",
+        "_expandable_defines",
+    }
 
     def __init__(self) -> "HashFileParser":
         """Init an empty Parser."""
@@ -60,19 +82,24 @@ def __init__(self) -> "HashFileParser":
         self.PcdValueDict = {}
         self._no_fail_mode = False
         self._dsc_file_paths = set()  # This includes the full paths for every DSC that makes up the file
+        self._include_lines = {}  # include file path -> lines, so each include is read once per parse
+        self._found_paths = {}  # (path parts, target directory) -> FindPath result
+        self._define_order = {}  # define name -> position in LocalVars
+        self._define_dependents = {}  # undefined macro -> defines whose value references it
+        self._expandable_defines = set()  # defines whose value still references a defined macro
 
     def ReplacePcds(self, line: str) -> str:
-        """Attempts to replace a token if it is a PCD token."""
+        """Attempts to replace a token if it is a PCD token.
+
+        Every token of the line is looked up in `PcdValueDict` in a single pass, so the cost does not grow with the
+        number of known PCDs and nothing needs rebuilding when `RegisterPcds` adds one.
+        """
         if line.startswith("!if"):
-            for token in re.split(r"[^\w\.]", line):
-                if token in self.PcdValueDict:
-                    line = line.replace(token, self.PcdValueDict[token])
+            values = self.PcdValueDict
+            return self.PCD_TOKEN_REGEX.sub(lambda match: values.get(match.group(0), match.group(0)), line)
         return line
 
-    def __ParseLine(self, Line: str, file_name: Optional[str] = None, lineno: int = None) -> tuple:
-        line_stripped = self.StripComment(Line).strip()
-        if len(line_stripped) < 1:
-            return ("", [], None)
+    def __ParseLine(self, line_stripped: str, file_name: Optional[str] = None, lineno: int = None) -> tuple:
         line_stripped = self.ReplacePcds(line_stripped)
         line_resolved = self.ReplaceVariables(line_stripped)
         if self.ProcessConditional(line_resolved):
@@ -96,10 +123,7 @@ def __ParseLine(self, Line: str, file_name: Optional[str] = None, lineno: int =
                 raise FileNotFoundError(include_file)
             self.Logger.debug("Opening Include File %s" % sp)
             self._PushTargetFile(sp)
-            lf = open(sp, "r")
-            loc = lf.readlines()
-            lf.close()
-            return ("", loc, sp)
+            return ("", self._ReadIncludeFile(sp), sp)
 
         # check for new section
         (IsNew, Section) = self.ParseNewSection(line_resolved)
@@ -109,6 +133,11 @@ def __ParseLine(self, Line: str, file_name: Optional[str] = None, lineno: int =
             self.Logger.debug("FullSection: %s" % self.CurrentFullSection)
             return (line_resolved, [], None)
 
+        self.__ParseContentLine(line_resolved, file_name, lineno)
+        return (line_resolved, [], None)
+
+    def __ParseContentLine(self, line_resolved: str, file_name: Optional[str], lineno: Optional[int]) -> None:
+        """Processes an active line that is not a conditional, an include or a section header."""
         # process line in x64 components
         if self.CurrentFullSection.upper() == "COMPONENTS.X64":
             if self.ParsingInBuildOption > 0:
@@ -128,7 +157,6 @@ def __ParseLine(self, Line: str, file_name: Optional[str] = None, lineno: int =
 
             self.ParsingInBuildOption = self.ParsingInBuildOption + line_resolved.count("{")
             self.ParsingInBuildOption = self.ParsingInBuildOption - line_resolved.count("}")
-            return (line_resolved, [], None)
 
         # process line in ia32 components
         elif self.CurrentFullSection.upper() == "COMPONENTS.IA32":
@@ -154,7 +182,6 @@ def __ParseLine(self, Line: str, file_name: Optional[str] = None, lineno: int =
 
             self.ParsingInBuildOption = self.ParsingInBuildOption + line_resolved.count("{")
             self.ParsingInBuildOption = self.ParsingInBuildOption - line_resolved.count("}")
-            return (line_resolved, [], None)
 
         # process line in other components
         elif "COMPONENTS" in self.CurrentFullSection.upper():
@@ -174,7 +201,6 @@ def __ParseLine(self, Line: str, file_name: Optional[str] = None, lineno: int =
 
             self.ParsingInBuildOption = self.ParsingInBuildOption + line_resolved.count("{")
             self.ParsingInBuildOption = self.ParsingInBuildOption - line_resolved.count("}")
-            return (line_resolved, [], None)
 
         # process line in library class section (don't use full name)
         elif self.CurrentSection.upper() == "LIBRARYCLASSES":
@@ -182,22 +208,12 @@ def __ParseLine(self, Line: str, file_name: Optional[str] = None, lineno: int =
                 p = self.ParseInfPathLib(line_resolved)
                 self.Libs.append(p)
                 self.Logger.debug("Found Library in Library Class Section: %s" % p)
-            return (line_resolved, [], None)
         # process line in PCD section
         elif self.CurrentSection.upper().startswith("PCDS"):
             if self.RegisterPcds(line_resolved):
                 self.Logger.debug("Found a Pcd in a PCD section")
-            return (line_resolved, [], None)
-        else:
-            return (line_resolved, [], None)
-
-    def __ParseDefineLine(self, Line: str) -> tuple:
-        line_stripped = self.StripComment(Line).strip()
-        if len(line_stripped) < 1:
-            return ("", [])
 
-        # this line needs to be here to resolve any symbols inside the !include lines, if any
-        self.RegisterPcds(line_stripped)
+    def __ParseDefineLine(self, line_stripped: str) -> tuple:
         line_stripped = self.ReplacePcds(line_stripped)
         line_resolved = self.ReplaceVariables(line_stripped)
         if self.ProcessConditional(line_resolved):
@@ -221,10 +237,7 @@ def __ParseDefineLine(self, Line: str) -> tuple:
             if sp is None:
                 raise FileNotFoundError(include_file)
             self._PushTargetFile(sp)
-            lf = open(sp, "r")
-            loc = lf.readlines()
-            lf.close()
-            return ("", loc)
+            return ("", self._ReadIncludeFile(sp))
 
         # check for new section
         (IsNew, Section) = self.ParseNewSection(line_resolved)
@@ -234,6 +247,11 @@ def __ParseDefineLine(self, Line: str) -> tuple:
             self.Logger.debug("FullSection: %s" % self.CurrentFullSection)
             return (line_resolved, [])
 
+        self.__ParseDefineContentLine(line_resolved)
+        return (line_resolved, [])
+
+    def __ParseDefineContentLine(self, line_resolved: str) -> None:
+        """Records the define on an active line that is not a conditional, an include or a section header."""
         # process line based on section we are in
         if (self.CurrentSection == "DEFINES") or (self.CurrentSection == "BUILDOPTIONS"):
             if line_resolved.count("=") >= 1:
@@ -245,27 +263,99 @@ def __ParseDefineLine(self, Line: str) -> tuple:
                     left = leftside[0]
                 right = tokens[1].strip()
 
-                self.LocalVars[left] = right
                 self.Logger.debug("Key,values found:  %s = %s" % (left, right))
+                self._SetDefine(left, right)
+
+    def _SetDefine(self, name: str, value: str) -> None:
+        """Sets a define and resolves the symbols of the defines that depend on it.
 
-                # iterate through the existed LocalVars and try to resolve the symbols
-                for var in self.LocalVars:
-                    self.LocalVars[var] = self.ReplaceVariables(self.LocalVars[var])
-                return (line_resolved, [])
+        A define whose value references macros that are all undefined cannot change until one of them is set, so it
+        is only revisited when one is. Expanding a define flattens references to defined macros, so only a define
+        whose value expands to a reference to another defined macro, such as in a chain of unresolved defines, is
+        revisited on every DEFINE. Defines are revisited in LocalVars order, as a resolution pass over all of
+        LocalVars would.
+        """
+        if name not in self._define_order:
+            self._define_order[name] = len(self._define_order)
+        self.LocalVars[name] = value
+
+        queued = self._expandable_defines
+        self._expandable_defines = set()
+        queued.update(self._define_dependents.pop(name, ()))
+        queued.add(name)
+        order = self._define_order
+        heap = [(order[var], var) for var in queued]
+        heapq.heapify(heap)
+        while heap:
+            position, var = heapq.heappop(heap)
+            queued.discard(var)
+            value = self.LocalVars.get(var)
+            if not isinstance(value, str) or "$(" not in value:
+                continue
+            resolved = self.ReplaceVariables(value)
+            self.LocalVars[var] = resolved
+            if "$(" in resolved:
+                self._TrackDefine(var, resolved)
+            if resolved == value:
+                continue
+            # Defines depending on this one are revisited by this pass if they come after it, else by the next one
+            for dependent in self._define_dependents.pop(var, ()):
+                if order[dependent] <= position:
+                    self._expandable_defines.add(dependent)
+                elif dependent not in queued:
+                    queued.add(dependent)
+                    heapq.heappush(heap, (order[dependent], dependent))
+
+    def _TrackDefine(self, name: str, value: str) -> None:
+        """Records what can change a define whose value still references a macro."""
+        view = self._GetMacroView()
+        references = _MACRO_REFERENCE.findall(value)
+        if value.lstrip().startswith("!") or any(reference in view for reference in references):
+            self._expandable_defines.add(name)
         else:
-            return (line_resolved, [])
+            for reference in references:
+                self._define_dependents.setdefault(reference, set()).add(name)
+
+    def _IndexDefines(self) -> None:
+        """Records the order of the existing defines and what can change those that still reference a macro."""
+        self._define_order = {name: position for position, name in enumerate(self.LocalVars)}
+        self._define_dependents = {}
+        self._expandable_defines = set()
+        for name, value in list(self.LocalVars.items()):
+            if isinstance(value, str) and "$(" in value:
+                self._TrackDefine(name, value)
+
+    @property
+    def LibraryClassToInstanceDict(self) -> dict:
+        """Key (Library class) Value (list of absolute paths of the instances, or None if not found).
+
+        The instance paths are only looked up the first time this is accessed after parsing, as most consumers only
+        need `ScopedLibraryDict`. Each instance is looked up relative to the file that referenced it, and each
+        distinct (instance, directory) pair is looked up once.
+        """
+        if self._unresolved_library_instances:
+            pending = self._unresolved_library_instances
+            self._unresolved_library_instances = []
+            found = {}  # (instance, directory) -> path, including failed lookups so each is reported once
+            for library_class, instance, source_file in pending:
+                key = (instance, os.path.dirname(source_file) if source_file is not None else None)
+                if key not in found:
+                    found[key] = self._FindPathFrom(key[1], instance) if instance is not None else None
+                self._library_class_to_instance.setdefault(library_class, []).append(found[key])
+        return self._library_class_to_instance
+
+    @LibraryClassToInstanceDict.setter
+    def LibraryClassToInstanceDict(self, value: dict) -> None:
+        self._library_class_to_instance = value
+        self._unresolved_library_instances = []  # (library class, instance, file that referenced it)
 
     def ParseInfPathLib(self, line: str) -> str:
         """Parses a line with an INF path Lib."""
         if line.count("|") > 0:
-            line_parts = []
             c = line.split("|")[0].strip()
             i = line.split("|")[1].strip()
-            if c in self.LibraryClassToInstanceDict:
-                line_parts = self.LibraryClassToInstanceDict.get(c)
-            sp = self.FindPath(i)
-            line_parts.append(sp)
-            self.LibraryClassToInstanceDict[c] = line_parts
+            # The path is resolved relative to the current file, but only once LibraryClassToInstanceDict is used
+            self._unresolved_library_instances.append((c, i, self.TargetFilePath))
             return line.split("|")[1].strip()
         else:
             return line.strip().split()[0]
@@ -279,23 +369,34 @@ def __ProcessMore(self, lines: list, file_name: Optional[str] = None) -> None:
 
         Everything is resolved to a final state
         """
-        if len(lines) == 0:
-            return
-        for index in range(len(lines)):
+        for source_file, _, (lineno, line_stripped, kind, info, _) in self._SourceLines(file_name, lines):
             # we try here so that we can catch exceptions from individual lines
             try:
-                raw_line = lines[index]
-                (line, add, new_file) = self.__ParseLine(raw_line, file_name=file_name, lineno=index + 1)
+                if kind == _LINE_TEXT:
+                    if self.InActiveCode():
+                        line = self.ReplaceVariables(line_stripped) if "$(" in line_stripped else line_stripped
+                        self.__ParseContentLine(line, source_file, lineno)
+                        self.Lines.append(line)
+                    continue
+                if kind == _LINE_SECTION:
+                    if self.InActiveCode():
+                        self.CurrentSection, self.CurrentFullSection = info
+                        self.Lines.append(line_stripped)
+                    continue
+                (line, add, new_file) = self.__ParseLine(line_stripped, file_name=source_file, lineno=lineno)
                 if len(line) > 0:
                     self.Lines.append(line)
-                self.__ProcessMore(add, file_name=new_file)
+                self._PushSourceLines(new_file, add)
+                if info is not None and kind == _LINE_CONDITIONAL and not self.InActiveCode():
+                    # skip the rest of the inactive branch, none of which can change the conditional state
+                    self._source_stack[-1][2] = info[0]
             except Exception as e:
                 # check if we're in no fail mode or not
                 if not self._no_fail_mode:  # if we are, fail
                     raise
                 else:
                     # otherwise, let the user know that we failed in the DSC
-                    self.Logger.warning(f"DSC Parser (No-Fail Mode): {raw_line}")
+                    self.Logger.warning(f"DSC Parser (No-Fail Mode): {line_stripped}")
                     self.Logger.warning(e)
 
     def __ProcessDefines(self, lines: list) -> None:
@@ -306,14 +407,29 @@ def __ProcessDefines(self, lines: list) -> None:
         Ideally this should be run until we reach stable state but this parser is not
         accurate and is more of an approximation of what the real parser does.
         """
-        if len(lines) == 0:
-            return
-        for raw_line in lines:
+        for _, _, (_, line_stripped, kind, info, is_pcd) in self._SourceLines(None, lines):
             # we want to catch exceptions here since we are doing includes as we potentially might blow up
             # we want to catch on a line by line basis
             try:
-                (line, add) = self.__ParseDefineLine(raw_line)
-                self.__ProcessDefines(add)
+                # this line needs to be here to resolve any symbols inside the !include lines, if any
+                if is_pcd:
+                    self.RegisterPcds(line_stripped)
+                if kind == _LINE_TEXT:
+                    if self.InActiveCode():
+                        line = self.ReplaceVariables(line_stripped) if "$(" in line_stripped else line_stripped
+                        self.__ParseDefineContentLine(line)
+                    continue
+                if kind == _LINE_SECTION:
+                    if self.InActiveCode():
+                        self.CurrentSection, self.CurrentFullSection = info
+                    continue
+                (line, add) = self.__ParseDefineLine(line_stripped)
+                self._PushSourceLines(None, add)
+                if info is not None and kind == _LINE_CONDITIONAL and not self.InActiveCode():
+                    # skip the rest of the inactive branch, still registering its PCDs as every line does here
+                    for pcd_line in info[1]:
+                        self.RegisterPcds(pcd_line)
+                    self._source_stack[-1][2] = info[0]
             except Exception:
                 # Since we're going to do this in ProcessMore, don't warn people if there's an exception
                 # otherwise, raise the exception and act normally
@@ -414,19 +530,14 @@ def _get_current_scope(self, scope_list: list[str], line: str, section_type: str
         if not match:
             return scope_list
 
+        items = self.SplitSectionHeader(match.group())
+
         # If the line is a section header, but not the correct section type, return []
-        elif not match.group().startswith(f"[{section_type}"):
+        if not items[0][0].lower().startswith(section_type):
             return []
 
-        # The line must be a section header and of the correct section type. Return it
-        current_section = []
-        section_list = match.group().strip("[]").split(",")
-
-        for section in section_list:
-            # Remove the section type and strip the leftover '.'. If it's empty after that, then it is actually "common"
-            section = section.replace(section_type, "").replace("Common", "common").strip().lstrip(".")
-            current_section.append(section or "common")
-        return current_section
+        # The line must be a section header and of the correct section type. An item without a scope is "common"
+        return [scope.lower() or "common" for _, scope in items]
 
     def _build_library_override_dictionary(self, lines: List[str]) -> None:
         library_override_dictionary = {"NULL": []}
@@ -476,25 +587,128 @@ def ResetParserState(self) -> None:
     def ParseFile(self, filepath: str) -> None:
         """Parses the DSC file at the provided path."""
         self.Logger.debug("Parsing file: %s" % filepath)
+        self._include_lines = {}
+        self._found_paths = {}
         sp = self.FindPath(filepath)
         if sp is None:
             raise FileNotFoundError(filepath)
+        key = self._ParseCacheKey(sp, self._no_fail_mode)
+        if self._RestoreCachedParse(key):
+            return
+        self._ParseResolvedFile(sp)
+        self._StoreCachedParse(key, self._dsc_file_paths)
+
+    def _ParseResolvedFile(self, sp: str) -> None:
+        """Parses the DSC file at an absolute path, using the current include and path lookup tables."""
         self._PushTargetFile(sp)
-        f = open(sp, "r")
         # expand all the lines and include other files
-        file_lines = f.readlines()
+        file_lines = self._ReadIncludeFile(sp)
+        self._IndexDefines()
         self.__ProcessDefines(file_lines)
         self.PcdValueDict = {}
         # reset the parser state before processing more
         self.ResetParserState()
         self._PushTargetFile(sp)
         self.__ProcessMore(file_lines, file_name=sp)
-        f.close()
 
         self._parse_libraries()
         self._parse_components()
         self.Parsed = True
 
+    def _FindPathFrom(self, target_dir: Optional[str], *p: str) -> Optional[str]:
+        """Finds a path like `BaseParser.FindPath`, remembering successful lookups for the current parse.
+
+        A DSC resolves the same library instances and include files many times, and each miss in
+        `BaseParser.FindPath` costs a filesystem probe per package path. Results depend on the
+        directory of the file referencing the path, so that is part of the key. Failed lookups are not
+        remembered so they are still reported every time. This memo is separate from the path
+        conversion cache of `Edk2Path`, which only the package path lookup goes through.
+        """
+        key = (p, target_dir)
+        found = self._found_paths.get(key)
+        if found is None:
+            found = super(DscParser, self)._FindPathFrom(target_dir, *p)
+            if found is not None:
+                self._found_paths[key] = found
+        return found
+
+    def _ReadIncludeFile(self, path: str) -> list:
+        """Returns the lines of an include file, as lexed by `_LexLines`, reading it from disk only once per parse.
+
+        Both the define pass and the full pass expand every `!include`, and platforms often
+        include the same fragment from several places. The returned list is shared and must
+        not be modified.
+        """
+        lines = self._include_lines.get(path)
+        if lines is None:
+            with open(path, "r") as f:
+                lines = self._LexLines(f)
+            self._include_lines[path] = lines
+        return lines
+
+    def _LexLines(self, lines: Iterable[str]) -> list[tuple]:
+        """Strips the comments of the lines of a file and classifies each line, independently of any variable.
+
+        Each non-empty line becomes a `(lineno, line_stripped, kind, info, is_pcd)` record: its 1-based line number,
+        the line without its comment and surrounding whitespace, its kind, what is known about it up front, and
+        whether `RegisterPcds` would take it as a PCD. The kinds are:
+
+        - `_LINE_TEXT`: a line that can neither change the conditional state nor become a section header or an
+          include once its macros are replaced. It only needs its macros replaced, and is skipped in inactive code.
+        - `_LINE_SECTION`: a section header without macros. `info` is its `CurrentSection` and `CurrentFullSection`.
+        - `_LINE_CONDITIONAL`: a conditional directive. For a directive whose next branch of the same block
+          (`!elseif`, `!else` or `!endif`) is in the same file, with only conditionals and lines that cannot change
+          the conditional state in between, `info` is the index of that branch and the lines in between that
+          register a PCD, so an inactive branch is skipped at once. Otherwise `info` is None.
+        - `_LINE_OTHER`: any other line, such as one starting with a macro or an `!include`.
+
+        Args:
+          lines (Iterable[str]): the raw lines of the file
+
+        Returns:
+            (list[tuple]): the records of the non-empty lines
+        """
+        records = []
+        branches = {}  # index of a conditional -> index of the next branch of its block
+        open_blocks = []
+        # number of lines before each record that can change the conditional state other than conditionals
+        unskippable = [0]
+        strip_comment = self.StripComment
+        for lineno, line in enumerate(lines, 1):
+            line_stripped = strip_comment(line).strip()
+            if not line_stripped:
+                continue
+            kind, info = _LINE_OTHER, None
+            # ProcessConditional splits a line with quotes at them, and fails on a single quote
+            skippable = line_stripped.count('"') != 1 and not line_stripped.startswith(("$(", '"'))
+            if line_stripped[0] == "!":
+                directive = line_stripped.partition('"')[0].split(None, 1)
+                if directive and directive[0].lower() in _CONDITIONAL_DIRECTIVES:
+                    kind = _LINE_CONDITIONAL
+                    if directive[0].lower() in _CONDITIONAL_OPENERS:
+                        open_blocks.append(len(records))
+                    elif open_blocks:
+                        branches[open_blocks.pop()] = len(records)
+                        if directive[0].lower() != "!endif":
+                            open_blocks.append(len(records))
+            elif skippable and "$(" not in line_stripped and line_stripped.count("[") == line_stripped.count("]") == 1:
+                # the same section as ParseNewSection, without changing the current one
+                kind = _LINE_SECTION
+                section, scope = self.SplitSectionHeader(line_stripped)[0]
+                info = (section.upper(), f"{section}.{scope}" if scope else section)
+            elif skippable and "[" not in line_stripped and "]" not in line_stripped:
+                kind = _LINE_TEXT
+            lower = line_stripped.lower()
+            is_pcd = "tokenspaceguid" in lower and "|" in line_stripped and "." in line_stripped
+            records.append([lineno, line_stripped, kind, info, is_pcd])
+            unskippable.append(unskippable[-1] + (kind != _LINE_CONDITIONAL and not skippable))
+
+        for start, end in branches.items():
+            if unskippable[end] == unskippable[start + 1]:
+                pcd_lines = tuple(record[1] for record in records[start + 1 : end] if record[4])
+                records[start][3] = (end, pcd_lines)
+        return [tuple(record) for record in records]
+
     def _PushTargetFile(self, targetFile: str) -> None:
         self.TargetFilePath = os.path.abspath(targetFile)
         self._dsc_file_paths.add(self.TargetFilePath)
@@ -532,3 +746,142 @@ def RegisterPcds(self, line: str) -> None:
             self.Logger.debug("Found a Pcd: %s" % p[0].strip())
             return True
         return False
+
+
+class DscTemplate(object):
+    """A DSC file that is read once and then evaluated for many combinations of input variables.
+
+    Evaluating a platform DSC for every TARGET, TARGET_ARCH and feature flag combination with a new `DscParser` reads
+    and locates every include file again each time. A template reads the DSC and every include whose path does not
+    depend on a variable up front, strips their comments and classifies their lines once (see `DscParser._LexLines`),
+    and shares that with each evaluation along with every path it has found. An evaluation then only replaces the
+    macros of the lines that use them, evaluates the conditionals, skipping inactive blocks whole, and processes the
+    active lines of each section. Includes whose paths depend on the input variables are read the first time an
+    evaluation needs them.
+
+    Example:
+        ```python
+        template = DscTemplate("PlatformPkg/Platform.dsc", edk2path)
+        combinations = [{"TARGET": target, "TARGET_ARCH": "X64"} for target in ("DEBUG", "RELEASE", "NOOPT")]
+        for input_vars, dsc in zip(combinations, template.EvaluateAll(combinations, n_jobs=-1)):
+            print(input_vars["TARGET"], len(dsc.Components), len(dsc.ScopedLibraryDict), len(dsc.PcdValueDict))
+        ```
+
+    Attributes:
+        Path (str): absolute path of the DSC file
+    """
+
+    def __init__(self, filepath: str, pathobj: Edk2Path, no_fail_mode: bool = False) -> "DscTemplate":
+        """Locates the DSC file and reads it.
+
+        Args:
+            filepath (str): path of the DSC file, absolute or relative to the workspace or a package path
+            pathobj (Edk2Path): the workspace and package paths to resolve files with
+            no_fail_mode (bool): evaluate with `DscParser.SetNoFailMode`
+
+        Raises:
+            FileNotFoundError: if the DSC file cannot be found
+        """
+        self._pathobj = pathobj
+        self._no_fail_mode = no_fail_mode
+        self._include_lines = {}
+        self._found_paths = {}
+        parser = self._NewParser({})
+        self.Path = parser.FindPath(filepath)
+        if self.Path is None:
+            raise FileNotFoundError(filepath)
+        self._ReadStaticIncludes(parser, self.Path)
+
+    @staticmethod
+    def _ReadStaticIncludes(parser: DscParser, path: str) -> None:
+        """Reads a file and, recursively, every file it includes with a path that does not depend on a variable.
+
+        Each include is looked up relative to the file that includes it, as an evaluation does. Includes that cannot
+        be found are left for an evaluation to report, as they may be in inactive code.
+        """
+        pending = [path]
+        while pending:
+            path = pending.pop()
+            if path in parser._include_lines:
+                continue
+            for record in parser._ReadIncludeFile(path):
+                tokens = record[1].split()
+                if len(tokens) > 1 and tokens[0].lower() == "!include" and "$(" not in tokens[1]:
+                    found = parser._FindPathFrom(os.path.dirname(path), tokens[1])
+                    if found is not None:
+                        pending.append(found)
+
+    def _NewParser(self, input_vars: dict) -> DscParser:
+        parser = DscParser().SetEdk2Path(self._pathobj).SetInputVars(_MacroDict(input_vars))
+        parser.SetNoFailMode(self._no_fail_mode)
+        parser._include_lines = self._include_lines
+        parser._found_paths = self._found_paths
+        return parser
+
+    def Evaluate(self, input_vars: dict) -> DscParser:
+        """Evaluates the DSC for one set of input variables.
+
+        Args:
+            input_vars (dict): the input variables, e.g. TARGET and TARGET_ARCH
+
+        Returns:
+            (DscParser): a parser holding the result, as if `ParseFile` had been called with these input variables
+        """
+        parser = self._NewParser(input_vars)
+        parser._ParseResolvedFile(self.Path)
+        return parser
+
+    def EvaluateAll(self, input_vars_list: list[dict], n_jobs: int = 1) -> list[DscParser]:
+        """Evaluates the DSC for each set of input variables.
+
+        With `n_jobs` other than 1, the sets are split into one chunk per worker process, and each worker receives
+        the lexed files and found paths once, with its chunk, rather than reading them again. Worker processes take a
+        moment to start, so this only pays off for large platforms or many combinations.
+
+        Args:
+            input_vars_list (list[dict]): the sets of input variables to evaluate
+            n_jobs (int): number of processes to evaluate in, as for `joblib.Parallel`
+
+        Returns:
+            (list[DscParser]): the results, in the same order as `input_vars_list`
+        """
+        jobs = effective_n_jobs(n_jobs)
+        if jobs == 1 or len(input_vars_list) < 2:
+            return [self.Evaluate(input_vars) for input_vars in input_vars_list]
+
+        # Combinations take about as long as each other, so one chunk per worker balances well enough and sends the
+        # tables to each worker only once.
+        chunksize = math.ceil(len(input_vars_list) / jobs)
+        chunks = [input_vars_list[i : i + chunksize] for i in range(0, len(input_vars_list), chunksize)]
+        snapshot = self._pathobj if isinstance(self._pathobj, Edk2PathSnapshot) else self._pathobj.Snapshot()
+        chunk_states = Parallel(n_jobs=n_jobs)(
+            delayed(_evaluate_dsc_template)(
+                self.Path, snapshot, self._no_fail_mode, self._include_lines, self._found_paths, chunk
+            )
+            for chunk in chunks
+        )
+        results = []
+        for chunk, states in zip(chunks, chunk_states):
+            for input_vars, state in zip(chunk, states):
+                parser = self._NewParser(input_vars)
+                parser._LoadParseState(state)
+                results.append(parser)
+        return results
+
+
+def _evaluate_dsc_template(
+    path: str,
+    pathobj: Edk2PathSnapshot,
+    no_fail_mode: bool,
+    include_lines: dict,
+    found_paths: dict,
+    input_vars_list: list[dict],
+) -> list[dict]:
+    """Evaluates a DscTemplate for a chunk of input variable sets in a worker process, returning each parse state."""
+    template = DscTemplate.__new__(DscTemplate)
+    template._pathobj = pathobj
+    template._no_fail_mode = no_fail_mode
+    template._include_lines = include_lines
+    template._found_paths = found_paths
+    template.Path = path
+    return [template.Evaluate(input_vars)._ParseState() for input_vars in input_vars_list]
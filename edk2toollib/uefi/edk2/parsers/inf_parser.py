@@ -8,7 +8,6 @@
 """Code to help parse EDK2 INF files."""
 
 import os
-import re
 
 from edk2toollib.uefi.edk2.parsers.base_parser import HashFileParser
 
@@ -51,9 +50,37 @@ class InfParser(HashFileParser):
     NOTE: Key / Value pairs determined by lines that contain a single =
     """
 
-    SECTION_REGEX = re.compile(r"\[(.*)\]")
-    SECTION_LIBRARY = re.compile(r"libraryclasses(?:\.([^,.\]]+))?[,.\]]", re.IGNORECASE)
-    SECTION_SOURCE = re.compile(r"sources(?:\.([^,.\]]+))?[,.\]]", re.IGNORECASE)
+    _DEFERRED_ATTRIBUTES = {
+        "Lines": list,
+        "PackagesUsed": list,
+        "LibrariesUsed": list,
+        "ScopedLibraryDict": dict,
+        "ScopedSourceDict": dict,
+        "ProtocolsUsed": list,
+        "GuidsUsed": list,
+        "PpisUsed": list,
+        "PcdsUsed": list,
+        "Sources": list,
+        "Binaries": list,
+    }
+    _LINES_FROM_FILE = True
+    # Section type prefix (lower case) to the attribute collecting the section's entries. No prefix is the start of
+    # another (`patchpcd` does not start with `pcd`), so a section type starts with at most one of them.
+    SECTION_LISTS = {
+        "packages": "PackagesUsed",
+        "libraryclasses": "LibrariesUsed",
+        "protocols": "ProtocolsUsed",
+        "ppis": "PpisUsed",
+        "guids": "GuidsUsed",
+        "pcd": "PcdsUsed",
+        "patchpcd": "PcdsUsed",
+        "fixedpcd": "PcdsUsed",
+        "featurepcd": "PcdsUsed",
+        "sources": "Sources",
+        "binaries": "Binaries",
+    }
+    # Distinct lengths of the SECTION_LISTS prefixes, so a section type is looked up by its prefix of each length
+    _SECTION_PREFIX_LENGTHS = sorted({len(prefix) for prefix in SECTION_LISTS})
 
     def __init__(self) -> "InfParser":
         """Inits an empty parser."""
@@ -91,210 +118,97 @@ def get_sources(self, arch_list: list[str]) -> list[str]:
             sources = sources + self.ScopedSourceDict.get(arch.lower(), []).copy()
         return list(set(sources))
 
-    def ParseFile(self, filepath: str) -> None:
-        """Parses the INF file provided."""
+    def _ParseSectionHeader(self, section: str, scopes: tuple[str, ...]) -> tuple[bool, list, dict, list[str]]:
+        """Determines where the entries of a section are recorded.
+
+        Args:
+            section (str): The lower case section type, i.e. `libraryclasses` for `[LibraryClasses.X64]`
+            scopes (tuple[str, ...]): The lower case scope of each item of the section header
+
+        Returns:
+            (tuple): Whether this is the defines section, the flat list collecting the section's entries (or None),
+                the arch-scoped dict also collecting them (or None), and the lower case archs they are scoped to.
+        """
+        collector = None
+        for length in self._SECTION_PREFIX_LENGTHS:
+            attribute = self.SECTION_LISTS.get(section[:length])
+            if attribute is not None:
+                collector = getattr(self, attribute)
+                break
+
+        scoped = None
+        if section == "libraryclasses":
+            scoped = self.ScopedLibraryDict
+        elif section == "sources":
+            scoped = self.ScopedSourceDict
+        archs = [scope.partition(".")[0] for scope in scopes]
+
+        return section.startswith("defines"), collector, scoped, archs
+
+    def ParseFile(self, filepath: str, defines_only: bool = False) -> None:
+        """Parses the INF file provided.
+
+        Args:
+            filepath (str): path to the INF file. Can be either an absolute path or relative to the workspace.
+            defines_only (bool): Only parse the `[Defines]` section (Dict, LibraryClass, SupportedPhases). The rest of
+                the file is parsed the first time any other parsed attribute, such as Sources, is accessed.
+        """
         self.Logger.debug("Parsing file: %s" % filepath)
         if not os.path.isabs(filepath):
             fp = self.FindPath(filepath)
         else:
             fp = filepath
         self.Path = fp
-        f = open(fp, "r")
-        self.Lines = f.readlines()
-        f.close()
-        InDefinesSection = False
-        InPackagesSection = False
-        InLibraryClassSection = False
-        InProtocolsSection = False
-        InGuidsSection = False
-        InPpiSection = False
-        InPcdSection = False
-        InSourcesSection = False
-        InBinariesSection = False
 
-        for line in self.Lines:
-            sline = self.StripComment(line)
+        self._ParseResolvedPath(fp, defines_only)
 
-            if sline is None or len(sline) < 1:
-                continue
-
-            sline = self.ReplaceVariables(sline)
+    def _Parse(self) -> None:
+        """Parses the lines of the INF file."""
+        in_defines = False
+        collector = None  # flat list receiving the current section's entries
+        scoped = None  # arch-scoped dict receiving the current section's entries
+        scoped_archs = []
+        current = None
 
-            if sline.strip().startswith("DEFINE"):
-                tokens = sline.strip().replace("DEFINE", "").split("=", 1)
+        for section, scopes, sline, _ in self._LexSections(self.Lines, expand_macros=True):
+            if sline.startswith("DEFINE"):
+                tokens = sline.replace("DEFINE", "").split("=", 1)
                 self.LocalVars[tokens[0].strip()] = tokens[1].strip()
                 self.Logger.info(f"Key,values found for local vars: {tokens[0].strip()}, {tokens[1].strip()}")
                 continue
 
-            elif InDefinesSection:
-                if sline.strip()[0] == "[":
-                    InDefinesSection = False
-                else:
-                    if sline.count("=") == 1:
-                        tokens = sline.split("=", 1)
-                        self.Dict[tokens[0].strip()] = tokens[1].strip()
-                        #
-                        # Parse Library class and phases in special manor
-                        #
-                        if tokens[0].strip().lower() == "library_class":
-                            self.LibraryClass = tokens[1].partition("|")[0].strip()
-                            self.Logger.debug("Library class found")
-                            if len(tokens[1].partition("|")[2].strip()) < 1:
-                                self.SupportedPhases = AllPhases
-                            elif tokens[1].partition("|")[2].strip().lower() == "base":
-                                self.SupportedPhases = AllPhases
-                            else:
-                                self.SupportedPhases = tokens[1].partition("|")[2].strip().split()
-
-                        self.Logger.debug("Key,values found:  %s = %s" % (tokens[0].strip(), tokens[1].strip()))
-
-                        continue
-
-            elif InPackagesSection:
-                if sline.strip()[0] == "[":
-                    InPackagesSection = False
-                else:
-                    self.PackagesUsed.append(sline.partition("|")[0].strip())
-                    continue
-
-            elif InLibraryClassSection:
-                if sline.strip()[0] == "[":
-                    InLibraryClassSection = False
-                else:
-                    self.LibrariesUsed.append(sline.partition("|")[0].strip())
-                    continue
-
-            elif InProtocolsSection:
-                if sline.strip()[0] == "[":
-                    InProtocolsSection = False
-                else:
-                    self.ProtocolsUsed.append(sline.partition("|")[0].strip())
-                    continue
-
-            elif InGuidsSection:
-                if sline.strip()[0] == "[":
-                    InGuidsSection = False
-                else:
-                    self.GuidsUsed.append(sline.partition("|")[0].strip())
-                    continue
-
-            elif InPcdSection:
-                if sline.strip()[0] == "[":
-                    InPcdSection = False
-                else:
-                    self.PcdsUsed.append(sline.partition("|")[0].strip())
-                    continue
-
-            elif InPpiSection:
-                if sline.strip()[0] == "[":
-                    InPpiSection = False
-                else:
-                    self.PpisUsed.append(sline.partition("|")[0].strip())
-                    continue
-
-            elif InSourcesSection:
-                if sline.strip()[0] == "[":
-                    InSourcesSection = False
-                else:
-                    self.Sources.append(sline.partition("|")[0].strip())
-                    continue
-
-            elif InBinariesSection:
-                if sline.strip()[0] == "[":
-                    InBinariesSection = False
-                else:
-                    self.Binaries.append(sline.partition("|")[0].strip())
-                    continue
-
-            # check for different sections
-            if sline.strip().lower().startswith("[defines"):
-                InDefinesSection = True
-
-            elif sline.strip().lower().startswith("[packages"):
-                InPackagesSection = True
-
-            elif sline.strip().lower().startswith("[libraryclasses"):
-                InLibraryClassSection = True
-
-            elif sline.strip().lower().startswith("[protocols"):
-                InProtocolsSection = True
-
-            elif sline.strip().lower().startswith("[ppis"):
-                InPpiSection = True
-
-            elif sline.strip().lower().startswith("[guids"):
-                InGuidsSection = True
-
-            elif (
-                sline.strip().lower().startswith("[pcd")
-                or sline.strip().lower().startswith("[patchpcd")
-                or sline.strip().lower().startswith("[fixedpcd")
-                or sline.strip().lower().startswith("[featurepcd")
-            ):
-                InPcdSection = True
-
-            elif sline.strip().lower().startswith("[sources"):
-                InSourcesSection = True
-
-            elif sline.strip().lower().startswith("[binaries"):
-                InBinariesSection = True
-
-        # Re-parse for scoped information
-        # Hopefully eventually replace all of the above with this
-        # logic
-        current_section = ""
-        arch_list = []
-
-        for line in self.Lines:
-            line = self.StripComment(line)
-
-            if line.strip() == "":
-                continue
-
-            if line.strip().startswith("#"):
-                continue
-
-            if line.strip().startswith("DEFINE"):
-                tokens = line.strip().replace("DEFINE", "").split("=", 1)
-                self.LocalVars[tokens[0].strip()] = tokens[1].strip()
-                self.Logger.info(f"Key,values found for local vars: {tokens[0].strip()}, {tokens[1].strip()}")
-                continue
-
-            line = self.ReplaceVariables(line)
-
-            match = self.SECTION_LIBRARY.findall(line)
-            if match:
-                current_section = "LibraryClasses"
-                arch_list = match
-                continue
-            match = self.SECTION_SOURCE.findall(line)
-            if match:
-                current_section = "Sources"
-                arch_list = match
-                continue
-
-            # Catch all others
-            match = self.SECTION_REGEX.match(line)
-            if match:
-                current_section = match.group(1)
-                arch_list = []
-
-            # Handle lines when we are in a library section
-            if current_section == "LibraryClasses":
-                for arch in arch_list:
-                    arch = "common" if arch == "" else arch.lower()
-                    if arch in self.ScopedLibraryDict:
-                        self.ScopedLibraryDict[arch].append(line.split()[0].strip())
+            # Sections are only the same object if they are opened by the same header text
+            if scopes is not current:
+                current = scopes
+                in_defines, collector, scoped, scoped_archs = self._ParseSectionHeader(section, scopes)
+
+            if scoped is not None:
+                entry = sline.split()[0]
+                if scoped is self.ScopedSourceDict:
+                    entry = entry.rstrip("|")
+                for arch in scoped_archs:
+                    scoped.setdefault(arch, []).append(entry)
+
+            if collector is not None:
+                collector.append(sline.partition("|")[0].strip())
+
+            elif in_defines and sline.count("=") == 1:
+                tokens = sline.split("=", 1)
+                key = tokens[0].strip()
+                value = tokens[1].strip()
+                self.Dict[key] = value
+                #
+                # Parse Library class and phases in special manor
+                #
+                if key.lower() == "library_class":
+                    self.LibraryClass = value.partition("|")[0].strip()
+                    self.Logger.debug("Library class found")
+                    phases = value.partition("|")[2].strip()
+                    if len(phases) < 1 or phases.lower() == "base":
+                        self.SupportedPhases = AllPhases
                     else:
-                        self.ScopedLibraryDict[arch] = [line.split()[0].strip()]
+                        self.SupportedPhases = phases.split()
+
+                self.Logger.debug("Key,values found:  %s = %s", key, value)
 
-            # Handle lines when we are in a source section
-            if current_section == "Sources":
-                for arch in arch_list:
-                    arch = "common" if arch == "" else arch.lower()
-                    src = line.split()[0].strip().rstrip("|")
-                    if arch in self.ScopedSourceDict:
-                        self.ScopedSourceDict[arch].append(src)
-                    else:
-                        self.ScopedSourceDict[arch] = [src]
         self.Parsed = True
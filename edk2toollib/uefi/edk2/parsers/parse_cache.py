@@ -0,0 +1,432 @@
+# @file parse_cache.py
+# A process-wide cache of parsed EDK2 files.
+#
+# Copyright (c) Microsoft Corporation
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+##
+"""A process-wide, opt-in cache of parsed EDK2 files.
+
+When enabled, `InfParser`, `DecParser` and `DscParser` look up a file in the cache before parsing it and store the
+result afterwards, so every parser instance in the process that parses the same file with the same inputs shares a
+single parse.
+
+```python
+from edk2toollib.uefi.edk2.parsers import parse_cache
+
+cache = parse_cache.enable_parse_cache(maxsize=4096)
+...
+print(cache.info())
+```
+
+Entries are keyed by the parser type, the absolute path of the file, its modification time and size, and a
+fingerprint of everything else the parse depends on (workspace, package paths, and the input and local variables for
+parsers that expand macros). Files pulled in while parsing, such as DSC `!include` files, are recorded with the entry
+and re-checked on every hit, so an edit to any of them invalidates it.
+
+Cached results are immutable: a result is stored as the pickled bytes of the parser's state, and each parser that hits
+the cache unpickles its own copy, which is an order of magnitude faster than parsing the file again.
+
+The cache can also be backed by a directory, which lets parse results outlive the process, i.e. between CI runs:
+
+```python
+parse_cache.enable_parse_cache(directory="Build/.parse_cache", max_disk_bytes=256 * 1024 * 1024)
+```
+
+On disk, results are keyed by a hash of the file's contents rather than its modification time, so they survive a fresh
+checkout. Only results that do not depend on other files (INF and DEC parses) are written to disk. Each entry holds the
+same pickled bytes, stamped with the installed version of edk2-pytool-library and `DISK_CACHE_VERSION`, so a cache
+directory shared across an upgrade is not used by the new version. The least recently used entries are deleted once the
+directory grows past `max_disk_bytes`.
+"""
+
+import hashlib
+import importlib.metadata
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable, Optional
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+# Bump whenever the layout of a parser's state changes, so that stale on-disk entries are ignored. On-disk entries are
+# also keyed by the installed library version, see _library_version.
+DISK_CACHE_VERSION = 1
+DISK_CACHE_SUFFIX = ".parse"
+
+# Indexes into a cache key, see make_key
+_KEY_PATH = 2
+_KEY_MTIME = 3
+_KEY_SIZE = 4
+
+
+def _library_version() -> str:
+    """Returns the installed version of edk2-pytool-library, or "unknown" if it is not installed, i.e. run from source."""
+    try:
+        return importlib.metadata.version("edk2-pytool-library")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+_LIBRARY_VERSION = _library_version()
+
+
+def make_key(parser_type: type, path: str, fingerprint: Hashable, options: Hashable = ()) -> Optional[tuple]:
+    """Returns the cache key for parsing a file, or None if the file cannot be stat'd.
+
+    Args:
+        parser_type (type): the parser class
+        path (str): absolute path to the file
+        fingerprint (Hashable): everything other than the file that the parse result depends on
+        options (Hashable): parse options that change the result
+    """
+    signature = file_signature(path)
+    if signature is None:
+        return None
+    return (parser_type.__module__, parser_type.__qualname__) + signature + (fingerprint, options)
+
+
+def file_signature(path: str) -> Optional[tuple[str, int, int]]:
+    """Returns the (path, mtime_ns, size) signature of a file, or None if it cannot be stat'd."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+class ParseResult(object):
+    """An immutable, cached parse of a file.
+
+    Attributes:
+        data (bytes): the pickled parser state
+        dependencies (tuple): (path, mtime_ns, size) of every other file the parse read
+        disk_path (str): the file the result was read from, if it was loaded from disk
+    """
+
+    __slots__ = ("data", "dependencies", "disk_path")
+
+    def __init__(
+        self, data: bytes, dependencies: Iterable[tuple[str, int, int]] = (), disk_path: Optional[str] = None
+    ) -> "ParseResult":
+        """Inits a result from pickled parser state."""
+        self.data = data
+        self.dependencies = tuple(dependencies)
+        self.disk_path = disk_path
+
+    @classmethod
+    def from_state(cls, state: dict, dependencies: Iterable[tuple[str, int, int]] = ()) -> "ParseResult":
+        """Creates a result from parser state, a dict of attribute name to value.
+
+        Raises:
+            (pickle.PicklingError): the state cannot be pickled
+            (TypeError): the state holds an object that cannot be pickled, such as a generator
+            (AttributeError): the state holds a local object, such as a nested function
+        """
+        return cls(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), dependencies)
+
+    def load(self) -> dict:
+        """Returns a new copy of the parser state."""
+        return pickle.loads(self.data)
+
+    def is_current(self) -> bool:
+        """Returns True if none of the dependencies changed since the parse."""
+        return all(file_signature(dependency[0]) == dependency for dependency in self.dependencies)
+
+
+class ParsedFileCache(object):
+    """A thread-safe LRU cache of `ParseResult` objects, optionally backed by a directory.
+
+    Attributes:
+        maxsize (int): maximum number of entries kept in memory
+        directory (str): directory persisting results across processes, or None
+        max_disk_bytes (int): size the directory is kept under
+        hits (int): lookups that returned a result, from memory or disk
+        disk_hits (int): lookups that returned a result loaded from disk
+        misses (int): lookups that did not, including stale entries
+        evictions (int): entries dropped to stay within maxsize
+        disk_writes (int): results written to disk
+        disk_evictions (int): files deleted to stay within max_disk_bytes
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ) -> "ParsedFileCache":
+        """Inits an empty cache holding at most maxsize entries in memory."""
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.directory = None
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_writes = 0
+        self.disk_evictions = 0
+        self._entries = OrderedDict()
+        self._missed_disk_keys = OrderedDict()  # memory key -> disk key of a disk lookup that missed, for put
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self.set_directory(directory)
+
+    def __len__(self) -> int:
+        """Returns the number of cached entries."""
+        return len(self._entries)
+
+    def set_directory(self, directory: Optional[str]) -> None:
+        """Sets, or with None removes, the directory persisting results."""
+        if directory is not None:
+            directory = os.path.abspath(directory)
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self.directory = directory
+            self._disk_bytes = None
+            self._missed_disk_keys.clear()
+
+    def config(self) -> dict:
+        """Returns the keyword arguments that enable an equivalent cache, i.e. in a worker process."""
+        return {"maxsize": self.maxsize, "directory": self.directory, "max_disk_bytes": self.max_disk_bytes}
+
+    def get(self, key: Hashable) -> Optional[ParseResult]:
+        """Returns the current cached result for key, or None."""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None and not result.is_current():
+                del self._entries[key]
+                result = None
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._read(key) if self.directory is not None else None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._insert(key, result)
+        return result
+
+    def load(self, key: Hashable) -> Optional[dict]:
+        """Returns a new copy of the current cached parser state for key, or None.
+
+        A result that fails to unpickle, such as one written to disk by an incompatible version of this library, is
+        deleted from memory and disk and counted as a miss.
+        """
+        result = self.get(key)
+        if result is None:
+            return None
+        try:
+            return result.load()
+        # A class that was renamed or moved fails to resolve, and one that changed can fail to rebuild its state
+        except (pickle.UnpicklingError, AttributeError, ImportError, EOFError, TypeError, ValueError, IndexError) as e:
+            logging.debug(f"Ignoring unloadable parse cache entry for {key[_KEY_PATH]}: {e}")
+            self._discard(key, result)
+            return None
+
+    def put(self, key: Hashable, result: ParseResult) -> None:
+        """Stores a result, evicting the least recently used entries if the cache is full."""
+        with self._lock:
+            self._insert(key, result)
+        if self.directory is not None and not result.dependencies:
+            self._write(key, result)
+
+    def clear(self) -> None:
+        """Drops every in-memory entry and resets the counters. Files on disk are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._missed_disk_keys.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = self.disk_writes = self.disk_evictions = 0
+
+    def info(self) -> dict:
+        """Returns the cache counters, size and maxsize."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_writes": self.disk_writes,
+                "disk_evictions": self.disk_evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def _insert(self, key: Hashable, result: ParseResult) -> None:
+        """Inserts a result into memory. Must be called with the lock held."""
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _discard(self, key: Hashable, result: ParseResult) -> None:
+        """Deletes a result returned by `get` that turned out to be unusable, counting its lookup as a miss."""
+        with self._lock:
+            if self._entries.get(key) is result:
+                del self._entries[key]
+            self.hits -= 1
+            self.misses += 1
+            if result.disk_path is not None:
+                self.disk_hits -= 1
+        if result.disk_path is not None:
+            try:
+                os.remove(result.disk_path)
+            except OSError:
+                pass
+
+    def _disk_key(self, key: tuple) -> Optional[tuple]:
+        """Returns the on-disk key: the versioned memory key, with the file's mtime and size replaced by a content hash."""
+        try:
+            with open(key[_KEY_PATH], "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+        return (DISK_CACHE_VERSION, _LIBRARY_VERSION) + key[:_KEY_MTIME] + (digest,) + key[_KEY_SIZE + 1 :]
+
+    def _disk_path(self, disk_key: tuple) -> str:
+        """Returns the file an on-disk key is stored in."""
+        name = hashlib.sha256(repr(disk_key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + DISK_CACHE_SUFFIX)
+
+    def _read(self, key: tuple) -> Optional[ParseResult]:
+        """Loads a result from disk, or returns None if there is no valid entry for key.
+
+        On a miss, the disk key is kept for the `put` that normally follows, so the file is only hashed once.
+        """
+        disk_key = self._disk_key(key)
+        if disk_key is None:
+            return None
+        result = self._read_entry(disk_key)
+        if result is None:
+            with self._lock:
+                self._missed_disk_keys[key] = disk_key
+                while len(self._missed_disk_keys) > self.maxsize:
+                    self._missed_disk_keys.popitem(last=False)
+        return result
+
+    def _read_entry(self, disk_key: tuple) -> Optional[ParseResult]:
+        """Loads the result stored for an on-disk key, or returns None if there is no valid entry."""
+        path = self._disk_path(disk_key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, data = pickle.load(f)
+            if stored_key != disk_key:
+                return None
+            os.utime(path)  # The modification time orders entries for eviction
+        except FileNotFoundError:
+            return None
+        # A truncated or corrupted entry fails to unpickle, and one that is not a (key, data) pair fails to unpack
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError) as e:
+            logging.debug(f"Ignoring unreadable parse cache entry {path}: {e}")
+            return None
+        return ParseResult(data, disk_path=path)
+
+    def _write(self, key: tuple, result: ParseResult) -> None:
+        """Writes a result to disk, then evicts old entries if the directory is over max_disk_bytes."""
+        with self._lock:
+            disk_key = self._missed_disk_keys.pop(key, None)
+        if disk_key is None:
+            disk_key = self._disk_key(key)
+        if disk_key is None:
+            return
+        path = self._disk_path(disk_key)
+        try:
+            data = pickle.dumps((disk_key, result.data), protocol=pickle.HIGHEST_PROTOCOL)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.debug(f"Failed to write parse cache entry {path}: {e}")
+            return
+
+        with self._lock:
+            self.disk_writes += 1
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(entry.stat().st_size for entry in self._disk_entries())
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _disk_entries(self) -> list[os.DirEntry]:
+        """Returns the entries in the cache directory."""
+        try:
+            with os.scandir(self.directory) as it:
+                return [entry for entry in it if entry.name.endswith(DISK_CACHE_SUFFIX)]
+        except OSError:
+            return []
+
+    def _evict_disk(self) -> None:
+        """Deletes the least recently used files until the directory is at 90% of max_disk_bytes.
+
+        Must be called with the lock held.
+        """
+        entries = []
+        for entry in self._disk_entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.disk_evictions += 1
+        self._disk_bytes = total
+
+
+_parse_cache = None
+
+
+def enable_parse_cache(
+    maxsize: int = DEFAULT_MAXSIZE, directory: Optional[str] = None, max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES
+) -> ParsedFileCache:
+    """Enables the process-wide parse cache, returning it.
+
+    If the cache is already enabled, its entries are kept and only its settings are updated.
+
+    Args:
+        maxsize (int): maximum number of results kept in memory
+        directory (str): directory persisting INF and DEC parse results across processes, or None for memory only
+        max_disk_bytes (int): size the directory is kept under
+    """
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = ParsedFileCache(maxsize, directory, max_disk_bytes)
+    else:
+        _parse_cache.maxsize = maxsize
+        _parse_cache.max_disk_bytes = max_disk_bytes
+        if directory is None or _parse_cache.directory != os.path.abspath(directory):
+            _parse_cache.set_directory(directory)
+    return _parse_cache
+
+
+def disable_parse_cache() -> None:
+    """Disables the process-wide parse cache and drops its entries."""
+    global _parse_cache
+    _parse_cache = None
+
+
+def get_parse_cache() -> Optional[ParsedFileCache]:
+    """Returns the process-wide parse cache, or None if it is not enabled."""
+    return _parse_cache
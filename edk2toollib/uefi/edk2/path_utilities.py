@@ -14,12 +14,101 @@
 
 import concurrent.futures
 import errno
+import functools
+import json
 import logging
 import os
 import timeit
 from pathlib import Path
 from typing import Iterable, Optional
 
+# Directories that never contain edk2 packages, but can be very large. By default, they are not descended into when
+# discovering packages lazily or with a discovery cache.
+IGNORED_DIRECTORIES = frozenset({"Build", ".git", ".svn", ".hg", ".venv", "venv", "__pycache__", "node_modules"})
+
+# Version of the package discovery cache file format. Cache files with a different version are ignored.
+DISCOVERY_CACHE_VERSION = 1
+
+
+def _walk_package_path(package_path: Path, ignored: frozenset[str]) -> tuple[list[Path], dict[str, int]]:
+    """Finds every directory containing a .dec file in a package path.
+
+    Directories named in `ignored` are not descended into.
+
+    Returns:
+        (tuple[list[Path], dict[str, int]]): The package directories and the mtime (ns) of every directory walked.
+    """
+    packages = []
+    mtimes = {}
+    to_walk = [str(package_path)]
+    while to_walk:
+        root = to_walk.pop()
+        try:
+            # stat before listing so that a change made while listing invalidates the recorded mtime
+            mtime = os.stat(root).st_mtime_ns
+            with os.scandir(root) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        mtimes[root] = mtime
+
+        is_package = False
+        for entry in entries:
+            if entry.is_dir():
+                if entry.name not in ignored and not entry.is_symlink():
+                    to_walk.append(entry.path)
+            elif not is_package and entry.name.lower().endswith(".dec"):
+                is_package = True
+        if is_package:
+            packages.append(Path(root))
+    return packages, mtimes
+
+
+def _normcase(path: str) -> str:
+    """Normalizes the case of a posix-like path string for comparison on case-insensitive (Windows) systems."""
+    return path.lower() if os.name == "nt" else path
+
+
+def _build_relative_prefixes(workspace: str, package_paths: Iterable[str]) -> tuple[tuple[str, str], ...]:
+    """Returns the (root, root + "/") posix string pairs used for absolute -> edk2 relative conversions.
+
+    Package paths are sorted longest first, so that the closest package path wins when package paths are nested,
+    followed by the workspace. See the following path_utilities_test for a detailed explanation:
+    test_get_relative_path_when_folder_is_next_to_package
+    """
+    roots = sorted(package_paths, key=len, reverse=True)
+    roots.append(workspace)
+    return tuple((_normcase(root), _normcase(root if root.endswith("/") else root + "/")) for root in roots)
+
+
+def _to_edk2_relative_path(relative_prefixes: tuple[tuple[str, str], ...], abspath: tuple[str, ...]) -> Optional[str]:
+    """Converts an absolute path to an edk2 relative path using prefixes from `_build_relative_prefixes`."""
+    path = Path(*[part.replace("\\", "/") for part in abspath]).as_posix()
+    key = _normcase(path)
+
+    for root, prefix in relative_prefixes:
+        if key.startswith(prefix):
+            # Slice the original string to avoid a change in case
+            return path[len(prefix) :]
+        if key == root:
+            return "."
+    return None
+
+
+def _to_absolute_path(roots: Iterable[os.PathLike], relpath: tuple[str, ...]) -> str:
+    """Returns the first root joined with the relative path that exists on this system.
+
+    Raises:
+        FileNotFoundError: if the path exists under none of the roots. Raising rather than returning None keeps the
+            miss out of the `functools.lru_cache` the lookup goes through, so a file created later is found.
+    """
+    relpath = Path(*[part.replace("\\", "/") for part in relpath])
+    for root in roots:
+        abspath = Path(root) / relpath
+        if abspath.exists():
+            return str(abspath)
+    raise FileNotFoundError(relpath)
+
 
 class Edk2Path(object):
     """Represents edk2 file paths.
@@ -37,10 +126,29 @@ class Edk2Path(object):
         instantiated. If using the same Workspace root and packages path, it is
         suggested that only a single Edk2Path instance is instantiated and
         passed to any consumers.
+
+    !!! note
+        Package discovery (used by `GetContainingPackage`) can be deferred until first needed with `lazy=True`, and
+        the discovered packages can be persisted between runs with `discovery_cache`. In either mode, directories in
+        `IGNORED_DIRECTORIES` (such as `Build` and `.git`) are skipped by default, so packages inside of them are not
+        found. Otherwise every directory is searched, unless `ignored_directories` is given.
+
+    !!! note
+        Path conversions are cached. If files are added or removed after conversions have been performed, call
+        `ClearPathCache` to discard any cached results.
     """
 
+    # Maximum number of cached results for each path conversion direction.
+    CACHE_SIZE = 2**16
+
     def __init__(
-        self, ws: os.PathLike, package_path_list: Iterable[os.PathLike], error_on_invalid_pp: bool = True
+        self,
+        ws: os.PathLike,
+        package_path_list: Iterable[os.PathLike],
+        error_on_invalid_pp: bool = True,
+        lazy: bool = False,
+        discovery_cache: Optional[os.PathLike] = None,
+        ignored_directories: Optional[Iterable[str]] = None,
     ) -> "Edk2Path":
         """Constructor.
 
@@ -49,6 +157,11 @@ def __init__(
             package_path_list: list of packages path. Entries can be Absolute path, workspace relative path, or CWD
                 relative.
             error_on_invalid_pp: default value is True. If packages path value is invalid raise exception.
+            lazy: default value is False. If True, packages are not discovered until first needed.
+            discovery_cache: Optional path to a file used to persist discovered packages between runs. Cached
+                packages for a package path are re-used as long as the mtime of every directory in it is unchanged.
+            ignored_directories: Optional names of directories not to search for packages. Defaults to
+                `IGNORED_DIRECTORIES` if `lazy` or `discovery_cache` is set, and to none otherwise.
 
         Raises:
             (NotADirectoryError): Invalid workspace or package path directory.
@@ -102,6 +215,11 @@ def __init__(
         if invalid_pp and error_on_invalid_pp:
             raise NotADirectoryError(errno.ENOENT, os.strerror(errno.ENOENT), invalid_pp)
 
+        self._relative_prefixes = _build_relative_prefixes(
+            self._workspace_path.as_posix(), [p.as_posix() for p in self._package_path_list]
+        )
+        self._reset_caches()
+
         #
         # Nested package check - ensure packages do not exist in a linear
         # path hierarchy.
@@ -126,42 +244,163 @@ def __init__(
             )
             self.logger.log(logging.WARNING, warning)
 
-        package_path_packages = {}
+        self._maximum_root_paths = None
+        self._discovery_cache = Path(discovery_cache) if discovery_cache is not None else None
+        if ignored_directories is not None:
+            self._ignored_directories = frozenset(ignored_directories)
+        elif lazy or discovery_cache is not None:
+            self._ignored_directories = IGNORED_DIRECTORIES
+        else:
+            self._ignored_directories = frozenset()
+        self._package_roots = None
+        if not lazy:
+            self._discover_packages()
 
+    def _discover_packages(self) -> None:
+        """Finds every package in each package path, populating the package root map used by `GetContainingPackage`.
+
+        Packages are loaded from the discovery cache, if one was provided and is still valid, otherwise each package
+        path is walked.
+        """
         start_time = timeit.default_timer()
+        cache = self._read_discovery_cache()
+        ignored = sorted(self._ignored_directories)
 
-        def get_paths(package_path):
-            paths = []
-            for root, _, files in os.walk(package_path):
-                for file in files:
-                    if file.endswith(".dec"):
-                        paths.append(Path(root))
-            return package_path, paths
+        def get_paths(package_path: Path) -> tuple[Path, list[Path], Optional[dict[str, int]]]:
+            entry = cache.get(str(package_path))
+            if entry is not None and entry.get("ignored") == ignored and self._is_cache_entry_valid(entry):
+                return package_path, [Path(p) for p in entry["packages"]], None
+            paths, mtimes = _walk_package_path(package_path, self._ignored_directories)
+            return package_path, paths, mtimes
 
         with concurrent.futures.ThreadPoolExecutor() as executor:
-            results = executor.map(get_paths, self._package_path_list)
+            results = list(executor.map(get_paths, self._package_path_list))
 
-        for package_path, paths in results:
+        package_path_packages = {}
+        updated = False
+        for package_path, paths, mtimes in results:
             package_path_packages[package_path] = paths
+            if mtimes is not None:
+                cache[str(package_path)] = {"packages": [str(p) for p in paths], "mtimes": mtimes, "ignored": ignored}
+                updated = True
+        if updated:
+            self._write_discovery_cache(cache)
+
+        self._package_path_set = set(self._package_path_list)
+        self._package_roots = {path: path.name for paths in package_path_packages.values() for path in paths}
+        self._unwalked_package_roots = {}
 
         end_time = timeit.default_timer()
         self.logger.log(logging.DEBUG, f"Time to build package_path_packages: {end_time - start_time}")
 
         start_time = timeit.default_timer()
-        for package_path, packages in package_path_packages.items():
-            for i, package in enumerate(packages):
-                for j in range(i + 1, len(packages)):
-                    comp_package = packages[j]
-                    if package.is_relative_to(comp_package) or comp_package.is_relative_to(package):
-                        self.logger.log(
-                            logging.DEBUG,
-                            f"[{str(package)}] and [{str(comp_package)}] are nested. Nested packages are not allowed "
-                            "and may result in incorrect conversions from absolute path to edk2 package path relative "
-                            "paths.",
-                        )
+        for packages in package_path_packages.values():
+            # Sorting by path parts places nested packages directly after the package they are nested in, so only
+            # the current chain of ancestors needs to be compared against.
+            ancestors = []
+            for package in sorted(packages, key=lambda p: p.parts):
+                while ancestors and not package.is_relative_to(ancestors[-1]):
+                    ancestors.pop()
+                for comp_package in ancestors:
+                    self.logger.log(
+                        logging.DEBUG,
+                        f"[{str(comp_package)}] and [{str(package)}] are nested. Nested packages are not allowed "
+                        "and may result in incorrect conversions from absolute path to edk2 package path relative "
+                        "paths.",
+                    )
+                ancestors.append(package)
         end_time = timeit.default_timer()
         self.logger.log(logging.DEBUG, f"Time to check nested packages: {end_time - start_time}")
 
+    def _ensure_packages_discovered(self) -> None:
+        """Discovers packages if they have not been discovered yet (i.e. `lazy=True`)."""
+        if self._package_roots is None:
+            self._discover_packages()
+
+    def _read_discovery_cache(self) -> dict:
+        """Returns the cached packages for each package path, or an empty dict if there is no valid cache."""
+        if self._discovery_cache is None or not self._discovery_cache.is_file():
+            return {}
+        try:
+            with open(self._discovery_cache, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.logger.warning(f"Ignoring unreadable package discovery cache: {self._discovery_cache}")
+            return {}
+        if not isinstance(data, dict) or data.get("version") != DISCOVERY_CACHE_VERSION:
+            return {}
+        return data.get("package_paths", {})
+
+    def _write_discovery_cache(self, cache: dict) -> None:
+        """Writes the cached packages for each package path to the discovery cache, if one was provided."""
+        if self._discovery_cache is None:
+            return
+        try:
+            self._discovery_cache.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._discovery_cache.with_name(f"{self._discovery_cache.name}.{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"version": DISCOVERY_CACHE_VERSION, "package_paths": cache}, f)
+            os.replace(tmp, self._discovery_cache)
+        except OSError as e:
+            self.logger.warning(f"Failed to write package discovery cache {self._discovery_cache}: {e}")
+
+    @staticmethod
+    def _is_cache_entry_valid(entry: dict) -> bool:
+        """Checks that no directory in a cached package path has been modified since it was walked."""
+        try:
+            return all(os.stat(d).st_mtime_ns == mtime for d, mtime in entry["mtimes"].items())
+        except (OSError, KeyError, TypeError, AttributeError):
+            return False
+
+    def __getstate__(self) -> dict:
+        """Returns the state to pickle, excluding the conversion caches."""
+        state = self.__dict__.copy()
+        del state["_relative_path_cache"]
+        del state["_absolute_path_cache"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Restores the pickled state, creating empty conversion caches."""
+        self.__dict__.update(state)
+        self._reset_caches()
+
+    def _reset_caches(self) -> None:
+        """Creates empty, bounded LRU caches for both path conversion directions."""
+        self._relative_path_cache = functools.lru_cache(maxsize=self.CACHE_SIZE)(self._get_edk2_relative_path)
+        self._absolute_path_cache = functools.lru_cache(maxsize=self.CACHE_SIZE)(self._get_absolute_path)
+
+    def ClearPathCache(self) -> None:
+        """Discards all cached path conversions, including the paths of files found to exist.
+
+        Call this method if files have been removed or moved on disk since paths were converted. Files that were not
+        found are not cached, so files added since are found without it.
+        """
+        self._relative_path_cache.cache_clear()
+        self._absolute_path_cache.cache_clear()
+
+    def Snapshot(self) -> "Edk2PathSnapshot":
+        """Returns an immutable, lightweight copy of this object for sending to worker processes.
+
+        Packages are discovered first, if they have not been already.
+
+        Returns:
+            (Edk2PathSnapshot): A snapshot providing the same path conversion API.
+        """
+        self._ensure_packages_discovered()
+        return Edk2PathSnapshot(
+            self._workspace_path.as_posix(),
+            [p.as_posix() for p in self._package_path_list],
+            [p.as_posix() for p in self._package_roots],
+        )
+
+    def RefreshPackageRoots(self) -> None:
+        """Re-discovers the packages in each package path.
+
+        `GetContainingPackage` uses the package roots discovered when the Edk2Path object was created (or first
+        used, if lazy). Call this method if packages have been added, removed, or moved on disk since then.
+        """
+        self._discover_packages()
+
     @property
     def WorkspacePath(self: "Edk2Path") -> str:
         """Workspace Path as a string."""
@@ -193,41 +432,20 @@ def GetEdk2RelativePathFromAbsolutePath(self, *abspath: str) -> str:
         if abspath == (None,):
             return None
 
-        abspath = Path(*[part.replace("\\", "/") for part in abspath])
-
-        relpath = None
-        found = False
-
-        # Check if the Absolute path starts with any of the package paths. If a match is found, build the relative
-        # path based off that package.
-        #
-        # Sort the package paths from from longest to shortest. This handles the case where a package and a package
-        # path are in the same directory. See the following path_utilities_test for a detailed explanation of the
-        # scenario: test_get_relative_path_when_folder_is_next_to_package
-        for packagepath in sorted(self._package_path_list, reverse=True):
-            # If a match is found, use the original string to avoid change in case
-            if abspath.is_relative_to(packagepath):
-                self.logger.debug("Successfully converted AbsPath to Edk2Relative Path using PackagePath")
-                relpath = abspath.relative_to(packagepath)
-                found = True
-                break
-
-        # If a match was not found, check if absolute path is based on the workspace root.
-        if not found and abspath.is_relative_to(self._workspace_path):
-            self.logger.debug("Successfully converted AbsPath to Edk2Relative Path using WorkspacePath")
-            relpath = abspath.relative_to(self._workspace_path)
-            found = True
-
-        if found:
-            relpath = relpath.as_posix()
-            self.logger.debug(f"[{abspath}] -> [{relpath}]")
+        relpath = self._relative_path_cache(abspath)
+        if relpath is not None:
             return relpath
 
         # Absolute path was not in reference to a package path or the workspace root.
         self.logger.error("Failed to convert AbsPath to Edk2Relative Path")
+        abspath = Path(*[part.replace("\\", "/") for part in abspath])
         self.logger.error(f"AbsolutePath: {abspath}")
         return None
 
+    def _get_edk2_relative_path(self, abspath: tuple[str, ...]) -> Optional[str]:
+        """Uncached implementation of `GetEdk2RelativePathFromAbsolutePath`."""
+        return _to_edk2_relative_path(self._relative_prefixes, abspath)
+
     def GetAbsolutePathOnThisSystemFromEdk2RelativePath(self, *relpath: str, log_errors: Optional[bool] = True) -> str:
         """Given a relative path return an absolute path to the file in this workspace.
 
@@ -249,25 +467,26 @@ def GetAbsolutePathOnThisSystemFromEdk2RelativePath(self, *relpath: str, log_err
         if relpath == (None,):
             return None
 
-        relpath = Path(*[part.replace("\\", "/") for part in relpath])
-        abspath = self._workspace_path / relpath
-        if abspath.exists():
-            return str(abspath)
-
-        for a in self._package_path_list:
-            abspath = a / relpath
-            if abspath.exists():
-                return str(abspath)
-        if log_errors:
+        try:
+            abspath = self._absolute_path_cache(relpath)
+        except FileNotFoundError:
+            abspath = None
+        if abspath is None and log_errors:
             self.logger.error("Failed to convert Edk2Relative Path to an Absolute Path on this system.")
-            self.logger.error("Relative Path: %s" % relpath)
+            self.logger.error("Relative Path: %s" % Path(*[part.replace("\\", "/") for part in relpath]))
 
-        return None
+        return abspath
+
+    def _get_absolute_path(self, relpath: tuple[str, ...]) -> str:
+        """Uncached implementation of `GetAbsolutePathOnThisSystemFromEdk2RelativePath`, raising if not found."""
+        return _to_absolute_path([self._workspace_path, *self._package_path_list], relpath)
 
     def GetContainingPackage(self, InputPath: str) -> str:
         """Finds the package that contains the given path.
 
-        This isn't perfect, but at least identifies the direcotry consistently.
+        This isn't perfect, but at least identifies the direcotry consistently. Packages inside of a package path are
+        resolved from the package roots discovered at initialization without accessing the filesystem. Use
+        `RefreshPackageRoots` if packages change on disk.
 
 
         Args:
@@ -277,9 +496,8 @@ def GetContainingPackage(self, InputPath: str) -> str:
             (str): name of the package that the path is in.
         """
         self.logger.debug("GetContainingPackage: %s" % InputPath)
+        self._ensure_packages_discovered()
         InputPath = Path(InputPath.replace("\\", "/"))
-        # Make a list that has the path case normalized for comparison.
-        # Note: This only does anything on Windows
 
         # 1. Handle the case that InputPath is not in the workspace tree
         path_root = None
@@ -293,25 +511,40 @@ def GetContainingPackage(self, InputPath: str) -> str:
         else:
             path_root = self._workspace_path
 
-        # 2. Determine if the path is under a package in the workspace
+        # 2. Determine if the path is under a package in the workspace. Package directories are always directories,
+        #    so the InputPath itself is only a match when it is a package directory.
+        ancestors = []
+        for dirpath in (InputPath, *InputPath.parents):
+            if dirpath == path_root:
+                break
+            ancestors.append(dirpath)
 
-        # Start the search within the first available directory. If provided InputPath is a directory, start there,
-        # else (if InputPath is a file) move to it's parent directory and start there.
-        if InputPath.is_dir():
-            dirpath = InputPath
+        # Everything at or below the outermost package path in the ancestor chain was discovered up front. Anything
+        # above it (i.e. a package directly in the workspace) is checked on disk once and remembered.
+        if path_root in self._package_path_set:
+            walked = len(ancestors)
         else:
-            dirpath = InputPath.parent
-
-        while path_root != dirpath:
-            if dirpath.exists():
-                for f in dirpath.iterdir():
-                    if f.suffix.lower() == ".dec":
-                        return dirpath.name
+            walked = next(
+                (len(ancestors) - i for i, d in enumerate(reversed(ancestors)) if d in self._package_path_set), 0
+            )
 
-            dirpath = dirpath.parent
+        for i, dirpath in enumerate(ancestors):
+            name = self._package_roots.get(dirpath) if i < walked else self._get_unwalked_package_root(dirpath)
+            if name is not None:
+                return name
 
         return None
 
+    def _get_unwalked_package_root(self, dirpath: Path) -> Optional[str]:
+        """Returns the package name if a directory outside of all package paths contains a .dec file."""
+        if dirpath not in self._unwalked_package_roots:
+            name = None
+            if dirpath.is_dir():
+                if any(f.suffix.lower() == ".dec" for f in dirpath.iterdir()):
+                    name = dirpath.name
+            self._unwalked_package_roots[dirpath] = name
+        return self._unwalked_package_roots[dirpath]
+
     def GetContainingModules(self, input_path: str) -> list[str]:
         """Find the list of modules (inf files) for a file path.
 
@@ -334,42 +567,35 @@ def GetContainingModules(self, input_path: str) -> list[str]:
             (list[str]): Absolute paths of .inf files that could be the
                          containing module.
         """
-        input_path = Path(input_path.replace("\\", "/"))
-        if not input_path.is_absolute():
-            # Todo: Return a more specific exception type when
-            # https://github.com/tianocore/edk2-pytool-library/issues/184 is
-            # implemented.
-            raise Exception("Module path must be absolute.")
-
-        all_root_paths = self._package_path_list + [self._workspace_path]
-
-        # For each root path, find the maximum allowed root in its hierarchy.
-        maximum_root_paths = all_root_paths
-        for root_path in maximum_root_paths:
-            for other_root_path in maximum_root_paths[:]:
-                if root_path == other_root_path:
-                    continue
-                if root_path.is_relative_to(other_root_path):
-                    if len(root_path.parts) > len(other_root_path.parts):
-                        maximum_root_paths.remove(root_path)
-                    else:
-                        maximum_root_paths.remove(other_root_path)
-
-        # Verify the file path is within a valid workspace or package path
-        # directory.
-        for path in maximum_root_paths:
-            if input_path.is_relative_to(path):
-                break
-        else:
-            return []
+        return self.GetContainingModulesForPaths([input_path])[input_path]
+
+    def GetContainingModulesForPaths(self, input_paths: Iterable[str]) -> dict[str, list[str]]:
+        """Find the list of modules (inf files) for many file paths at once.
 
-        modules = []
-        if input_path.suffix.lower() == ".inf":
-            # Return the file path given since it is a module .inf file
-            modules = [str(input_path)]
+        Provides the same results as `GetContainingModules` for each path, but each unique directory is only listed
+        once and the search for a module stops at any directory that has already been resolved, so it is much faster
+        for large sets of paths, such as every file in a diff.
+
+        Args:
+            input_paths: Absolute paths to files, directories, or modules.
+                Supports both Windows and Posix like paths.
+
+        Returns:
+            (dict[str, list[str]]): The absolute paths of .inf files that could be the containing module, for each
+                input path.
+
+        Raises:
+            (Exception): If any of the paths are not absolute.
+        """
+        maximum_root_paths = self._get_maximum_root_paths()
 
-        if not modules:
-            # Continue to ascend directories up to a maximum root path.
+        # directory -> .inf files directly inside the directory
+        inf_index = {}
+        # directory -> .inf files of the closest module at or above the directory
+        resolved = {}
+
+        def resolve(directory: Path) -> list[str]:
+            # Ascend directories up to a maximum root path, stopping early if an already resolved directory is found.
             #
             # This handles cases like:
             #   ModuleDir/      |   ModuleDir/      | ...similarly nested files
@@ -378,31 +604,243 @@ def GetContainingModules(self, input_path: str) -> list[str]:
             #       file.c      |       X64/        |
             #                   |         file.c    |
             #
-            # The terminating condition of the loop is when a maximum root
-            # path has been reached.
-            #
-            # A maximum root path represents the maximum allowed ascension
-            # point in the input_path directory hierarchy as sub-roots like
-            # a package path pointing under a workspace path are already
-            # accounted for during maximum root path filtering.
-            #
-            # Given a root path is either the workspace or a package path,
-            # neither of which are a module directory, once that point is
-            # reached, all possible module candidates are exhausted.
-            current_dir = input_path.parent
-            while current_dir not in maximum_root_paths:
-                if current_dir.is_dir():
-                    current_dir_inf_files = [
-                        str(f) for f in current_dir.iterdir() if f.is_file() and f.suffix.lower() == ".inf"
-                    ]
-                    if current_dir_inf_files:
-                        # A .inf file(s) exist in this directory.
-                        #
-                        # Since this is the closest parent that can be considered
-                        # a module, return the .inf files as module candidates.
-                        modules.extend(current_dir_inf_files)
-                        break
-
+            # A maximum root path represents the maximum allowed ascension point in the directory hierarchy as
+            # sub-roots like a package path pointing under a workspace path are already accounted for during maximum
+            # root path filtering. Given a root path is either the workspace or a package path, neither of which are a
+            # module directory, once that point is reached, all possible module candidates are exhausted.
+            visited = []
+            modules = []
+            current_dir = directory
+            while current_dir not in maximum_root_paths and current_dir != current_dir.parent:
+                if current_dir in resolved:
+                    modules = resolved[current_dir]
+                    break
+                visited.append(current_dir)
+                if current_dir not in inf_index:
+                    inf_index[current_dir] = self._list_inf_files(current_dir)
+                if inf_index[current_dir]:
+                    # Since this is the closest parent that can be considered a module, return the .inf files as
+                    # module candidates.
+                    modules = inf_index[current_dir]
+                    break
                 current_dir = current_dir.parent
 
-        return modules
+            for d in visited:
+                resolved[d] = modules
+            return modules
+
+        results = {}
+        for input_path in input_paths:
+            path = Path(input_path.replace("\\", "/"))
+            if not path.is_absolute():
+                # Todo: Return a more specific exception type when
+                # https://github.com/tianocore/edk2-pytool-library/issues/184 is
+                # implemented.
+                raise Exception("Module path must be absolute.")
+
+            # Verify the file path is within a valid workspace or package path directory.
+            if not any(path.is_relative_to(root) for root in maximum_root_paths):
+                results[input_path] = []
+            elif path.suffix.lower() == ".inf":
+                # Return the file path given since it is a module .inf file
+                results[input_path] = [str(path)]
+            else:
+                results[input_path] = list(resolve(path.parent))
+        return results
+
+    def _get_maximum_root_paths(self) -> set[Path]:
+        """Returns the workspace and package paths that are not nested inside of another one of them."""
+        if self._maximum_root_paths is None:
+            all_root_paths = self._package_path_list + [self._workspace_path]
+            self._maximum_root_paths = {
+                root_path
+                for root_path in all_root_paths
+                if not any(
+                    root_path != other_root_path and root_path.is_relative_to(other_root_path)
+                    for other_root_path in all_root_paths
+                )
+            }
+        return self._maximum_root_paths
+
+    @staticmethod
+    def _list_inf_files(directory: Path) -> list[str]:
+        """Returns the absolute paths of all .inf files directly inside a directory."""
+        try:
+            with os.scandir(directory) as it:
+                return [
+                    str(directory / entry.name)
+                    for entry in it
+                    if entry.name.lower().endswith(".inf") and entry.is_file()
+                ]
+        except OSError:
+            return []
+
+
+class Edk2PathSnapshot(object):
+    """An immutable, picklable snapshot of an Edk2Path.
+
+    Provides the same path conversion API as `Edk2Path`, but only holds plain strings: the workspace, the package
+    paths, and the package directories discovered by the Edk2Path it was created from. It is cheap to pickle and is
+    reconstructed from those strings without accessing the filesystem, making it suitable for passing to worker
+    processes (e.g. joblib or multiprocessing). Path conversion caches are per process and are not pickled.
+
+    Create a snapshot with `Edk2Path.Snapshot()`.
+
+    Example:
+        ```python
+        snapshot = Edk2Path(ws, package_paths).Snapshot()
+        results = Parallel(n_jobs=-1)(delayed(parse)(file, snapshot) for file in files)
+        ```
+    """
+
+    __slots__ = (
+        "_workspace",
+        "_package_paths",
+        "_package_roots",
+        "_workspace_str",
+        "_package_path_strs",
+        "_relative_prefixes",
+        "_package_path_keys",
+        "_package_root_names",
+        "_unwalked_package_roots",
+        "_relative_path_cache",
+        "_absolute_path_cache",
+        "logger",
+    )
+
+    def __init__(self, workspace: str, package_paths: Iterable[str], package_roots: Iterable[str]) -> None:
+        """Creates the snapshot. Does not access the filesystem.
+
+        Args:
+            workspace: absolute posix path of the workspace.
+            package_paths: absolute posix paths of the package paths, in order.
+            package_roots: absolute posix paths of every package directory in the package paths.
+        """
+        self._workspace = workspace
+        self._package_paths = tuple(package_paths)
+        self._package_roots = tuple(package_roots)
+
+        self._workspace_str = str(Path(workspace))
+        self._package_path_strs = [str(Path(p)) for p in self._package_paths]
+        self._relative_prefixes = _build_relative_prefixes(workspace, self._package_paths)
+        self._package_path_keys = frozenset(_normcase(p) for p in self._package_paths)
+        self._package_root_names = {_normcase(p): p.rsplit("/", 1)[-1] for p in self._package_roots}
+        self._unwalked_package_roots = {}
+        self._relative_path_cache = functools.lru_cache(maxsize=Edk2Path.CACHE_SIZE)(self._get_edk2_relative_path)
+        self._absolute_path_cache = functools.lru_cache(maxsize=Edk2Path.CACHE_SIZE)(self._get_absolute_path)
+        self.logger = logging.getLogger("Edk2Path")
+
+    def __reduce__(self) -> tuple:
+        """Pickles only the strings needed to reconstruct the snapshot."""
+        return (Edk2PathSnapshot, (self._workspace, self._package_paths, self._package_roots))
+
+    @property
+    def WorkspacePath(self) -> str:
+        """Workspace Path as a string."""
+        return self._workspace_str
+
+    @property
+    def PackagePathList(self) -> list[str]:
+        """List of package paths as strings."""
+        return list(self._package_path_strs)
+
+    def ClearPathCache(self) -> None:
+        """Discards all cached path conversions, including the paths of files found to exist."""
+        self._relative_path_cache.cache_clear()
+        self._absolute_path_cache.cache_clear()
+        self._unwalked_package_roots.clear()
+
+    def GetEdk2RelativePathFromAbsolutePath(self, *abspath: str) -> str:
+        """Transforms an absolute path to an edk2 path relative to the workspace or a packages path.
+
+        See `Edk2Path.GetEdk2RelativePathFromAbsolutePath`.
+        """
+        if abspath == (None,):
+            return None
+
+        relpath = self._relative_path_cache(abspath)
+        if relpath is None:
+            self.logger.error("Failed to convert AbsPath to Edk2Relative Path")
+            abspath = Path(*[part.replace("\\", "/") for part in abspath])
+            self.logger.error(f"AbsolutePath: {abspath}")
+        return relpath
+
+    def _get_edk2_relative_path(self, abspath: tuple[str, ...]) -> Optional[str]:
+        return _to_edk2_relative_path(self._relative_prefixes, abspath)
+
+    def GetAbsolutePathOnThisSystemFromEdk2RelativePath(self, *relpath: str, log_errors: Optional[bool] = True) -> str:
+        """Given a relative path return an absolute path to the file in this workspace.
+
+        See `Edk2Path.GetAbsolutePathOnThisSystemFromEdk2RelativePath`.
+        """
+        if relpath == (None,):
+            return None
+
+        try:
+            abspath = self._absolute_path_cache(relpath)
+        except FileNotFoundError:
+            abspath = None
+        if abspath is None and log_errors:
+            self.logger.error("Failed to convert Edk2Relative Path to an Absolute Path on this system.")
+            self.logger.error("Relative Path: %s" % Path(*[part.replace("\\", "/") for part in relpath]))
+        return abspath
+
+    def _get_absolute_path(self, relpath: tuple[str, ...]) -> str:
+        return _to_absolute_path([self._workspace, *self._package_paths], relpath)
+
+    def GetContainingPackage(self, InputPath: str) -> str:
+        """Finds the package that contains the given path.
+
+        See `Edk2Path.GetContainingPackage`.
+        """
+        path = Path(InputPath.replace("\\", "/")).as_posix()
+        key = _normcase(path)
+
+        # 1. Find the root (the workspace, or the package path the path is in) to stop the search at
+        ws_root, ws_prefix = self._relative_prefixes[-1]
+        if key == ws_root or key.startswith(ws_prefix):
+            path_root = ws_root
+        else:
+            path_root = next(
+                (root for root in map(_normcase, self._package_paths) if key == root or key.startswith(root + "/")),
+                None,
+            )
+            if path_root is None:
+                return None
+
+        # 2. Collect the path and its ancestors below the root
+        ancestors = []
+        while len(key) > len(path_root):
+            ancestors.append(key)
+            key = key[: key.rfind("/")]
+
+        # Everything at or below the outermost package path was discovered by the Edk2Path. Anything above it is
+        # checked on disk once and remembered.
+        if path_root in self._package_path_keys:
+            walked = len(ancestors)
+        else:
+            walked = next(
+                (len(ancestors) - i for i, d in enumerate(reversed(ancestors)) if d in self._package_path_keys), 0
+            )
+
+        for i, dirkey in enumerate(ancestors):
+            if i < walked:
+                name = self._package_root_names.get(dirkey)
+            else:
+                name = self._get_unwalked_package_root(path[: len(dirkey)])
+            if name is not None:
+                return name
+        return None
+
+    def _get_unwalked_package_root(self, dirpath: str) -> Optional[str]:
+        """Returns the package name if a directory outside of all package paths contains a .dec file."""
+        if dirpath not in self._unwalked_package_roots:
+            name = None
+            try:
+                with os.scandir(dirpath) as it:
+                    if any(entry.name.lower().endswith(".dec") for entry in it):
+                        name = dirpath.rsplit("/", 1)[-1]
+            except OSError:
+                pass
+            self._unwalked_package_roots[dirpath] = name
+        return self._unwalked_package_roots[dirpath]
@@ -10,7 +10,7 @@
 
 import pytest
 from common import Tree, empty_tree  # noqa: F401
-from edk2toollib.database import Edk2DB, Inf
+from edk2toollib.database import Edk2DB, GeneratorMetrics, Inf
 from edk2toollib.database.tables import InfTable, TableGenerator
 from edk2toollib.uefi.edk2.path_utilities import Edk2Path
 
@@ -94,3 +94,49 @@ def test_multiple_databases_do_not_interfere(empty_tree: Tree):
     with db2.session() as session:
         rows = session.query(Inf).all()
         assert len(rows) == 0
+
+
+def test_generator_metrics_are_recorded(empty_tree: Tree):
+    """Test that performance metrics are recorded for each table generator run."""
+    empty_tree.create_library("TestLib1", "TestCls")
+    empty_tree.create_library("TestLib2", "TestCls")
+    edk2path = Edk2Path(str(empty_tree.ws), [])
+
+    db = Edk2DB(empty_tree.ws / "test.db", pathobj=edk2path)
+    db.register(InfTable(n_jobs=1))
+    env_id = db.parse({})
+
+    metrics = db.get_metrics(env_id)
+    assert len(metrics) == 1
+    metric = metrics[0]
+    assert metric["env"] == env_id
+    assert metric["generator"] == "InfTable"
+    assert metric["files_scanned"] == 2
+    assert metric["rows_inserted"] >= 2
+    assert metric["cache_hits"] == 0
+    assert metric["wall_time"] >= metric["discovery_time"] + metric["parse_time"]
+    assert metric["db_write_time"] > 0
+    assert metric["process_peak_rss"] is None or metric["process_peak_rss"] > 0
+
+    # A second parse adds another set of metrics, and does not insert any new INF rows
+    env_id2 = db.parse({})
+    assert len(db.get_metrics()) == 2
+    assert len(db.get_metrics(generator="InfTable")) == 2
+    assert db.get_metrics(env_id2)[0]["rows_inserted"] == 0
+
+
+def test_generator_metrics_phase():
+    """Test that GeneratorMetrics phases accumulate and reject unknown phases."""
+    metrics = GeneratorMetrics()
+    with metrics.phase("parse"):
+        pass
+    with metrics.phase("parse"):
+        pass
+    assert metrics.parse_time > 0
+    assert metrics.discovery_time == 0
+
+    with pytest.raises(ValueError):
+        with metrics.phase("unknown"):
+            pass
+
+    assert TableGenerator().metrics.files_scanned == 0
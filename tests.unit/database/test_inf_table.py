@@ -14,6 +14,7 @@
 from common import Tree, empty_tree, write_file  # noqa: F401
 from edk2toollib.database import Edk2DB, Inf
 from edk2toollib.database.tables import InfTable
+from edk2toollib.uefi.edk2.parsers import parse_cache
 from edk2toollib.uefi.edk2.path_utilities import Edk2Path
 
 
@@ -120,3 +121,28 @@ def test_pkg_not_pkg_path_relative(empty_tree: Tree):
         assert len(inf.sources) == 1
         assert inf.sources[0].path == Path("Common", "TestPkg", "Library", "Test2.c").as_posix()
         assert inf.path == Path("Common", "TestPkg", "Library", "TestLib.inf").as_posix()
+
+
+def test_warm_disk_parse_cache(empty_tree: Tree, tmp_path: Path):
+    """Tests that a second run with an on-disk parse cache reads every INF from the cache."""
+    edk2path = Edk2Path(str(empty_tree.ws), [])
+    lib1 = empty_tree.create_library("TestLib1", "TestCls", sources=["Test.c"])
+    empty_tree.create_library("TestLib2", "TestCls", sources=["Test.c"])
+
+    parse_cache.disable_parse_cache()
+    try:
+        for run in range(2):
+            # A fresh in-memory cache each run, as in a new CI job
+            parse_cache.disable_parse_cache()
+            cache = parse_cache.enable_parse_cache(directory=str(tmp_path / "parse_cache"))
+            db = Edk2DB(empty_tree.ws / f"db{run}.db", pathobj=edk2path)
+            db.register(InfTable(n_jobs=1))
+            db.parse({})
+
+            with db.session() as session:
+                assert session.query(Inf).filter(Inf.path == Path(lib1).as_posix()).first().library_class == "TestCls"
+
+        assert cache.info()["disk_hits"] == 2
+        assert cache.info()["misses"] == 0
+    finally:
+        parse_cache.disable_parse_cache()
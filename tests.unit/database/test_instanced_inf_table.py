@@ -46,13 +46,19 @@ def test_valid_dsc(empty_tree: Tree):
         "TARGET_ARCH": "IA32",
         "TARGET": "DEBUG",
     }
-    db.parse(env)
+    env_id = db.parse(env)
 
     with db.session() as session:
         rows = session.query(InstancedInf).all()
         assert len(rows) == 1
         assert rows[0].component == Path(comp1).as_posix()
 
+    # The DSC is parsed, not discovered, and it is counted with the component and library INFs
+    metric = db.get_metrics(env_id)[0]
+    assert metric["discovery_time"] == 0
+    assert metric["parse_time"] > 0
+    assert metric["files_scanned"] == 3
+
 
 def test_no_active_platform(empty_tree: Tree, caplog):
     """Tests that the dsc table returns immediately when no ACTIVE_PLATFORM is defined."""
@@ -7,7 +7,9 @@
 # SPDX-License-Identifier: BSD-2-Clause-Patent
 ##
 
+import copy
 import os
+import pickle
 import tempfile
 import unittest
 
@@ -41,6 +43,40 @@ def test_replace_macro_local_var_priority(self):
         line = "Hello $(name)!"
         self.assertEqual(parser.ReplaceVariables(line), "Hello sean!")
 
+    def test_replace_macro_tracks_variable_changes(self):
+        parser = BaseParser("")
+        parser.LocalVars["name"] = "fred"
+        line = "Hello $(name) and $(name)!"
+        self.assertEqual(parser.ReplaceVariables(line), "Hello fred and fred!")
+        parser.LocalVars["name"] = "sean"
+        self.assertEqual(parser.ReplaceVariables(line), "Hello sean and sean!")
+        parser.LocalVars.update({"name": True})
+        self.assertEqual(parser.ReplaceVariables(line), "Hello TRUE and TRUE!")
+        parser.SetInputVars({"name": "matt"})
+        self.assertEqual(parser.ReplaceVariables(line), "Hello matt and matt!")
+        parser.InputVars.clear()
+        del parser.LocalVars["name"]
+        self.assertEqual(parser.ReplaceVariables(line), line)
+
+    def test_replace_macro_tracks_many_variable_changes(self):
+        parser = BaseParser("")
+        parser.SetInputVars({"name": "matt"})
+        for i in range(3 * parser.LocalVars.JOURNAL_LIMIT):
+            parser.LocalVars[f"var{i}"] = f"value{i}"
+            parser.LocalVars["name"] = "fred"
+            self.assertEqual(parser.ReplaceVariables(f"$(var{i}) $(name)"), f"value{i} matt")
+        del parser.InputVars["name"]
+        parser.LocalVars["var0"] = "$(var0)"
+        self.assertEqual(parser.ReplaceVariables("$(var0) $(name) $(var1)"), " fred value1")
+        parser.LocalVars["var1"] = None
+        self.assertEqual(parser.ReplaceVariables("$(var1)"), "$(var1)")
+
+    def test_replace_macro_unterminated(self):
+        parser = BaseParser("")
+        parser.SetInputVars({"name": "sean"})
+        self.assertEqual(parser.ReplaceVariables("$(name) $(name"), "sean $(name")
+        self.assertEqual(parser.ReplaceVariables("cost $5 $(name)"), "cost $5 sean")
+
 
 class TestBaseParserConditionals(unittest.TestCase):
     def test_replace_macro_without_resolution(self):
@@ -668,6 +704,36 @@ def test_def_conditional_with_empty_define(self):
         self.assertTrue(parser.InActiveCode())
         self.assertTrue(parser.ProcessConditional("!endif"))
 
+    def test_compiled_conditional_is_cached(self):
+        parser = BaseParser("")
+        compiled = parser.CompileConditional("TRUE OR FALSE")
+        self.assertIs(compiled, BaseParser.CompileConditional("TRUE OR FALSE"))
+        self.assertIsNot(compiled, parser.CompileConditional("TRUE AND FALSE"))
+        self.assertEqual(compiled.expression, ("TRUE", "FALSE", "OR"))
+        self.assertTrue(compiled.Evaluate(parser))
+        self.assertFalse(parser.CompileConditional("TRUE AND FALSE").Evaluate(parser))
+
+        # The same conditional with a different macro value is compiled separately
+        parser.SetInputVars({"MY_VAR": "5"})
+        self.assertTrue(parser.EvaluateConditional("!if $(MY_VAR) == 5"))
+        parser.SetInputVars({"MY_VAR": "6"})
+        self.assertFalse(parser.EvaluateConditional("!if $(MY_VAR) == 5"))
+
+    def test_compiled_conditional_long_expression(self):
+        parser = BaseParser("")
+        expression = " AND ".join(["(1 == 1)"] * 500)
+        self.assertTrue(parser.CompileConditional(expression).Evaluate(parser))
+        self.assertFalse(parser.CompileConditional(expression + " AND (2 < 1)").Evaluate(parser))
+
+    def test_compiled_conditional_errors(self):
+        parser = BaseParser("")
+        with self.assertRaises(RuntimeError):
+            parser.CompileConditional("")
+        with self.assertRaises(RuntimeError):
+            parser.CompileConditional("TRUE FALSE").Evaluate(parser)
+        with self.assertRaises(RuntimeError):
+            parser.CompileConditional("== TRUE").Evaluate(parser)
+
 
 class TestBaseParserGuids(unittest.TestCase):
     def test_is_guid(self):
@@ -806,6 +872,36 @@ def test_replace_input_and_local_variables(self):
                 val = "var " + str(variables[variable_key])
                 self.assertEqual(result, val)
 
+    def test_assigned_variables_are_kept(self):
+        parser = BaseParser("")
+        local_vars = {"LOCAL": "local"}
+        input_vars = {"INPUT": "input"}
+        parser.LocalVars = local_vars
+        parser.SetInputVars(input_vars)
+        self.assertIs(parser.LocalVars, local_vars)
+        self.assertIs(parser.InputVars, input_vars)
+        self.assertEqual(parser.ReplaceVariables("$(LOCAL) $(INPUT) $(OTHER)"), "local input $(OTHER)")
+
+        # Changes to the assigned dicts are seen by the parser
+        local_vars["LOCAL"] = "changed"
+        input_vars["OTHER"] = "other"
+        self.assertEqual(parser.ReplaceVariables("$(LOCAL) $(INPUT) $(OTHER)"), "changed input other")
+        del input_vars["OTHER"]
+        self.assertEqual(parser.ReplaceVariables("$(LOCAL) $(INPUT) $(OTHER)"), "changed input $(OTHER)")
+
+    def test_copied_variables(self):
+        parser = BaseParser("")
+        parser.LocalVars = {"LOCAL": "local"}
+        parser.SetInputVars({"INPUT": "input"})
+        self.assertEqual(parser.ReplaceVariables("$(LOCAL) $(INPUT)"), "local input")
+
+        for copied in (pickle.loads(pickle.dumps(parser)), copy.deepcopy(parser)):
+            self.assertEqual(copied.ReplaceVariables("$(LOCAL) $(INPUT)"), "local input")
+            # Changes after the copy are still seen by the copy's macro expansion
+            copied.LocalVars["LOCAL"] = "changed"
+            self.assertEqual(copied.ReplaceVariables("$(LOCAL) $(INPUT)"), "changed input")
+        self.assertEqual(parser.ReplaceVariables("$(LOCAL)"), "local")
+
 
 class TestBaseParserPathAndFile(unittest.TestCase):
     # because of how this works we use WriteLines, SetAbsPath, and SetPackagePath
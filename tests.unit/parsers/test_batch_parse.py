@@ -0,0 +1,164 @@
+# @file test_batch_parse.py
+# Contains unit test routines for parsing many files at once.
+#
+# Copyright (c) Microsoft Corporation
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+##
+import os
+from pathlib import Path
+
+import pytest
+from edk2toollib.uefi.edk2.parsers import batch_parse, parse_cache
+from edk2toollib.uefi.edk2.parsers.batch_parse import parse_many
+from edk2toollib.uefi.edk2.parsers.dec_parser import DecParser
+from edk2toollib.uefi.edk2.parsers.dsc_parser import DscParser
+from edk2toollib.uefi.edk2.parsers.fdf_parser import FdfParser
+from edk2toollib.uefi.edk2.parsers.inf_parser import InfParser
+from edk2toollib.uefi.edk2.path_utilities import Edk2Path
+
+INF = """
+[Defines]
+  INF_VERSION = 0x00010005
+  BASE_NAME = Driver{index}
+  FILE_GUID = ffffffff-ffff-ffff-ffff-{index:012d}
+  MODULE_TYPE = DXE_DRIVER
+
+[Sources]
+  $(SOURCE_DIR)/Driver{index}.c
+
+[LibraryClasses.X64]
+  DebugLib
+"""
+
+DEC = """
+[Defines]
+  DEC_SPECIFICATION = 0x00010005
+  PACKAGE_NAME = TestPkg
+  PACKAGE_GUID = 57e8a49e-1b3f-41a0-a552-55ad831c15a8
+
+[Guids]
+  gTestGuid = { 0x1, 0x2, 0x3, { 0x4, 0x5, 0x6, 0x7, 0x8, 0x9, 0xa, 0xb }}
+"""
+
+DSC = """
+[Defines]
+  PLATFORM_NAME = Platform{index}
+  OUTPUT_DIRECTORY = Build/Platform{index}
+  SUPPORTED_ARCHITECTURES = X64
+  BUILD_TARGETS = DEBUG
+
+[Components]
+  TestPkg/Driver{index}.inf
+"""
+
+FDF = """
+[Defines]
+  DEFINE FD_BASE = 0x{index}000
+
+[FV.MAINFV]
+  INF TestPkg/Driver{index}.inf
+"""
+
+
+@pytest.fixture
+def workspace(tmp_path: Path) -> Path:
+    """A package with a DEC and several INFs."""
+    pkg = tmp_path / "TestPkg"
+    pkg.mkdir()
+    (pkg / "TestPkg.dec").write_text(DEC)
+    for index in range(6):
+        (pkg / f"Driver{index}.inf").write_text(INF.format(index=index))
+    for index in range(2):
+        (pkg / f"Platform{index}.dsc").write_text(DSC.format(index=index))
+        (pkg / f"Platform{index}.fdf").write_text(FDF.format(index=index))
+    return tmp_path
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_parse_many(workspace: Path, n_jobs: int):
+    edk2path = Edk2Path(str(workspace), [])
+    paths = [f"TestPkg/Driver{index}.inf" for index in reversed(range(6))]
+    paths.insert(2, "TestPkg/Missing.inf")
+    paths.append("TestPkg/TestPkg.dec")
+
+    results = parse_many(paths, n_jobs=n_jobs, edk2path=edk2path, input_vars={"SOURCE_DIR": "src"}, chunksize=2)
+
+    assert [result.path for result in results] == paths
+    missing = results.pop(2)
+    assert missing.parser is None
+    assert isinstance(missing.error, FileNotFoundError)
+    assert str(missing.error) == "TestPkg/Missing.inf"
+
+    for index, result in zip(reversed(range(6)), results):
+        assert result.error is None
+        assert isinstance(result.parser, InfParser)
+        # Workers do not send back the lines of the file, which are read again when first accessed
+        assert ("Lines" in vars(result.parser)) == (n_jobs == 1)
+        assert result.parser.Lines == (workspace / "TestPkg" / f"Driver{index}.inf").read_text().splitlines(True)
+        assert result.parser.Dict["BASE_NAME"] == f"Driver{index}"
+        assert result.parser.Sources == [f"src/Driver{index}.c"]
+        assert result.parser.get_libraries(["X64"]) == ["DebugLib"]
+        assert result.parser.Path == str(workspace / "TestPkg" / f"Driver{index}.inf")
+
+    assert isinstance(results[-1].parser, DecParser)
+    assert results[-1].parser.PackageName == "TestPkg"
+    assert len(results[-1].parser.Guids) == 1
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_parse_many_defines_only(workspace: Path, n_jobs: int):
+    paths = [str(workspace / "TestPkg" / f"Driver{index}.inf") for index in range(3)]
+    parse_cache.disable_parse_cache()
+
+    results = parse_many(paths, "INF", n_jobs=n_jobs, defines_only=True)
+
+    for index, result in enumerate(results):
+        assert "Sources" not in vars(result.parser)
+        assert result.parser.Dict["MODULE_TYPE"] == "DXE_DRIVER"
+        # The rest of the file is parsed on demand
+        assert result.parser.Sources == [f"$(SOURCE_DIR)/Driver{index}.c"]
+
+
+def test_parse_many_kind(workspace: Path):
+    with pytest.raises(ValueError):
+        parse_many([], "txt")
+
+    results = parse_many([str(workspace / "TestPkg" / "Notes.txt")], n_jobs=1)
+    assert isinstance(results[0].error, ValueError)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_parse_many_platform_files(workspace: Path, n_jobs: int):
+    edk2path = Edk2Path(str(workspace), [])
+    paths = [f"TestPkg/Platform{index}.{ext}" for ext in ("dsc", "fdf") for index in range(2)]
+
+    results = parse_many(paths, n_jobs=n_jobs, edk2path=edk2path)
+
+    for result in results:
+        assert result.error is None
+    for index, result in enumerate(results[:2]):
+        assert isinstance(result.parser, DscParser)
+        assert result.parser.LocalVars["PLATFORM_NAME"] == f"Platform{index}"
+        assert [os.path.basename(c) for c in result.parser.OtherMods] == [f"Driver{index}.inf"]
+    for index, result in enumerate(results[2:]):
+        assert isinstance(result.parser, FdfParser)
+        assert result.parser.Dict["FD_BASE"] == f"0x{index}000"
+        assert result.parser.FVs["MAINFV"]["Infs"] == [f"TestPkg/Driver{index}.inf"]
+        assert result.parser.Lines == (workspace / "TestPkg" / f"Platform{index}.fdf").read_text().splitlines(True)
+
+
+def test_parse_many_unpicklable_result(workspace: Path, monkeypatch: pytest.MonkeyPatch):
+    class UnpicklableParser(InfParser):
+        def ParseFile(self, filepath: str) -> None:
+            super().ParseFile(filepath)
+            if "Driver1" in filepath:
+                self.Helper = lambda: None
+
+    monkeypatch.setattr(batch_parse, "PARSERS", {**batch_parse.PARSERS, "inf": UnpicklableParser})
+    paths = [str(workspace / "TestPkg" / f"Driver{index}.inf") for index in range(3)]
+
+    results = batch_parse._parse_chunk(paths, "inf", None, None, False, None)
+
+    assert [error is None for _, error in results] == [True, False, True]
+    assert isinstance(results[1][1], RuntimeError)
@@ -0,0 +1,222 @@
+# @file test_buildreport_parser.py
+# Contains unit test routines for the build report parser.
+#
+# Copyright (c) Microsoft Corporation
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+##
+import pickle
+from pathlib import Path
+
+import pytest
+from edk2toollib.uefi.edk2.parsers.buildreport_parser import BuildReport, ModuleSummary
+from edk2toollib.uefi.edk2.path_utilities import Edk2Path
+
+REGION_START = ">" + "=" * 118 + "<"
+REGION_END = "<" + "=" * 118 + ">"
+SUBSECTION_START = ">" + "-" * 118 + "<"
+SUBSECTION_END = "<" + "-" * 118 + ">"
+DASHES = "-" * 118
+
+REPORT = f"""Platform Summary
+Platform Name:        TestPlatform
+Platform DSC Path:    {{ws}}/TestPkg/TestPkg.dsc
+Architectures:        X64
+Output Path:          {{ws}}/Build/DEBUG_GCC5
+
+{REGION_START}
+Platform Configuration Database Report
+*P  - Platform scoped PCD override in DSC file
+{REGION_END}
+
+{REGION_START}
+Firmware Device (FD)
+FD Name:            TEST
+Base Address:       0xFF000000
+
+{SUBSECTION_START}
+Fv Name:            FV_DXE (50.0% Full)
+Offset     Module
+0x00000078 DxeCore ({{ws}}/TestPkg/DxeCore/DxeCore.inf)
+0x00001000 TestDriver ({{ws}}/TestPkg/TestDriver/
+TestDriver.inf)
+{SUBSECTION_END}
+{REGION_END}
+
+{REGION_START}
+Module Summary
+Module Name:          DxeCore
+Module INF Path:      TestPkg/DxeCore/DxeCore.inf
+File GUID:            D6A2CB7F-6A18-4E2F-B43B-9920A733700A
+Driver Type:          0x5 (DXE_CORE)
+{SUBSECTION_START}
+Library
+{DASHES}
+{{ws}}/TestPkg/Library/BaseLib/BaseLib.inf
+{{{{BaseLib}}}}
+{{ws}}/TestPkg/Library/NullLib/NullLib.inf
+{{{{NULL:  Time = 1ms}}}}
+{SUBSECTION_END}
+{SUBSECTION_START}
+PCD
+{DASHES}
+gTestTokenSpaceGuid
+*F PcdValue                                   : FIXED   (UINT32) = 0x10
+                                                   DEC DEFAULT = 0x0
+   PcdString                                  : FIXED   (VOID*) = "#SECRET#
+value"
+{SUBSECTION_END}
+{SUBSECTION_START}
+Final Dependency Expression (DEPEX) Instructions
+{DASHES}
+PUSH gTestGuid
+END
+{DASHES}
+Dependency Expression (DEPEX) from INF
+(gTestGuid)
+{DASHES}
+{SUBSECTION_END}
+{REGION_END}
+
+{REGION_START}
+Module Summary
+Module Name:          TestDriver
+Module INF Path:      {{ws}}/TestPkg/TestDriver/TestDriver.inf
+File GUID:            11111111-2222-3333-4444-555555555555
+Driver Type:          0x7 (DXE_DRIVER)
+{REGION_END}
+"""
+
+
+@pytest.fixture
+def report(tmp_path: Path) -> BuildReport:
+    """A build report for a workspace with a single package."""
+    ws = tmp_path / "ws"
+    (ws / "TestPkg").mkdir(parents=True)
+    (ws / "TestPkg" / "TestPkg.dec").write_text("[Defines]\n")
+    report_path = tmp_path / "report.txt"
+    report_path.write_text(REPORT.format(ws=ws.as_posix()))
+    return BuildReport(str(report_path), str(ws), "", {"#SECRET#": "public"})
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_basic_parse(report: BuildReport, n_jobs: int):
+    report.BasicParse(n_jobs=n_jobs)
+    assert report.PlatformName == "TestPlatform"
+    assert report.BuildOutputDir.endswith("/Build/DEBUG_GCC5")
+    assert list(report.Modules) == ["D6A2CB7F-6A18-4E2F-B43B-9920A733700A", "11111111-2222-3333-4444-555555555555"]
+
+    core = report.Modules["D6A2CB7F-6A18-4E2F-B43B-9920A733700A"]
+    assert isinstance(core, ModuleSummary)
+    assert (core.Name, core.Type, core.FvName) == ("DxeCore", "DXE_CORE", "FV_DXE")
+    assert core.Libraries == {
+        "BaseLib": "TestPkg/Library/BaseLib/BaseLib.inf",
+        "NULL0": "TestPkg/Library/NullLib/NullLib.inf",
+    }
+    assert core.PCDs == {"gTestTokenSpaceGuid.PcdValue": "0x10", "gTestTokenSpaceGuid.PcdString": '"public value"'}
+    assert core.Depex.strip() == "(gTestGuid)"
+
+    driver = report.Modules["11111111-2222-3333-4444-555555555555"]
+    assert (driver.InfPath, driver.FvName) == ("TestPkg/TestDriver/TestDriver.inf", "FV_DXE")
+
+
+def test_find_component_by_inf_path(report: BuildReport):
+    report.BasicParse()
+    core = report.Modules["D6A2CB7F-6A18-4E2F-B43B-9920A733700A"]
+    assert report.FindComponentByInfPath("testpkg/dxecore/DXECORE.inf") is core
+    assert report.FindComponentByInfPath("TestPkg/Missing/Missing.inf") is None
+
+    # Modules added after the first lookup are found too
+    added = ModuleSummary([], report.Workspace, [], report.PathConverter)
+    added.InfPath = "TestPkg/Added/Added.inf"
+    report.Modules["added"] = added
+    assert report.FindComponentByInfPath("TestPkg/Added/Added.inf") is added
+
+    # Replacing a module, or changing its InfPath, is seen by the next lookup
+    replacement = ModuleSummary([], report.Workspace, [], report.PathConverter)
+    replacement.InfPath = core.InfPath
+    report.Modules["D6A2CB7F-6A18-4E2F-B43B-9920A733700A"] = replacement
+    assert report.FindComponentByInfPath("TestPkg/DxeCore/DxeCore.inf") is replacement
+    added.InfPath = "TestPkg/Moved/Moved.inf"
+    assert report.FindComponentByInfPath("TestPkg/Added/Added.inf") is None
+    assert report.FindComponentByInfPath("TestPkg/Moved/Moved.inf") is added
+
+    # Rebuilding the index gives the same results
+    report.IndexComponents()
+    assert report.FindComponentByInfPath("TestPkg/DxeCore/DxeCore.inf") is replacement
+    assert report.FindComponentByInfPath("TestPkg/Moved/Moved.inf") is added
+
+
+def _module_fields(report: BuildReport) -> dict:
+    return {
+        guid: (mod.Name, mod.InfPath, mod.Type, mod.PCDs, mod.Libraries, mod.Depex, mod.FvName)
+        for guid, mod in report.Modules.items()
+    }
+
+
+def test_basic_parse_streams_blocks(report: BuildReport, monkeypatch: pytest.MonkeyPatch):
+    report.BasicParse()
+    expected = _module_fields(report)
+
+    # Reading the report a few lines at a time gives the same result
+    monkeypatch.setattr(BuildReport, "READ_SIZE", 64)
+    streamed = BuildReport(report.ReportFile, report.Workspace, "", report.ProtectedWords)
+    streamed.BasicParse()
+    assert _module_fields(streamed) == expected
+    assert [region[0] for region in streamed._Regions] == [
+        BuildReport.RegionTypes.PCD,
+        BuildReport.RegionTypes.FD,
+        BuildReport.RegionTypes.MODULE,
+        BuildReport.RegionTypes.MODULE,
+    ]
+
+
+def test_protected_words_replaced_in_order(report: BuildReport):
+    report.ProtectedWords = {"#SECRET#": "#OTHER#", "#OTHER#": "final", "TestDriver": "Renamed"}
+    report.BasicParse()
+    core = report.Modules["D6A2CB7F-6A18-4E2F-B43B-9920A733700A"]
+    assert core.PCDs["gTestTokenSpaceGuid.PcdString"] == '"final value"'
+    assert report.Modules["11111111-2222-3333-4444-555555555555"].Name == "Renamed"
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_path_converter_not_built_unless_needed(report: BuildReport, n_jobs: int):
+    # Only library instances and FD regions need paths converted, so a report without them never builds one
+    text = Path(report.ReportFile).read_text()
+    fd_start = text.index("Firmware Device (FD)")
+    text = text[: text.rindex(REGION_START, 0, fd_start)] + text[text.index(REGION_END, fd_start) + len(REGION_END) :]
+    library_start = text.index("Library\n" + DASHES)
+    text = (
+        text[: text.rindex(SUBSECTION_START, 0, library_start)]
+        + text[text.index(SUBSECTION_END, library_start) + len(SUBSECTION_END) + 1 :]
+    )
+    Path(report.ReportFile).write_text(text)
+
+    report.BasicParse(n_jobs=n_jobs)
+    assert report.Modules["D6A2CB7F-6A18-4E2F-B43B-9920A733700A"].PCDs["gTestTokenSpaceGuid.PcdValue"] == "0x10"
+    assert report._PathConverter is None
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_pickle_after_basic_parse(report: BuildReport, n_jobs: int):
+    report.BasicParse(n_jobs=n_jobs)
+    expected = _module_fields(report)
+
+    # A module whose path converter was never needed can be pickled on its own, as can the whole report
+    driver = pickle.loads(pickle.dumps(report.Modules["11111111-2222-3333-4444-555555555555"]))
+    assert driver.InfPath == "TestPkg/TestDriver/TestDriver.inf"
+    assert _module_fields(pickle.loads(pickle.dumps(report))) == expected
+
+
+def test_path_converter(report: BuildReport):
+    # The path converter is only built when it is first needed
+    assert report._PathConverter is None
+    report.BasicParse()
+    assert isinstance(report.PathConverter, Edk2Path)
+
+    # An existing path converter, or a snapshot of one, is used as given
+    for pathobj in (report.PathConverter, report.PathConverter.Snapshot()):
+        shared = BuildReport(report.ReportFile, report.Workspace, "", report.ProtectedWords, pathobj)
+        shared.BasicParse()
+        assert shared.PathConverter is pathobj
+        assert _module_fields(shared) == _module_fields(report)
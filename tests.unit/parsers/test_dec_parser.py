@@ -8,6 +8,8 @@
 ##
 
 import io
+import os
+import tempfile
 import unittest
 import uuid
 
@@ -360,3 +362,23 @@ def test_valid_input(self):
         self.assertEqual(len(a.Guids), 3)
         self.assertEqual(len(a.Protocols), 1)
         self.assertEqual(len(a.PPIs), 2)
+
+    def test_defines_only(self):
+        with tempfile.TemporaryDirectory() as td:
+            dec_path = os.path.join(td, "TestDecParserPkg.dec")
+            with open(dec_path, "w") as f:
+                f.write(TestDecParser.SAMPLE_DEC_FILE)
+
+            a = DecParser()
+            a.ParseFile(dec_path, defines_only=True)
+            self.assertEqual(a.Dict["PACKAGE_NAME"], "TestDecParserPkg")
+            self.assertEqual(a.PackageName, "TestDecParserPkg")
+            self.assertNotIn("Guids", vars(a))
+
+            # Accessing a skipped attribute parses the rest of the file
+            self.assertEqual(len(a.Guids), 3)
+            self.assertEqual(len(a.Protocols), 1)
+            self.assertEqual(len(a.PPIs), 2)
+            self.assertEqual(a.Dict["PACKAGE_GUID"], "57e8a49e-1b3f-41a0-a552-55ad831c15a8")
+            with self.assertRaises(AttributeError):
+                a.NotAnAttribute
@@ -11,7 +11,9 @@
 import tempfile
 import os
 import textwrap
-from edk2toollib.uefi.edk2.parsers.dsc_parser import DscParser
+from unittest import mock
+import pytest
+from edk2toollib.uefi.edk2.parsers.dsc_parser import DscParser, DscTemplate
 from edk2toollib.uefi.edk2.path_utilities import Edk2Path
 
 
@@ -20,6 +22,16 @@ def test_creation(self):
         a = DscParser()
         self.assertNotEqual(a, None)
 
+    def test_replace_pcds(self):
+        parser = DscParser()
+        parser.RegisterPcds("gTokenSpaceGuid.PcdA|0x1")
+        parser.RegisterPcds("gTokenSpaceGuid.PcdB|gTokenSpaceGuid.PcdA")
+        self.assertEqual(
+            parser.ReplacePcds("!if gTokenSpaceGuid.PcdA == 0x1 && gTokenSpaceGuid.PcdAB == gTokenSpaceGuid.PcdB"),
+            "!if 0x1 == 0x1 && gTokenSpaceGuid.PcdAB == gTokenSpaceGuid.PcdA",
+        )
+        self.assertEqual(parser.ReplacePcds("gTokenSpaceGuid.PcdA|0x2"), "gTokenSpaceGuid.PcdA|0x2")
+
 
 class TestDscParserIncludes(unittest.TestCase):
     @staticmethod
@@ -51,6 +63,34 @@ def test_dsc_include_single_file(self):
         self.assertEqual(parser.LocalVars["INCLUDED"], "TRUE")  # make sure we got the defines
         self.assertEqual(len(parser.GetAllDscPaths()), 2)  # make sure we have two dsc paths
 
+    def test_dsc_include_read_once(self):
+        """This tests that an include used several times is only read from disk once per parse"""
+        workspace = tempfile.mkdtemp()
+
+        file1_path = os.path.join(workspace, "file1.dsc")
+        file2_path = os.path.join(workspace, "file2.dsc.inc")
+
+        file1_data = "[Defines]\n!include file2.dsc.inc\n[Components.X64]\n!include file2.dsc.inc\n"
+        file2_data = "!if $(INCLUDED) == TRUE\nTestPkg/Driver.inf\n!else\nDEFINE INCLUDED = TRUE\n!endif\n"
+
+        TestDscParserIncludes.write_to_file(file1_path, file1_data)
+        TestDscParserIncludes.write_to_file(file2_path, file2_data)
+
+        parser = DscParser().SetEdk2Path(Edk2Path(workspace, []))
+        with mock.patch("builtins.open", side_effect=open) as mock_open:
+            parser.ParseFile(file1_path)
+        opened = [call.args[0] for call in mock_open.call_args_list]
+
+        self.assertEqual(opened.count(file2_path), 1)
+        self.assertEqual(parser.SixMods, ["TestPkg/Driver.inf"])
+        self.assertEqual(len(parser.GetAllDscPaths()), 2)
+
+        # A new parse reads the include again
+        TestDscParserIncludes.write_to_file(file2_path, "[Defines]\nINCLUDED = FALSE")
+        parser = DscParser().SetEdk2Path(Edk2Path(workspace, []))
+        parser.ParseFile(file1_path)
+        self.assertEqual(parser.LocalVars["INCLUDED"], "FALSE")
+
     def test_dsc_include_missing_file(self):
         """This tests whether includes work properly"""
         workspace = tempfile.mkdtemp()
@@ -191,6 +231,50 @@ def test_dsc_define_statements(self):
             os.remove(file1_path)
         assert any("FakePath/FakePath2/FakeInf.inf" in value for value in parser.Components)
 
+    def test_dsc_define_forward_references(self):
+        """This tests that defines referencing later defines are resolved once those are defined"""
+        SAMPLE_DSC_FILE = textwrap.dedent("""\
+        [Defines]
+            SUPPORTED_ARCHITECTURES = X64
+            OUTPUT_DIRECTORY = Build/$(PLATFORM_NAME)/$(TARGET)
+            DEFINE TOOLS = $(OUTPUT_DIRECTORY)/Tools
+            PLATFORM_NAME = Platform
+            DEFINE SELF = $(SELF)/x
+            DEFINE UNDEFINED = $(NOT_DEFINED)
+        """)
+        workspace = tempfile.mkdtemp()
+
+        file_path = os.path.join(workspace, "test.dsc")
+        TestDscParserIncludes.write_to_file(file_path, SAMPLE_DSC_FILE)
+
+        parser = DscParser().SetEdk2Path(Edk2Path(workspace, [])).SetInputVars({"TARGET": "DEBUG"})
+        parser.ParseFile(file_path)
+
+        self.assertEqual(parser.LocalVars["OUTPUT_DIRECTORY"], "Build/Platform/DEBUG")
+        self.assertEqual(parser.LocalVars["TOOLS"], "Build/Platform/DEBUG/Tools")
+        self.assertEqual(parser.LocalVars["SELF"], "/x")
+        self.assertEqual(parser.LocalVars["UNDEFINED"], "$(NOT_DEFINED)")
+
+    def test_dsc_define_waits_for_undefined_macros(self):
+        """This tests that a define referencing an undefined macro is only resolved again once the macro is defined"""
+        SAMPLE_DSC_FILE = "[Defines]\n    SUPPORTED_ARCHITECTURES = X64\n"
+        SAMPLE_DSC_FILE += "".join(f"    DEFINE WAITING{i} = $(LATE)/{i}\n" for i in range(50))
+        SAMPLE_DSC_FILE += "".join(f"    DEFINE OTHER{i} = {i}\n" for i in range(50))
+        SAMPLE_DSC_FILE += "    DEFINE LATE = late\n"
+        workspace = tempfile.mkdtemp()
+
+        file_path = os.path.join(workspace, "test.dsc")
+        TestDscParserIncludes.write_to_file(file_path, SAMPLE_DSC_FILE)
+
+        parser = DscParser().SetEdk2Path(Edk2Path(workspace, []))
+        with mock.patch.object(parser, "ReplaceVariables", wraps=parser.ReplaceVariables) as replace:
+            parser.ParseFile(file_path)
+
+        self.assertEqual(parser.LocalVars["WAITING7"], "late/7")
+        # Each waiting define is resolved when it is set and once more when LATE is set, but not on any other DEFINE
+        waiting = [call for call in replace.call_args_list if call.args[0].startswith("$(LATE)")]
+        self.assertEqual(len(waiting), 100)
+
     def test_dsc_pcd_in_include_files(self):
         """This tests whether pcd in and before !include directive works properly"""
         workspace = tempfile.mkdtemp()
@@ -299,3 +383,167 @@ def test_get_mods_includes_other_mods(self):
             self.assertIn("CommonModule.inf", mods_str)
         finally:
             os.remove(file_path)
+
+
+def test_dsc_include_source_lines(tmp_path):
+    """Check that include expansion yields every line with its file and line number, in order."""
+    inc_path = tmp_path / "Components.dsc.inc"
+    inc_path.write_text("[Components.X64]\n  Pkg/A.inf\n")
+    dsc_path = tmp_path / "Test.dsc"
+    dsc_path.write_text("[Defines]\n  SUPPORTED_ARCHITECTURES = X64\n!include Components.dsc.inc\n  Pkg/B.inf\n")
+
+    parser = DscParser().SetEdk2Path(Edk2Path(str(tmp_path), []))
+    parser.ParseFile(str(dsc_path))
+
+    assert parser.SixMods == ["Pkg/A.inf", "Pkg/B.inf"]
+    assert [(os.path.basename(mod["file"]), mod["lineno"]) for mod in parser.SixModsEnhanced] == [
+        ("Components.dsc.inc", 2),
+        ("Test.dsc", 4),
+    ]
+
+    source = parser._SourceLines("Test.dsc", ["first\n", "second\n"])
+    assert next(source) == ("Test.dsc", 1, "first\n")
+    parser._PushSourceLines("Inc.dsc.inc", ["included\n"])
+    assert list(source) == [("Inc.dsc.inc", 1, "included\n"), ("Test.dsc", 2, "second\n")]
+
+
+def test_dsc_skips_inactive_branches(tmp_path):
+    """Check that whole inactive branches are skipped while the lines that can change the state are still seen."""
+    dsc_path = tmp_path / "Test.dsc"
+    dsc_path.write_text(
+        textwrap.dedent("""        [Defines]
+          DEFINE FEATURE = FALSE  # a comment
+        [PcdsFixedAtBuild]
+        !if $(FEATURE) == TRUE
+          gTokenSpaceGuid.PcdFeature|TRUE
+        !if $(UNDEFINED) == TRUE
+          [Components]
+        !endif
+        !elseif gTokenSpaceGuid.PcdFeature == TRUE
+          gTokenSpaceGuid.PcdElseIf|TRUE
+        !else
+          gTokenSpaceGuid.PcdElse|TRUE
+        !endif
+        [Components.X64]
+        !if $(FEATURE) == TRUE
+        $(FEATURE_LINE)
+        !else
+          Pkg/A.inf {
+            <PcdsFixedAtBuild>
+              gTokenSpaceGuid.PcdOverride|TRUE
+          }
+        !endif
+        """)
+    )
+    parser = DscParser().SetEdk2Path(Edk2Path(str(tmp_path), []))
+
+    records = parser._LexLines(dsc_path.read_text().splitlines(keepends=True))
+    assert records[1] == (2, "DEFINE FEATURE = FALSE", 0, None, False)
+    assert records[2] == (3, "[PcdsFixedAtBuild]", 1, ("PCDSFIXEDATBUILD", "PcdsFixedAtBuild"), False)
+    # the first branch can be skipped to the !elseif, registering its PCD as the define pass does on every line
+    assert records[3][3] == (8, ("gTokenSpaceGuid.PcdFeature|TRUE",))
+    # a branch starting with a macro cannot be skipped
+    assert records[14][3] is None
+
+    parser.ParseFile(str(dsc_path))
+    assert parser.PcdValueDict == {"gTokenSpaceGuid.PcdElse": "TRUE", "gTokenSpaceGuid.PcdOverride": "TRUE"}
+    assert parser.SixMods == ["Pkg/A.inf"]
+    assert "[Components]" not in parser.Lines
+
+
+def test_dsc_template_matches_parse_file(tmp_path):
+    """Check that evaluating a DscTemplate gives the same results as parsing the DSC for each combination."""
+    (tmp_path / "Platform.dsc").write_text(
+        textwrap.dedent("""\
+        [Defines]
+          SUPPORTED_ARCHITECTURES = IA32|X64
+          OUTPUT_DIRECTORY = Build/$(TARGET)
+        !include Common.dsc.inc
+        !include $(TARGET).dsc.inc
+
+        [LibraryClasses]
+          DebugLib|Pkg/Library/DebugLib$(TARGET)/DebugLib.inf
+
+        [PcdsFixedAtBuild]
+          gTokenSpaceGuid.PcdTarget|$(TARGET)
+
+        [Components.$(TARGET_ARCH)]
+          Pkg/Common/Common.inf
+        !if $(FEATURE) == TRUE
+          Pkg/Feature/Feature.inf
+        !endif
+        """)
+    )
+    (tmp_path / "Common.dsc.inc").write_text("[Defines]\n  DEFINE FEATURE = FALSE\n")
+    (tmp_path / "DEBUG.dsc.inc").write_text("[Components]\n  Pkg/Debug/Debug.inf\n")
+    (tmp_path / "RELEASE.dsc.inc").write_text("[Defines]\n  DEFINE FEATURE = TRUE\n")
+    for target in ("DEBUG", "RELEASE"):
+        (tmp_path / "Pkg" / "Library" / f"DebugLib{target}").mkdir(parents=True)
+        (tmp_path / "Pkg" / "Library" / f"DebugLib{target}" / "DebugLib.inf").write_text("[Defines]\n")
+    edk2path = Edk2Path(str(tmp_path), [])
+    combinations = [
+        {"TARGET": target, "TARGET_ARCH": arch} for target in ("DEBUG", "RELEASE") for arch in ("IA32", "X64")
+    ]
+
+    expected = []
+    for input_vars in combinations:
+        parser = DscParser().SetEdk2Path(edk2path).SetInputVars(dict(input_vars))
+        parser.ParseFile("Platform.dsc")
+        expected.append(parser)
+
+    template = DscTemplate("Platform.dsc", edk2path)
+    for n_jobs in (1, 2):
+        results = template.EvaluateAll(combinations, n_jobs=n_jobs)
+        assert len(results) == len(combinations)
+        for input_vars, result, parser in zip(combinations, results, expected):
+            assert result.InputVars == input_vars
+            assert result.Components == parser.Components
+            assert result.ScopedLibraryDict == parser.ScopedLibraryDict
+            assert result.PcdValueDict == parser.PcdValueDict
+            assert result.LocalVars == parser.LocalVars
+            assert result.GetAllDscPaths() == parser.GetAllDscPaths()
+
+    assert ("Pkg/Feature/Feature.inf", "x64", {"NULL": []}) in results[3].Components
+    assert ("Pkg/Debug/Debug.inf", "IA32", {"NULL": []}) in results[0].Components
+    assert results[2].PcdValueDict == {"gTokenSpaceGuid.PcdTarget": "RELEASE"}
+    assert results[1].ScopedLibraryDict == {"common.debuglib": ["Pkg/Library/DebugLibDEBUG/DebugLib.inf"]}
+
+    with pytest.raises(FileNotFoundError):
+        DscTemplate("Missing.dsc", edk2path)
+
+
+def test_library_class_to_instance_dict_is_lazy(tmp_path):
+    """Check that library instance paths are only looked up when LibraryClassToInstanceDict is used."""
+    (tmp_path / "Pkg" / "Library").mkdir(parents=True)
+    (tmp_path / "Pkg" / "Library" / "DebugLib.inf").write_text("[Defines]\n")
+    (tmp_path / "Platform").mkdir()
+    (tmp_path / "Platform" / "Local.inf").write_text("[Defines]\n")
+    (tmp_path / "Platform" / "Libs.dsc.inc").write_text("[LibraryClasses.X64]\n  LocalLib|Local.inf\n")
+    (tmp_path / "Platform" / "Platform.dsc").write_text(
+        textwrap.dedent("""\
+        [Defines]
+          SUPPORTED_ARCHITECTURES = X64
+        [LibraryClasses]
+          DebugLib|Pkg/Library/DebugLib.inf
+          MissingLib|Pkg/Library/MissingLib.inf
+        [LibraryClasses.IA32]
+          DebugLib|Pkg/Library/DebugLib.inf
+        !include Libs.dsc.inc
+        """)
+    )
+
+    parser = DscParser().SetEdk2Path(Edk2Path(str(tmp_path), []))
+    with mock.patch.object(DscParser, "_FindPathFrom", autospec=True, side_effect=DscParser._FindPathFrom) as find_path:
+        parser.ParseFile("Platform/Platform.dsc")
+        assert find_path.call_count == 3  # the DSC and its include only
+        assert parser.ScopedLibraryDict["common.debuglib"] == ["Pkg/Library/DebugLib.inf"]
+        assert find_path.call_count == 3
+
+        assert parser.LibraryClassToInstanceDict == {
+            "DebugLib": [str(tmp_path / "Pkg" / "Library" / "DebugLib.inf")] * 2,
+            "MissingLib": [None],
+            "LocalLib": [str(tmp_path / "Platform" / "Local.inf")],
+        }
+        assert find_path.call_count == 6
+        parser.LibraryClassToInstanceDict
+        assert find_path.call_count == 6
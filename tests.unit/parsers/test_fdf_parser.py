@@ -7,6 +7,8 @@
 # SPDX-License-Identifier: BSD-2-Clause-Patent
 ##
 
+import copy
+import pickle
 import unittest
 import os
 import textwrap
@@ -179,3 +181,29 @@ def test_file_raw_section_statements():
     assert "a_ui.bin" in parser.FVs["MAINFV"]["Files"]["aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"]["UI"]
     assert "some_efi_file.efi" in parser.FVs["MAINFV"]["Files"]["aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"]["PE32"]
     assert "some_te.te" in parser.FVs["MAINFV"]["Files"]["aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"]["TE"]
+
+
+def test_long_inactive_block(tmp_path):
+    """Check that skipping many lines does not recurse once per line."""
+    inactive = "".join(f"  INF Pkg/Driver{i}/Driver{i}.inf\n  # comment\n\n" for i in range(3000))
+    fdf_path = tmp_path / "Test.fdf"
+    (tmp_path / "Inactive.fdf.inc").write_text(f"!if $(ENABLED) == TRUE\n{inactive}!endif\n")
+    fdf_path.write_text("[FV.MAINFV]\n!include Inactive.fdf.inc\nINF Pkg/Active/Active.inf\n")
+
+    parser = FdfParser().SetEdk2Path(Edk2Path(str(tmp_path), []))
+    parser.ParseFile(str(fdf_path))
+
+    assert parser.FVs["MAINFV"]["Infs"] == ["Pkg/Active/Active.inf"]
+    assert parser.CurrentLine == 3
+
+
+def test_parsed_parser_can_be_copied(tmp_path):
+    """Check that no line iterator is left on the parser once parsing finishes."""
+    fdf_path = tmp_path / "Test.fdf"
+    fdf_path.write_text("[Defines]\nDEFINE FD_BASE = 0x0\n[FV.MAINFV]\nINF Pkg/Driver/Driver.inf\n")
+    parser = FdfParser().SetEdk2Path(Edk2Path(str(tmp_path), []))
+    parser.ParseFile(str(fdf_path))
+
+    for copied in (pickle.loads(pickle.dumps(parser)), copy.deepcopy(parser)):
+        assert copied.FVs == parser.FVs
+        assert copied.Dict == parser.Dict
@@ -34,6 +34,37 @@ def test_parse_new_section(self):
         self.assertTrue(res)
         self.assertEqual(sect, "Defines")
 
+    def test_split_section_header(self):
+        parser = HashFileParser("")
+        self.assertEqual(parser.SplitSectionHeader("[Defines]"), (("Defines", ""),))
+        self.assertEqual(
+            parser.SplitSectionHeader("[ LibraryClasses.X64 , LibraryClasses.Common.PEIM ]"),
+            (("LibraryClasses", "X64"), ("LibraryClasses", "Common.PEIM")),
+        )
+
+    def test_lex_sections(self):
+        parser = HashFileParser("")
+        parser.SetInputVars({"ARCH": "X64"})
+        lines = [
+            "# comment\n",
+            "  Before = 1\n",
+            "[Sources.$(ARCH), Sources.IA32]\n",
+            "\n",
+            "  Foo$(ARCH).c  # trailing\n",
+            "[ LibraryClasses.common.PEIM ]\n",
+            "  DebugLib\n",
+        ]
+        self.assertEqual(
+            list(parser._LexSections(lines, expand_macros=True)),
+            [
+                ("", (), "Before = 1", 2),
+                ("sources", ("x64", "ia32"), "FooX64.c", 5),
+                ("libraryclasses", ("common.peim",), "DebugLib", 7),
+            ],
+        )
+        # Without expanding macros, the header is still recognized
+        self.assertEqual(list(parser._LexSections(lines[2:5]))[0][:2], ("sources", ("$(arch)", "ia32")))
+
     def test_strip_comment(self):
         parser = HashFileParser("")
 
@@ -43,6 +74,7 @@ def test_strip_comment(self):
             ("MagicLib|Include/Magic", "\t# this shouldn't show up"),
             ("MagicLib|Include/Magic", "# test"),
             ("", "# this is a comment"),
+            ("  MagicLib|Include/Magic", '  # it\'s "quoted" after the comment'),
             ("gMyPkgTokenSpaceGuid.MyThing|'Value'|VOID*|0x10000000", " # My Comment"),
             ('gMyPkgTokenSpaceGuid.MyThing|"Value"|VOID*|0x10000000', "# My Comment"),
             ('gMyPkgTokenSpaceGuid.MyThing|"#Value"|VOID*|0x10000000', "# My Comment"),
@@ -90,3 +90,75 @@ def test_inf_parser_with_defines(tmp_path: Path):
     infp.ParseFile(inf_path)
 
     assert sorted(infp.get_sources(["AARCH64"])) == sorted(["File1.c", "File2.c", "files/File5.c", "files2/File6.c"])
+
+
+def test_inf_parser_flat_and_scoped_views(tmp_path: Path):
+    """Tests that the flat lists and the arch-scoped dicts describe the same sections."""
+    inf_path = tmp_path / "test.inf"
+    inf_path.write_text(INF_EXAMPLE1)
+
+    infp = InfParser()
+    infp.ParseFile(inf_path)
+
+    assert infp.LibraryClass == "BaseTestLib"
+    assert infp.Dict["BASE_NAME"] == "TestLib"
+    assert infp.Binaries == ["Binary1.efi"]
+    assert infp.LibrariesUsed == ["Library1", "Library2", "Library3", "Library4"]
+    assert infp.Sources == ["File1.c", "File2.c", "File3.c", "File4.c", "files/File5.c", "files2/File6.c"]
+    scoped_sources = [src for sources in infp.ScopedSourceDict.values() for src in sources]
+    assert sorted(set(scoped_sources)) == sorted(infp.Sources)
+    assert infp.ScopedLibraryDict["x64"] == ["Library4"]
+    assert infp.LocalVars["MY_PATH"] == "files2"
+
+
+def test_inf_parser_section_names_in_entries(tmp_path: Path):
+    """Tests that entries mentioning a section name do not change the current section."""
+    inf_path = tmp_path / "test.inf"
+    inf_path.write_text("[Sources]\n  LibraryClasses.c\n  File.c\n[Protocols]\n  gProtocolGuid\n")
+
+    infp = InfParser()
+    infp.ParseFile(inf_path)
+
+    assert infp.Sources == ["LibraryClasses.c", "File.c"]
+    assert infp.ScopedSourceDict == {"common": ["LibraryClasses.c", "File.c"]}
+    assert infp.ScopedLibraryDict == {}
+    assert infp.ProtocolsUsed == ["gProtocolGuid"]
+
+
+def test_inf_parser_section_prefixes(tmp_path: Path):
+    """Tests that sections are collected by the type they start with."""
+    inf_path = tmp_path / "test.inf"
+    inf_path.write_text(
+        "[Pcd]\n  gSpace.PcdA\n[PatchPcd.X64]\n  gSpace.PcdB\n[FixedPcd, FeaturePcd]\n  gSpace.PcdC\n"
+        "[PcdEx]\n  gSpace.PcdD\n[Packages.IA32]\n  TestPkg/TestPkg.dec\n[Guids.common]\n  gTestGuid\n"
+        "[Ppis]\n  gTestPpiGuid\n[Depex]\n  TRUE\n"
+    )
+
+    infp = InfParser()
+    infp.ParseFile(inf_path)
+
+    assert infp.PcdsUsed == ["gSpace.PcdA", "gSpace.PcdB", "gSpace.PcdC", "gSpace.PcdD"]
+    assert infp.PackagesUsed == ["TestPkg/TestPkg.dec"]
+    assert infp.GuidsUsed == ["gTestGuid"]
+    assert infp.PpisUsed == ["gTestPpiGuid"]
+
+
+def test_inf_parser_defines_only(tmp_path: Path):
+    """Tests that a defines-only parse stops at the end of [Defines] and completes the parse on demand."""
+    inf_path = tmp_path / "test.inf"
+    inf_path.write_text(INF_EXAMPLE1)
+
+    infp = InfParser()
+    infp.ParseFile(str(inf_path), defines_only=True)
+
+    assert infp.Dict["FILE_GUID"] == "ffffffff-ffff-ffff-ffff-ffffffffffff"
+    assert infp.LibraryClass == "BaseTestLib"
+    assert "Sources" not in vars(infp)
+
+    full = InfParser()
+    full.ParseFile(str(inf_path))
+    assert sorted(infp.get_sources(["AARCH64"])) == sorted(full.get_sources(["AARCH64"]))
+    assert infp.Sources == full.Sources
+    assert infp.LibrariesUsed == full.LibrariesUsed
+    assert infp.Lines == full.Lines
+    assert infp.Dict == full.Dict
@@ -0,0 +1,325 @@
+# @file test_parse_cache.py
+# Contains unit test routines for the process-wide parse cache.
+#
+# Copyright (c) Microsoft Corporation
+#
+# SPDX-License-Identifier: BSD-2-Clause-Patent
+##
+import os
+import pickle
+from pathlib import Path
+
+import pytest
+from edk2toollib.uefi.edk2.parsers import parse_cache
+from edk2toollib.uefi.edk2.parsers.dec_parser import DecParser
+from edk2toollib.uefi.edk2.parsers.dsc_parser import DscParser
+from edk2toollib.uefi.edk2.parsers.inf_parser import InfParser
+from edk2toollib.uefi.edk2.path_utilities import Edk2Path
+
+INF = """
+[Defines]
+  INF_VERSION = 0x00010005
+  BASE_NAME = TestDriver
+  FILE_GUID = ffffffff-ffff-ffff-ffff-ffffffffffff
+  MODULE_TYPE = DXE_DRIVER
+
+[Sources]
+  $(SOURCE_DIR)/Driver.c
+
+[LibraryClasses.X64]
+  DebugLib
+"""
+
+DEC = """
+[Defines]
+  DEC_SPECIFICATION = 0x00010005
+  PACKAGE_NAME = TestPkg
+  PACKAGE_GUID = 57e8a49e-1b3f-41a0-a552-55ad831c15a8
+
+[Guids]
+  gTestGuid = { 0x1, 0x2, 0x3, { 0x4, 0x5, 0x6, 0x7, 0x8, 0x9, 0xa, 0xb }}
+"""
+
+DSC = """
+[Defines]
+  PLATFORM_NAME = Test
+  SUPPORTED_ARCHITECTURES = X64
+
+!include Common.dsc.inc
+"""
+
+DSC_INC = """
+[Components.X64]
+  TestPkg/Driver.inf
+"""
+
+
+@pytest.fixture
+def cache():
+    """Enables an empty parse cache for the duration of a test."""
+    parse_cache.disable_parse_cache()
+    yield parse_cache.enable_parse_cache(maxsize=8)
+    parse_cache.disable_parse_cache()
+
+
+def _touch_later(path: Path, text: str) -> None:
+    """Rewrites a file, making sure its mtime changes even on coarse-grained filesystems."""
+    stat = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_disabled_by_default():
+    assert parse_cache.get_parse_cache() is None
+
+
+def test_inf_cache_hit(cache, tmp_path: Path):
+    inf_path = tmp_path / "Driver.inf"
+    inf_path.write_text(INF)
+
+    first = InfParser().SetInputVars({"SOURCE_DIR": "src"})
+    first.ParseFile(str(inf_path))
+    second = InfParser().SetInputVars({"SOURCE_DIR": "src"})
+    second.ParseFile(str(inf_path))
+
+    assert cache.info()["hits"] == 1
+    assert cache.info()["misses"] == 1
+    assert cache.info()["size"] == 1
+    assert second.Sources == first.Sources == ["src/Driver.c"]
+    assert second.get_libraries(["X64"]) == ["DebugLib"]
+    assert second.Dict == first.Dict
+    assert second.Parsed
+
+    # Each consumer gets its own containers
+    second.Sources.append("Other.c")
+    second.ScopedLibraryDict["x64"].append("OtherLib")
+    third = InfParser().SetInputVars({"SOURCE_DIR": "src"})
+    third.ParseFile(str(inf_path))
+    assert third.Sources == ["src/Driver.c"]
+    assert third.ScopedLibraryDict == {"x64": ["DebugLib"]}
+
+
+def test_inf_cache_key(cache, tmp_path: Path):
+    inf_path = tmp_path / "Driver.inf"
+    inf_path.write_text(INF)
+
+    InfParser().SetInputVars({"SOURCE_DIR": "src"}).ParseFile(str(inf_path))
+    other = InfParser().SetInputVars({"SOURCE_DIR": "other"})
+    other.ParseFile(str(inf_path))
+    assert other.Sources == ["other/Driver.c"]
+
+    defines_only = InfParser().SetInputVars({"SOURCE_DIR": "src"})
+    defines_only.ParseFile(str(inf_path), defines_only=True)
+    assert cache.info()["misses"] == 3
+
+    _touch_later(inf_path, INF.replace("Driver.c", "Changed.c"))
+    changed = InfParser().SetInputVars({"SOURCE_DIR": "src"})
+    changed.ParseFile(str(inf_path))
+    assert changed.Sources == ["src/Changed.c"]
+    assert cache.info()["hits"] == 0
+
+
+def test_defines_only_cache_hit(cache, tmp_path: Path):
+    dec_path = tmp_path / "TestPkg.dec"
+    dec_path.write_text(DEC)
+
+    DecParser().ParseFile(str(dec_path), defines_only=True)
+    dec = DecParser()
+    dec.ParseFile(str(dec_path), defines_only=True)
+    assert cache.info()["hits"] == 1
+    assert dec.PackageName == "TestPkg"
+    assert "Guids" not in vars(dec)
+    assert len(dec.Guids) == 1
+
+
+def test_dsc_include_invalidates(cache, tmp_path: Path):
+    (tmp_path / "Test.dsc").write_text(DSC)
+    inc_path = tmp_path / "Common.dsc.inc"
+    inc_path.write_text(DSC_INC)
+    edk2path = Edk2Path(str(tmp_path), [])
+
+    first = DscParser().SetEdk2Path(edk2path)
+    first.ParseFile("Test.dsc")
+    second = DscParser().SetEdk2Path(edk2path)
+    second.ParseFile("Test.dsc")
+    assert cache.info()["hits"] == 1
+    assert second.SixMods == first.SixMods == ["TestPkg/Driver.inf"]
+    assert second.LocalVars["PLATFORM_NAME"] == "Test"
+    assert second.GetAllDscPaths() == first.GetAllDscPaths()
+
+    _touch_later(inc_path, DSC_INC.replace("Driver.inf", "Other.inf"))
+    third = DscParser().SetEdk2Path(edk2path)
+    third.ParseFile("Test.dsc")
+    assert third.SixMods == ["TestPkg/Other.inf"]
+    assert cache.info()["hits"] == 1
+
+
+def test_lru_eviction(tmp_path: Path):
+    cache = parse_cache.ParsedFileCache(maxsize=2)
+    for key in "abc":
+        cache.put(key, parse_cache.ParseResult.from_state({"Lines": [key]}))
+    assert cache.get("a") is None
+    assert cache.get("c").load() == {"Lines": ["c"]}
+    cache.put("d", parse_cache.ParseResult.from_state({}))
+    assert cache.get("b") is None
+    info = cache.info()
+    assert (info["hits"], info["misses"], info["evictions"], info["size"], info["maxsize"]) == (1, 2, 2, 2, 2)
+    with pytest.raises(ValueError):
+        parse_cache.ParsedFileCache(maxsize=0)
+
+
+def test_unpicklable_state_not_cached(cache, tmp_path: Path):
+    inf_path = tmp_path / "Driver.inf"
+    inf_path.write_text(INF)
+
+    infp = InfParser()
+    infp.Unpicklable = lambda: None
+    infp.ParseFile(str(inf_path))
+    assert infp.Sources == ["$(SOURCE_DIR)/Driver.c"]
+    assert cache.info()["size"] == 0
+
+
+def test_state_errors_not_hidden(cache, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    inf_path = tmp_path / "Driver.inf"
+    inf_path.write_text(INF)
+
+    def broken_state(self: InfParser) -> dict:
+        raise KeyError("Lines")
+
+    monkeypatch.setattr(InfParser, "_ParseState", broken_state)
+    with pytest.raises(KeyError):
+        InfParser().ParseFile(str(inf_path))
+
+
+def test_disk_cache(tmp_path: Path):
+    cache_dir = tmp_path / "cache"
+    inf_path = tmp_path / "Driver.inf"
+    inf_path.write_text(INF)
+    parse_cache.disable_parse_cache()
+    try:
+        parse_cache.enable_parse_cache(directory=str(cache_dir))
+        InfParser().SetInputVars({"SOURCE_DIR": "src"}).ParseFile(str(inf_path))
+        assert parse_cache.get_parse_cache().info()["disk_writes"] == 1
+
+        # A new process, and a fresh checkout that only changed the file's mtime, still hits the disk cache
+        parse_cache.disable_parse_cache()
+        cache = parse_cache.enable_parse_cache(directory=str(cache_dir))
+        _touch_later(inf_path, INF)
+        infp = InfParser().SetInputVars({"SOURCE_DIR": "src"})
+        infp.ParseFile(str(inf_path))
+        assert cache.info()["disk_hits"] == 1
+        assert infp.Sources == ["src/Driver.c"]
+        assert infp.ScopedLibraryDict == {"x64": ["DebugLib"]}
+
+        # Changed contents miss
+        _touch_later(inf_path, INF.replace("Driver.c", "Changed.c"))
+        infp = InfParser().SetInputVars({"SOURCE_DIR": "src"})
+        infp.ParseFile(str(inf_path))
+        assert infp.Sources == ["src/Changed.c"]
+        assert cache.info()["disk_hits"] == 1
+
+        # Corrupt, truncated and malformed entries are ignored
+        entries = list(cache_dir.iterdir())
+        for corrupt in (b"not a pickle", entries[0].read_bytes()[:-10], pickle.dumps("not a pair")):
+            for entry in entries:
+                entry.write_bytes(corrupt)
+            parse_cache.disable_parse_cache()
+            cache = parse_cache.enable_parse_cache(directory=str(cache_dir))
+            InfParser().SetInputVars({"SOURCE_DIR": "src"}).ParseFile(str(inf_path))
+            assert cache.info()["disk_hits"] == 0
+    finally:
+        parse_cache.disable_parse_cache()
+
+
+def test_disk_cache_unloadable_state(tmp_path: Path):
+    cache_dir = tmp_path / "cache"
+    inf_path = tmp_path / "Driver.inf"
+    inf_path.write_text(INF)
+    parse_cache.disable_parse_cache()
+    try:
+        parse_cache.enable_parse_cache(directory=str(cache_dir))
+        InfParser().ParseFile(str(inf_path))
+
+        # State referring to a class that no longer exists, as written by another version of the library, is a miss
+        (entry,) = cache_dir.iterdir()
+        disk_key, _ = pickle.loads(entry.read_bytes())
+        entry.write_bytes(pickle.dumps((disk_key, b"cno_such_module\nParser\n.")))
+        parse_cache.disable_parse_cache()
+        cache = parse_cache.enable_parse_cache(directory=str(cache_dir))
+        infp = InfParser()
+        infp.ParseFile(str(inf_path))
+        assert infp.Dict["BASE_NAME"] == "TestDriver"
+        assert cache.info()["hits"] == 0
+        assert cache.info()["disk_hits"] == 0
+        assert cache.info()["misses"] == 1
+
+        # The entry is deleted, and replaced by the new parse
+        assert pickle.loads(next(cache_dir.iterdir()).read_bytes())[1] != b"cno_such_module\nParser\n."
+    finally:
+        parse_cache.disable_parse_cache()
+
+
+def test_disk_cache_hashes_file_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    inf_path = tmp_path / "Driver.inf"
+    inf_path.write_text(INF)
+    parse_cache.disable_parse_cache()
+    try:
+        cache = parse_cache.enable_parse_cache(directory=str(tmp_path / "cache"))
+        disk_key = parse_cache.ParsedFileCache._disk_key
+        calls = []
+
+        def counting_disk_key(self: parse_cache.ParsedFileCache, key: tuple) -> tuple:
+            calls.append(key)
+            return disk_key(self, key)
+
+        monkeypatch.setattr(parse_cache.ParsedFileCache, "_disk_key", counting_disk_key)
+
+        # The lookup that misses and the store that follows it share one hash of the file
+        InfParser().ParseFile(str(inf_path))
+        assert len(calls) == 1
+        assert cache.info()["disk_writes"] == 1
+    finally:
+        parse_cache.disable_parse_cache()
+
+
+def test_disk_cache_keyed_by_library_version(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    cache_dir = tmp_path / "cache"
+    inf_path = tmp_path / "Driver.inf"
+    inf_path.write_text(INF)
+    parse_cache.disable_parse_cache()
+    try:
+        monkeypatch.setattr(parse_cache, "_LIBRARY_VERSION", "1.0.0")
+        parse_cache.enable_parse_cache(directory=str(cache_dir))
+        InfParser().ParseFile(str(inf_path))
+
+        # Entries written by another version of the library are not used
+        monkeypatch.setattr(parse_cache, "_LIBRARY_VERSION", "2.0.0")
+        parse_cache.disable_parse_cache()
+        cache = parse_cache.enable_parse_cache(directory=str(cache_dir))
+        InfParser().ParseFile(str(inf_path))
+        assert cache.info()["disk_hits"] == 0
+
+        parse_cache.disable_parse_cache()
+        cache = parse_cache.enable_parse_cache(directory=str(cache_dir))
+        InfParser().ParseFile(str(inf_path))
+        assert cache.info()["disk_hits"] == 1
+    finally:
+        parse_cache.disable_parse_cache()
+
+
+def test_disk_cache_eviction(tmp_path: Path):
+    cache = parse_cache.ParsedFileCache(maxsize=1, directory=str(tmp_path / "cache"), max_disk_bytes=2000)
+    for i in range(20):
+        inf_path = tmp_path / f"Driver{i}.inf"
+        inf_path.write_text(INF)
+        key = parse_cache.make_key(InfParser, str(inf_path), ())
+        cache.put(key, parse_cache.ParseResult.from_state({"Lines": [f"line {i}" * 20]}))
+
+    total = sum(entry.stat().st_size for entry in (tmp_path / "cache").iterdir())
+    assert cache.info()["disk_writes"] == 20
+    assert cache.info()["disk_evictions"] > 0
+    assert total <= 2000
+    # The newest entry survives eviction and is read back once evicted from memory
+    cache.clear()
+    assert cache.get(key).load() == {"Lines": ["line 19" * 20]}
+    assert cache.info()["disk_hits"] == 1
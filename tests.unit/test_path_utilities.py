@@ -9,10 +9,12 @@
 
 import logging
 import os
+import pickle
 import shutil
 import sys
 import tempfile
 import unittest
+import unittest.mock
 from pathlib import Path, PurePath
 
 from edk2toollib.uefi.edk2.path_utilities import Edk2Path
@@ -1347,3 +1349,244 @@ def test_get_absolute_path_then_relative_path_when_path_contains_repeated_packag
         expectedpath = f"{ws_pkg_name}/ClientPkg.dec"
 
         self.assertEqual(pathobj.GetEdk2RelativePathFromAbsolutePath(abspath), expectedpath)
+
+    def test_get_containing_package_uses_discovered_packages(self):
+        """Test that GetContainingPackage uses the packages discovered at initialization until refreshed.
+
+        File layout:
+
+         root/                  <-- current working directory (self.tmp)
+            folder_ws/           <-- workspace root
+                folder_pp/       <-- packages path
+                    PPTestPkg/   <-- A edk2 package
+                        PPTestPkg.dec
+                        module1/
+                            module1.inf
+                        module2/
+                            module2.inf
+                            X64/
+                                TestFile.c
+        """
+        ws_abs = os.path.join(self.tmp, "folder_ws")
+        os.mkdir(ws_abs)
+        folder_pp1_abs = os.path.join(ws_abs, "folder_pp")
+        os.mkdir(folder_pp1_abs)
+        pp_pkg_abs = self._make_edk2_package_helper(folder_pp1_abs, "PPTestPkg")
+        pathobj = Edk2Path(ws_abs, [folder_pp1_abs])
+
+        p = os.path.join(pp_pkg_abs, "module2", "X64", "TestFile.c")
+        self.assertEqual(pathobj.GetContainingPackage(p), "PPTestPkg")
+
+        # The package no longer exists on disk, but the package roots have not been refreshed
+        shutil.rmtree(pp_pkg_abs)
+        new_pkg_abs = self._make_edk2_package_helper(folder_pp1_abs, "NewPkg")
+        self.assertEqual(pathobj.GetContainingPackage(p), "PPTestPkg")
+        self.assertIsNone(pathobj.GetContainingPackage(os.path.join(new_pkg_abs, "module1", "module1.inf")))
+
+        pathobj.RefreshPackageRoots()
+        self.assertIsNone(pathobj.GetContainingPackage(p))
+        self.assertEqual(pathobj.GetContainingPackage(os.path.join(new_pkg_abs, "module1", "module1.inf")), "NewPkg")
+
+    def test_path_conversion_cache(self):
+        """Test that path conversions are cached until the cache is cleared."""
+        ws_abs = os.path.join(self.tmp, "folder_ws")
+        os.mkdir(ws_abs)
+        folder_pp1_abs = os.path.join(ws_abs, "folder_pp")
+        os.mkdir(folder_pp1_abs)
+        pp_pkg_abs = self._make_edk2_package_helper(folder_pp1_abs, "PPTestPkg")
+        pathobj = Edk2Path(ws_abs, [folder_pp1_abs])
+
+        new_file = os.path.join(pp_pkg_abs, "module1", "New.c")
+        self.assertIsNone(pathobj.GetAbsolutePathOnThisSystemFromEdk2RelativePath("PPTestPkg/module1/New.c"))
+
+        # A file that was not found is not cached, so it is found once created
+        self._make_file_helper(os.path.dirname(new_file), "New.c")
+        self.assertEqual(pathobj.GetAbsolutePathOnThisSystemFromEdk2RelativePath("PPTestPkg/module1/New.c"), new_file)
+
+        # A file that was found is cached until the cache is cleared
+        os.remove(new_file)
+        self.assertEqual(pathobj.GetAbsolutePathOnThisSystemFromEdk2RelativePath("PPTestPkg/module1/New.c"), new_file)
+        pathobj.ClearPathCache()
+        self.assertIsNone(pathobj.GetAbsolutePathOnThisSystemFromEdk2RelativePath("PPTestPkg/module1/New.c"))
+        self._make_file_helper(os.path.dirname(new_file), "New.c")
+
+        snapshot = pathobj.Snapshot()
+        self.assertIsNone(snapshot.GetAbsolutePathOnThisSystemFromEdk2RelativePath("PPTestPkg/module1/Later.c"))
+        self._make_file_helper(os.path.dirname(new_file), "Later.c")
+        self.assertIsNotNone(snapshot.GetAbsolutePathOnThisSystemFromEdk2RelativePath("PPTestPkg/module1/Later.c"))
+
+        self.assertEqual(pathobj.GetEdk2RelativePathFromAbsolutePath(new_file), "PPTestPkg/module1/New.c")
+        self.assertEqual(pathobj.GetEdk2RelativePathFromAbsolutePath(new_file), "PPTestPkg/module1/New.c")
+        self.assertEqual(pathobj.GetEdk2RelativePathFromAbsolutePath(folder_pp1_abs), ".")
+        self.assertIsNone(pathobj.GetEdk2RelativePathFromAbsolutePath(self.tmp))
+
+        # Caches are not pickled, but are re-created
+        pathobj = pickle.loads(pickle.dumps(pathobj))
+        self.assertEqual(pathobj.GetEdk2RelativePathFromAbsolutePath(new_file), "PPTestPkg/module1/New.c")
+        self.assertEqual(pathobj.GetAbsolutePathOnThisSystemFromEdk2RelativePath("PPTestPkg/module1/New.c"), new_file)
+
+    def test_lazy_package_discovery(self):
+        """Test that packages are not discovered until needed when lazy, and that ignored directories are skipped."""
+        ws_abs = os.path.join(self.tmp, "folder_ws")
+        os.mkdir(ws_abs)
+        pp_pkg_abs = self._make_edk2_package_helper(ws_abs, "WSTestPkg")
+        build_pkg_abs = self._make_edk2_package_helper(os.path.join(ws_abs, "Build"), "BuildPkg")
+
+        pathobj = Edk2Path(ws_abs, [ws_abs], lazy=True)
+        self.assertIsNone(pathobj._package_roots)
+
+        # Path conversions do not require package discovery
+        self.assertEqual(pathobj.GetEdk2RelativePathFromAbsolutePath(pp_pkg_abs), "WSTestPkg")
+        self.assertIsNone(pathobj._package_roots)
+
+        self.assertEqual(pathobj.GetContainingPackage(os.path.join(pp_pkg_abs, "module1", "a.c")), "WSTestPkg")
+        self.assertIn(Path(pp_pkg_abs), pathobj._package_roots)
+        self.assertNotIn(Path(build_pkg_abs), pathobj._package_roots)
+
+    def test_eager_package_discovery_searches_every_directory(self):
+        """Test that eager discovery does not skip ignored directories unless they are given explicitly."""
+        ws_abs = os.path.join(self.tmp, "folder_ws")
+        os.mkdir(ws_abs)
+        build_pkg_abs = self._make_edk2_package_helper(os.path.join(ws_abs, "Build"), "BuildPkg")
+        venv_pkg_abs = self._make_edk2_package_helper(os.path.join(ws_abs, "venv"), "VenvPkg")
+
+        pathobj = Edk2Path(ws_abs, [ws_abs])
+        self.assertEqual(pathobj.GetContainingPackage(os.path.join(build_pkg_abs, "module1", "a.c")), "BuildPkg")
+        self.assertEqual(pathobj.GetContainingPackage(os.path.join(venv_pkg_abs, "module1", "a.c")), "VenvPkg")
+
+        pathobj = Edk2Path(ws_abs, [ws_abs], ignored_directories=["Build"])
+        self.assertNotIn(Path(build_pkg_abs), pathobj._package_roots)
+        self.assertIn(Path(venv_pkg_abs), pathobj._package_roots)
+
+        # An explicit value also replaces the default of lazy discovery
+        pathobj = Edk2Path(ws_abs, [ws_abs], lazy=True, ignored_directories=[])
+        self.assertEqual(pathobj.GetContainingPackage(os.path.join(build_pkg_abs, "module1", "a.c")), "BuildPkg")
+
+    def test_package_discovery_cache(self):
+        """Test that discovered packages are persisted, and re-discovered when a directory changes."""
+        ws_abs = os.path.join(self.tmp, "folder_ws")
+        os.mkdir(ws_abs)
+        folder_pp1_abs = os.path.join(ws_abs, "folder_pp")
+        os.mkdir(folder_pp1_abs)
+        pp_pkg_abs = self._make_edk2_package_helper(folder_pp1_abs, "PPTestPkg")
+        cache = os.path.join(self.tmp, "cache", "packages.json")
+
+        pathobj = Edk2Path(ws_abs, [folder_pp1_abs], discovery_cache=cache)
+        self.assertTrue(os.path.isfile(cache))
+        self.assertEqual(pathobj.GetContainingPackage(os.path.join(pp_pkg_abs, "a.c")), "PPTestPkg")
+
+        # The cache is used when nothing has changed
+        with unittest.mock.patch("edk2toollib.uefi.edk2.path_utilities._walk_package_path") as walk:
+            pathobj = Edk2Path(ws_abs, [folder_pp1_abs], discovery_cache=cache)
+            walk.assert_not_called()
+        self.assertEqual(pathobj.GetContainingPackage(os.path.join(pp_pkg_abs, "a.c")), "PPTestPkg")
+
+        # Adding a package modifies the package path directory, invalidating the cache
+        new_pkg_abs = self._make_edk2_package_helper(folder_pp1_abs, "NewPkg")
+        os.utime(folder_pp1_abs, ns=(0, 0))
+        pathobj = Edk2Path(ws_abs, [folder_pp1_abs], discovery_cache=cache)
+        self.assertEqual(pathobj.GetContainingPackage(os.path.join(new_pkg_abs, "a.c")), "NewPkg")
+
+        # An unreadable cache is ignored
+        with open(cache, "w") as f:
+            f.write("not json")
+        pathobj = Edk2Path(ws_abs, [folder_pp1_abs], discovery_cache=cache)
+        self.assertEqual(pathobj.GetContainingPackage(os.path.join(new_pkg_abs, "a.c")), "NewPkg")
+
+    def test_get_containing_modules_for_paths(self):
+        """Test that the batch variant of GetContainingModules matches the single path variant."""
+        ws_abs = os.path.join(self.tmp, "folder_ws")
+        os.mkdir(ws_abs)
+        folder_pp1_abs = os.path.join(ws_abs, "pp1")
+        os.mkdir(folder_pp1_abs)
+        ws_pkg_abs = self._make_edk2_package_helper(ws_abs, "WSTestPkg")
+        pp_pkg_abs = self._make_edk2_package_helper(folder_pp1_abs, "PPTestPkg", extension_case_lower=False)
+        pathobj = Edk2Path(ws_abs, [folder_pp1_abs])
+
+        paths = [
+            os.path.join(ws_pkg_abs, "testfile.c"),
+            os.path.join(ws_pkg_abs, "module1", "testfile.c"),
+            os.path.join(ws_pkg_abs, "module2", "X64", "testfile.c"),
+            os.path.join(ws_pkg_abs, "module2", "X64", "TestFile.c"),
+            os.path.join(ws_pkg_abs, "module2", "module2.inf"),
+            os.path.join(ws_pkg_abs, "module1", "DoesNotExist", "testfile.c"),
+            os.path.join(pp_pkg_abs, "module1", "testfile.c"),
+            os.path.join(folder_pp1_abs, "testfile.c"),
+            os.path.join(ws_abs, "testfile.c"),
+            os.path.join(os.path.dirname(ws_abs), "testfile.c"),
+            ws_abs,
+        ]
+        results = pathobj.GetContainingModulesForPaths(paths)
+        self.assertEqual(list(results.keys()), paths)
+        for path in paths:
+            self.assertEqual(results[path], pathobj.GetContainingModules(path))
+
+        self.assertEqual(results[paths[2]], [os.path.join(ws_pkg_abs, "module2", "module2.inf")])
+        self.assertEqual(results[paths[6]], [os.path.join(pp_pkg_abs, "module1", "module1.INF")])
+        self.assertEqual(results[paths[0]], [])
+
+        with self.assertRaises(Exception):
+            pathobj.GetContainingModulesForPaths([paths[0], "relative/path.c"])
+
+    def test_snapshot_matches_edk2path(self):
+        """Test that an Edk2PathSnapshot provides the same results as the Edk2Path it was created from.
+
+        File layout:
+
+         root/                  <-- current working directory (self.tmp)
+            folder_ws/           <-- workspace root
+                folder_pp/       <-- packages path
+                    PPTestPkg/   <-- A edk2 package
+                WSTestPkg/   <-- A edk2 package
+            folder_pp2/          <-- packages path outside of the workspace
+                PP2TestPkg/      <-- A edk2 package
+        """
+        ws_abs = os.path.join(self.tmp, "folder_ws")
+        os.mkdir(ws_abs)
+        folder_pp1_abs = os.path.join(ws_abs, "folder_pp")
+        os.mkdir(folder_pp1_abs)
+        folder_pp2_abs = os.path.join(self.tmp, "folder_pp2")
+        os.mkdir(folder_pp2_abs)
+        ws_pkg_abs = self._make_edk2_package_helper(ws_abs, "WSTestPkg")
+        pp_pkg_abs = self._make_edk2_package_helper(folder_pp1_abs, "PPTestPkg", extension_case_lower=False)
+        pp2_pkg_abs = self._make_edk2_package_helper(folder_pp2_abs, "PP2TestPkg")
+        pathobj = Edk2Path(ws_abs, [folder_pp1_abs, folder_pp2_abs])
+
+        snapshot = pathobj.Snapshot()
+        # The snapshot can be re-created in another process without touching the filesystem
+        with unittest.mock.patch("os.scandir") as scandir, unittest.mock.patch("os.stat") as stat:
+            snapshot = pickle.loads(pickle.dumps(snapshot))
+            scandir.assert_not_called()
+            stat.assert_not_called()
+
+        self.assertEqual(snapshot.WorkspacePath, pathobj.WorkspacePath)
+        self.assertEqual(snapshot.PackagePathList, pathobj.PackagePathList)
+
+        paths = [
+            os.path.join(ws_pkg_abs, "testfile.c"),
+            os.path.join(ws_pkg_abs, "module1", "testfile.c"),
+            ws_pkg_abs,
+            os.path.join(pp_pkg_abs, "module2", "X64", "TestFile.c"),
+            os.path.join(pp2_pkg_abs, "module1", "module1.inf"),
+            os.path.join(pp2_pkg_abs, "DoesNotExist", "a.c"),
+            os.path.join(folder_pp1_abs, "testfile.c"),
+            os.path.join(folder_pp2_abs, "testfile.c"),
+            os.path.join(ws_abs, "testfile.c"),
+            ws_abs,
+            os.path.join(self.tmp, "testfile.c"),
+        ]
+        for p in paths:
+            self.assertEqual(snapshot.GetContainingPackage(p), pathobj.GetContainingPackage(p), p)
+            rel = pathobj.GetEdk2RelativePathFromAbsolutePath(p)
+            self.assertEqual(snapshot.GetEdk2RelativePathFromAbsolutePath(p), rel, p)
+            if rel is not None:
+                self.assertEqual(
+                    snapshot.GetAbsolutePathOnThisSystemFromEdk2RelativePath(rel, log_errors=False),
+                    pathobj.GetAbsolutePathOnThisSystemFromEdk2RelativePath(rel, log_errors=False),
+                    rel,
+                )
+
+        self.assertIsNone(snapshot.GetEdk2RelativePathFromAbsolutePath(None))
+        self.assertIsNone(snapshot.GetAbsolutePathOnThisSystemFromEdk2RelativePath(None))
+        with self.assertRaises(AttributeError):
+            snapshot.new_attribute = 1